@@ -0,0 +1,107 @@
+"""
+Inbound routing (destination address -> account): a Users responseEmail-index
+query per email versus the routing cache in
+Process-SQS-Queued-Emails/account_routing.py, cold and bulk-warmed.
+
+Replays ``--emails`` destinations: most go to a few busy response addresses,
+the rest to unknown mailboxes (misdirected mail and spam at domains no user
+receives on, and a few unknown mailboxes at users' domains). Every DynamoDB
+call costs ``--dynamodb-ms``. Reports DynamoDB calls and time per email, and
+checks every route against the Users table.
+
+Then changes one user's responseEmail through verifyNewDomainValid and checks
+that, once the cache next reads the routing generation, the new address routes
+to the user and the old one no longer does.
+
+Usage:
+    python benchmarks/bench_account_routing.py [--emails 3000] [--users 300] [--dynamodb-ms 5]
+"""
+
+import argparse
+import random
+import time
+
+from harness import FakeDynamoResource, FakeTable, load_lambda
+
+
+def build_users(n):
+    return [{"id": f"acct-{i}", "responseEmail": f"agent{i}@brand{i % 40}.test"} for i in range(n)]
+
+
+def build_stream(users, n, rng):
+    busy = [u["responseEmail"] for u in users[:8]]
+    stream = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.85:
+            stream.append(rng.choice(busy).upper() if rng.random() < 0.1 else rng.choice(busy))
+        elif roll < 0.97:
+            stream.append(f"info{rng.randrange(50)}@unknown{rng.randrange(30)}.test")
+        else:
+            stream.append(f"sales@brand{rng.randrange(40)}.test")
+    return stream
+
+
+def build_env(label, users, args):
+    dynamodb = FakeDynamoResource([FakeTable("Users", ("id",), users), FakeTable("CacheGenerations", ("id",))],
+                                  latency_ms=args.dynamodb_ms)
+    env = {"ACCOUNT_ROUTING_WARM": "true"} if label == "cache+warm" else {}
+    db = load_lambda("Process-SQS-Queued-Emails", "db", dynamodb=dynamodb, env=env)
+    return dynamodb, db
+
+
+def run(label, users, stream, args):
+    dynamodb, db = build_env(label, users, args)
+    init_calls = dynamodb.total_calls()
+    dynamodb.reset_calls()
+
+    expected = {u["responseEmail"]: u["id"] for u in users}
+    if label == "query":
+        repository = db.get_associated_account.__globals__["repository"]
+
+        def resolve(address):
+            account = repository.get_account_by_response_email(address)
+            return account.get("id") if account else None
+    else:
+        resolve = db.account_routing.lookup
+
+    wrong = 0
+    start = time.perf_counter()
+    for address in stream:
+        wrong += resolve(address) != expected.get(address.lower())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<11} emails={len(stream)} dynamodb_calls/email={dynamodb.total_calls() / len(stream):5.3f} "
+          f"ms/email={elapsed * 1000.0 / len(stream):6.3f} init_calls={init_calls:<3} misrouted={wrong}")
+
+
+def run_invalidation(users, args):
+    dynamodb, db = build_env("cache+warm", users, args)
+    cache = db.account_routing
+    verify = load_lambda("verifyNewDomainValid", dynamodb=dynamodb)
+
+    user, old, new = users[3]["id"], users[3]["responseEmail"], "leads@newdomain.test"
+    before = (cache.lookup(old), cache.lookup(new))
+    verify.update_email_in_db(user, new, {})
+    cache._next_check = 0  # the next lookup is past ACCOUNT_ROUTING_CHECK_SECONDS
+    after = (cache.lookup(old), cache.lookup(new))
+    ok = before == (user, None) and after == (None, user)
+    print(f"invalidation before(old, new)={before} after(old, new)={after} "
+          f"invalidations={cache.stats['invalidations']} ok={ok}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=3000)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    users = build_users(args.users)
+    stream = build_stream(users, args.emails, random.Random(11))
+    for label in ("query", "cache", "cache+warm"):
+        run(label, users, stream, args)
+    run_invalidation(users, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Admission latency: authorize + rate limit, old path versus the admission API.
+
+All three paths run against the same fake DynamoDB tables (Sessions, Users,
+RL_AWS) with ``--dynamodb-ms`` per call, and Lambda invokes cost ``--invoke-ms``.
+
+- Authorize + RateLimitAWS: invoke the Authorize Lambda, then the RateLimitAWS
+  Lambda (which authorizes again before counting the request).
+- Admission Lambda:         one invoke of the Admission Lambda.
+- admit() in-process:       admission.admit() called directly by the handler.
+
+Pass ``--no-session-cache`` to make every Sessions lookup miss the warm cache.
+
+Then checks the limit itself: --limit-threads concurrent admit() calls
+against a limit of --limit admit exactly --limit requests, and an expired
+window admits again. Exits non-zero if not.
+
+Usage:
+    python benchmarks/bench_admission.py [--iterations 200] [--invoke-ms 15] [--dynamodb-ms 4]
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import FakeDynamoResource, FakeLambdaClient, FakeTable, load_lambda, summarize, time_calls
+
+ACCOUNT_ID = "acct-bench"
+SESSION_ID = "session-bench"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--invoke-ms", type=float, default=15.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=4.0)
+    parser.add_argument("--no-session-cache", action="store_true")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--limit-threads", type=int, default=16)
+    args = parser.parse_args()
+
+    env = {"AUTH_CACHE_TTL_S": "0"} if args.no_session_cache else {}
+    lambda_client = FakeLambdaClient(latency_ms=args.invoke_ms)
+    dynamodb = FakeDynamoResource([
+        FakeTable("Sessions", ("session_id",), [{"session_id": SESSION_ID, "associated_account": ACCOUNT_ID}]),
+        FakeTable("Users", ("id",), [{"id": ACCOUNT_ID, "rl_aws": 10 ** 9}]),
+        FakeTable("RL_AWS", ("associated_account",)),
+    ], latency_ms=args.dynamodb_ms)
+
+    handlers = {}
+    for name in ("Authorize", "RateLimitAWS", "Admission"):
+        handlers[name] = load_lambda(name, lambda_client=lambda_client, dynamodb=dynamodb, env=env).lambda_handler
+        lambda_client.route(name, lambda payload, fn=handlers[name]: fn(payload, None))
+    db_select = load_lambda("DBSelect", lambda_client=lambda_client, dynamodb=dynamodb, env=env)
+
+    payload = {"account_id": ACCOUNT_ID, "client_id": ACCOUNT_ID, "session_id": SESSION_ID, "session": SESSION_ID}
+
+    def two_step():
+        db_select.invoke_lambda("Authorize", {"user_id": ACCOUNT_ID, "session_id": SESSION_ID})
+        db_select.invoke_lambda("RateLimitAWS", payload)
+
+    def admission_lambda():
+        db_select.invoke_lambda("Admission", payload)
+
+    def in_process():
+        result = db_select.admit(ACCOUNT_ID, SESSION_ID)
+        assert result["allowed"], result
+
+    for label, fn in (("Authorize + RateLimitAWS", two_step),
+                      ("Admission Lambda", admission_lambda),
+                      ("admit() in-process", in_process)):
+        lambda_client.reset_calls()
+        dynamodb.reset_calls()
+        samples = time_calls(fn, args.iterations)
+        runs = args.iterations + 3
+        print(f"{summarize(label, samples)} invokes/req={sum(lambda_client.calls.values()) / runs:.1f} "
+              f"dynamodb/req={dynamodb.total_calls() / runs:.1f}")
+
+    if not check_limit(args, env):
+        sys.exit("rate limit check failed")
+
+
+def check_limit(args, env):
+    """Concurrent requests never pass the limit, and an expired window starts a new one."""
+    rl_aws = FakeTable("RL_AWS", ("associated_account",))
+    dynamodb = FakeDynamoResource([
+        FakeTable("Sessions", ("session_id",), [{"session_id": SESSION_ID, "associated_account": ACCOUNT_ID}]),
+        FakeTable("Users", ("id",), [{"id": ACCOUNT_ID, "rl_aws": args.limit}]),
+        rl_aws,
+    ], latency_ms=args.dynamodb_ms)
+    admission = load_lambda("Admission", module="admission", dynamodb=dynamodb, env=env)
+    requests = args.limit * 2
+    with ThreadPoolExecutor(args.limit_threads) as pool:
+        results = list(pool.map(lambda _: admission.admit(ACCOUNT_ID, SESSION_ID), range(requests)))
+    admitted = sum(r["allowed"] for r in results)
+    refused = sum(r["statusCode"] == 429 for r in results)
+
+    rl_aws.items[(ACCOUNT_ID,)]["created_at"] = int(time.time()) - admission.TTL_S
+    reset = admission.admit(ACCOUNT_ID, SESSION_ID)
+    ok = admitted == args.limit and refused == requests - args.limit and reset["allowed"] and reset["current"] == 1
+    print(f"limit={args.limit} concurrent_requests={requests} admitted={admitted} refused={refused} "
+          f"after_window={reset['statusCode']}/{reset['current']} {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Per-email wall time of the Process-SQS-Queued-Emails stage graph.
+
+Runs each email of a corpus through ``run_email_pipeline`` one at a time with
+stage concurrency 1 (stages one after another, the previous behaviour) and
+with overlapping stages, and reports the median time of every stage plus the
+end-to-end total. Downstream latencies are the stubs of
+bench_sqs_throughput.py.
+
+Usage:
+    python benchmarks/bench_email_stages.py [--threads 10] [--replies 2] [--stage-concurrency 1 3]
+"""
+
+import argparse
+import statistics
+import time
+from collections import defaultdict
+
+from bench_sqs_throughput import build_corpus, build_env
+
+
+def run(args, stage_concurrency):
+    processor, s3, _ = build_env(args)
+    processor.PIPELINE_STAGE_CONCURRENCY = stage_concurrency
+    records = build_corpus(s3, args.threads, args.replies)
+
+    timings = defaultdict(list)
+    for record in records:
+        succeeded, stage_timings = processor.run_email_pipeline(record)
+        assert succeeded, record["messageId"]
+        for name, ms in stage_timings.items():
+            timings[name].append(ms)
+
+    stages = " ".join(f"{name}={statistics.median(samples):.0f}"
+                      for name, samples in timings.items() if name != "total")
+    total = statistics.median(timings["total"])
+    print(f"stage_concurrency={stage_concurrency:<2} emails={len(records):<4} "
+          f"total_p50={total:7.1f}ms  stages_p50_ms: {stages}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--replies", type=int, default=2)
+    parser.add_argument("--stage-concurrency", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--invoke-ms", type=float, default=40.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0)
+    parser.add_argument("--s3-ms", type=float, default=20.0)
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    args.fail_thread = None
+
+    totals = {c: run(args, c) for c in args.stage_concurrency}
+    baseline = totals[args.stage_concurrency[0]]
+    for c, total in totals.items():
+        print(f"per-email wall time at stage_concurrency={c}: {total:.1f}ms ({baseline / total:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+HTML-only emails: the previous regex tag stripper versus the html.parser
+converter in Process-SQS-Queued-Emails/html_text.py.
+
+For each email of a small corpus of marketing and real-estate HTML (newsletter
+with a style block and hidden preheader, listing alert, Gmail and Outlook HTML
+replies, open-house flyer), reports the approximate token count of the body
+that reaches the LLM prompts (after quoted-reply stripping) and the
+conversion time per email.
+
+Tokens are approximated as words plus punctuation marks.
+
+Usage:
+    python benchmarks/bench_html_text.py [--repeat 50] [--show NAME]
+"""
+
+import argparse
+import logging
+import re
+import statistics
+import time
+
+from harness import load_lambda
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+STYLE = """<style type="text/css">
+  body { margin:0; padding:0; -webkit-text-size-adjust:100%; }
+  table, td { border-collapse:collapse; mso-table-lspace:0pt; mso-table-rspace:0pt; }
+  .button a { display:inline-block; padding:12px 24px; background:#1a73e8; color:#ffffff !important; }
+  @media only screen and (max-width:600px) { .stack { display:block !important; width:100% !important; } }
+</style>"""
+
+PREHEADER = ('<div style="display:none;max-height:0;overflow:hidden;mso-hide:all">'
+             "New homes matching your search are here" + "&#847;&zwnj;&nbsp;" * 90 + "</div>")
+
+
+def listing_rows(count):
+    rows = []
+    for i in range(count):
+        rows.append(
+            f'<tr><td class="stack" width="200"><a href="https://click.mls.test/ls/click?upn=abc{i}def">'
+            f'<img src="https://img.mls.test/{i}.jpg" width="200" alt="Listing photo" style="display:block"></a></td>'
+            f'<td class="stack" style="padding:8px;font-family:Arial,sans-serif">'
+            f'<p style="margin:0;font-size:18px"><b>${400 + i * 15},000</b></p>'
+            f'<p style="margin:0">{3 + i % 2} bd &middot; {2 + i % 3} ba &middot; {1500 + i * 120} sqft</p>'
+            f'<p style="margin:0">{100 + i} Maple Ave, Springfield, IL</p>'
+            f'<div class="button"><a href="https://click.mls.test/ls/click?upn=view{i}">View home &rarr;</a></div>'
+            f'</td></tr>')
+    return "".join(rows)
+
+
+FOOTER = ('<table width="100%"><tr><td style="font-size:11px;color:#888">'
+          '&copy; 2026 Springfield Realty &amp; Co. &bull; 1 Main St &bull; Springfield, IL<br>'
+          'You are receiving this because you subscribed. '
+          '<a href="https://click.mls.test/unsub?u=123">Unsubscribe</a> | '
+          '<a href="https://click.mls.test/prefs?u=123">Preferences</a></td></tr></table>'
+          '<img src="https://open.mls.test/o/abc123.gif" width="1" height="1" alt="">')
+
+CORPUS = {
+    "newsletter": (
+        f"<html><head><meta charset='utf-8'><title>Springfield Market Update</title>{STYLE}</head>"
+        f"<body>{PREHEADER}<center><table width='600'>"
+        "<tr><td><h1>October Market Update</h1>"
+        "<p>Home prices in Springfield rose 3.2% this month, while inventory fell to its lowest level since 2019. "
+        "Here&rsquo;s what that means for buyers &amp; sellers.</p>"
+        "<ul><li>Median price: $412,000</li><li>Days on market: 18</li><li>New listings: 214</li></ul>"
+        "<p>Thinking about selling? <a href='https://click.mls.test/cta'>Get a free home valuation</a>.</p>"
+        f"</td></tr></table>{FOOTER}</center></body></html>"
+    ),
+    "listing-alert": (
+        f"<html><head>{STYLE}</head><body>{PREHEADER}"
+        "<table width='600'><tr><td><h2>6 new homes match &ldquo;Springfield under $500k&rdquo;</h2></td></tr>"
+        f"{listing_rows(6)}</table>{FOOTER}</body></html>"
+    ),
+    "gmail-reply": (
+        '<div dir="ltr">Hi Jane,<div><br></div><div>We&#39;d love to see 12 Oak St on Saturday. '
+        'Could we also look at the one on Maple?</div><div><br></div><div>Thanks,</div><div>Bob</div></div><br>'
+        '<div class="gmail_quote"><div dir="ltr" class="gmail_attr">On Mon, Oct 12, 2026 at 9:14 AM Jane Agent '
+        '&lt;<a href="mailto:jane@realty.test">jane@realty.test</a>&gt; wrote:<br></div>'
+        '<blockquote class="gmail_quote" style="margin:0px 0px 0px 0.8ex;border-left:1px solid rgb(204,204,204)">'
+        '<div dir="ltr">Hi Bob,<div><br></div><div>Here are three listings you might like.</div>'
+        f'<table>{listing_rows(3)}</table></div></blockquote></div>'
+    ),
+    "outlook-reply": (
+        '<html xmlns:o="urn:schemas-microsoft-com:office:office"><head>'
+        '<meta http-equiv="Content-Type" content="text/html; charset=utf-8">'
+        '<!--[if gte mso 9]><xml><o:OfficeDocumentSettings><o:AllowPNG/></o:OfficeDocumentSettings></xml><![endif]-->'
+        '<style>p.MsoNormal, li.MsoNormal { margin:0in; font-size:11.0pt; font-family:"Calibri",sans-serif; }'
+        '@page WordSection1 { size:8.5in 11.0in; margin:1.0in 1.0in 1.0in 1.0in; }</style></head>'
+        '<body lang="EN-US"><div class="WordSection1">'
+        '<p class="MsoNormal">Hi Jane,<o:p></o:p></p><p class="MsoNormal"><o:p>&nbsp;</o:p></p>'
+        '<p class="MsoNormal">We are pre-approved up to $700k and can close in 45 days.<o:p></o:p></p>'
+        '<p class="MsoNormal"><o:p>&nbsp;</o:p></p><p class="MsoNormal">Regards,<br>Bob<o:p></o:p></p>'
+        '<div style="border:none;border-top:solid #E1E1E1 1.0pt;padding:3.0pt 0in 0in 0in">'
+        '<p class="MsoNormal"><b>From:</b> Jane Agent &lt;jane@realty.test&gt;<br><b>Sent:</b> Monday, October 12, 2026 9:14 AM<br>'
+        '<b>To:</b> Bob Buyer &lt;bob@example.com&gt;<br><b>Subject:</b> RE: 12 Oak St<o:p></o:p></p></div>'
+        f'<p class="MsoNormal">Hi Bob, here is the listing.</p><table>{listing_rows(2)}</table>'
+        '</div></body></html>'
+    ),
+    "open-house": (
+        f"<html><head>{STYLE}<script>window.dataLayer=window.dataLayer||[];function gtag(){{dataLayer.push(arguments);}}</script>"
+        "</head><body><table width='600'><tr><td>"
+        "<h1>Open House This Sunday</h1><p><b>12 Oak St</b> &ndash; 4 bd / 3 ba &ndash; $585,000</p>"
+        "<p>Sunday, Oct 18 &bull; 1:00&ndash;4:00 PM</p>"
+        "<p>Updated kitchen, finished basement, and a fenced backyard backing onto Lincoln Park.</p>"
+        "<p><a href='https://click.mls.test/rsvp'>RSVP</a></p></td></tr></table>"
+        f"{FOOTER}</body></html>"
+    ),
+}
+
+
+def legacy_html_to_text(html_text):
+    plain_text = re.sub(r'<[^>]+>', ' ', html_text)
+    return re.sub(r'\s+', ' ', plain_text).strip()
+
+
+def tokens(text):
+    return len(TOKEN_RE.findall(text))
+
+
+def median_ms(fn, arg, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--show", help="print both conversions of one corpus email")
+    args = parser.parse_args()
+
+    email_parser = load_lambda("Process-SQS-Queued-Emails", "parser")
+    logging.disable(logging.CRITICAL)
+    strip = email_parser.strip_quoted_reply
+
+    totals = {"legacy": 0, "html.parser": 0}
+    for name, html in CORPUS.items():
+        results = {}
+        for label, convert in (("legacy", legacy_html_to_text), ("html.parser", email_parser.html_to_text)):
+            body = strip(convert(html))
+            results[label] = (tokens(body), median_ms(convert, html, args.repeat), body)
+            totals[label] += results[label][0]
+        old, new = results["legacy"], results["html.parser"]
+        print(f"{name:<14} html={len(html) / 1024:5.1f}KB tokens {old[0]:5d} -> {new[0]:5d} "
+              f"({100.0 * (old[0] - new[0]) / old[0]:4.0f}% fewer)  ms/email {old[1]:6.3f} -> {new[1]:6.3f}")
+        if args.show == name:
+            print(f"--- legacy ---\n{old[2]}\n--- html.parser ---\n{new[2]}\n")
+    print(f"{'total':<14} tokens {totals['legacy']} -> {totals['html.parser']} "
+          f"({100.0 * (totals['legacy'] - totals['html.parser']) / totals['legacy']:.0f}% fewer)")
+
+
+if __name__ == "__main__":
+    main()
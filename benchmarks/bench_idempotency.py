@@ -0,0 +1,153 @@
+"""
+Redelivered inbound emails with and without the idempotency ledger
+(Process-SQS-Queued-Emails/ledger.py).
+
+Runs ``--emails`` first emails from distinct leads (auto-responses enabled)
+through the handler in three delivery patterns:
+
+- duplicate:   every record is delivered twice (SQS at-least-once).
+- ev-failure:  GenerateEV fails on the first attempt of every email, so each
+               record is redelivered after a failed run.
+- crash:       the invocation dies right after the reply was dispatched (the
+               thread_attrs stage raises once per email), so each record is
+               redelivered after its reply went out.
+
+For each pattern, reports the work repeated for the redeliveries: S3 reads,
+spam LLM calls, GenerateEV and LCPLlmResponse invokes, conversations per lead
+(more than one is a split thread), duplicate replies dispatched, and the
+DuplicateDeliveriesAbsorbed metric total.
+
+Usage:
+    python benchmarks/bench_idempotency.py [--emails 20]
+"""
+
+import argparse
+import io
+import json
+import logging
+import threading
+from collections import Counter
+from contextlib import redirect_stdout
+
+from harness import (
+    DEFAULT_ENV, FakeDynamoResource, FakeLambdaClient, FakeS3, FakeTable,
+    load_lambda, make_eml, make_ses_sqs_record,
+)
+
+ACCOUNT_ID = "acct-bench"
+RESPONSE_EMAIL = "agent@bench.test"
+
+
+class FakeSQS:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        self.messages.append(json.loads(MessageBody))
+        return {"MessageId": str(len(self.messages))}
+
+
+def build_env(emails, ledger):
+    lambda_client = FakeLambdaClient()
+    dynamodb = FakeDynamoResource([
+        FakeTable("Users", ("id",), [
+            {"id": ACCOUNT_ID, "responseEmail": RESPONSE_EMAIL, "lcp_automatic_enabled": "true"},
+        ]),
+        FakeTable("Conversations", ("conversation_id", "response_id")),
+        FakeTable("MessageIndex", ("msg_id",)),
+        FakeTable("Threads", ("conversation_id",)),
+        FakeTable("EmailLedger", ("message_id",)),
+    ])
+    s3, sqs = FakeS3(), FakeSQS()
+    processor = load_lambda("Process-SQS-Queued-Emails", lambda_client=lambda_client, dynamodb=dynamodb,
+                            env={"RESPONSE_DISPATCH_QUEUE_URL": "https://sqs.bench/ResponseDispatchQueue"},
+                            clients={"s3": s3, "sqs": sqs})
+    if not ledger:
+        claim_type = processor.email_ledger.claim.__func__.__globals__["LedgerClaim"]
+        processor.email_ledger.claim = lambda message_id: claim_type("unavailable", {})
+
+    records = []
+    for i in range(emails):
+        s3_key = f"ses-{i}"
+        s3.put_object(Bucket=DEFAULT_ENV["BUCKET_NAME"], Key=s3_key, Body=make_eml(
+            f"lead-{i}@mail.bench.test", f"lead{i}@example.com", RESPONSE_EMAIL, f"House {i}",
+            f"Is house {i} still available?"))
+        records.append(make_ses_sqs_record(s3_key, f"lead{i}@example.com", RESPONSE_EMAIL, f"House {i}"))
+
+    llm_calls = Counter()
+
+    def detect_spam(**kwargs):
+        llm_calls["spam"] += 1
+        return False
+
+    processor.detect_spam = detect_spam
+    lambda_client.route("getThreadAttrs", lambda payload: {"statusCode": 200, "body": json.dumps({"attributes": {}})})
+    lambda_client.route("LCPLlmResponse", lambda payload: {"statusCode": 200, "body": json.dumps({
+        "status": "success", "response": "Yes, it is. When would you like to see it?"})})
+    return processor, dynamodb, lambda_client, s3, sqs, llm_calls, records
+
+
+def run(pattern, ledger, args):
+    processor, dynamodb, lambda_client, s3, sqs, llm_calls, records = build_env(args.emails, ledger)
+    # Injected failures log errors by design; keep the report readable.
+    logging.disable(logging.CRITICAL)
+    calls, lock = Counter(), threading.Lock()
+
+    def first_attempt(stage):
+        """True for the first delivery of every email: each delivery reaches the stage once."""
+        with lock:
+            calls[stage] += 1
+            return calls[stage] <= args.emails
+
+    lambda_client.route("GenerateEV", lambda payload: (
+        {"statusCode": 500, "body": json.dumps({"status": "error"})}
+        if pattern == "ev-failure" and first_attempt("ev")
+        else {"statusCode": 200, "body": json.dumps({"status": "success", "ev_score": 60})}))
+
+    refresh = processor.thread_attrs_refresh
+    queue_refresh = refresh.request
+
+    def request(conversation_id, account_id):
+        if pattern == "crash" and first_attempt("thread_attrs"):
+            raise RuntimeError("Lambda timed out")
+        queue_refresh(conversation_id, account_id)
+    refresh.request = request
+
+    deliveries = records + records if pattern == "duplicate" else records
+    redeliveries, stdout = [], io.StringIO()
+    with redirect_stdout(stdout):
+        for start in range(0, len(deliveries), 10):
+            response = processor.lambda_handler({"Records": deliveries[start:start + 10]}, None)
+            redeliveries.extend(f["itemIdentifier"] for f in response["batchItemFailures"])
+        if pattern != "duplicate":
+            by_id = {r["messageId"]: r for r in records}
+            response = processor.lambda_handler({"Records": [by_id[i] for i in redeliveries]}, None)
+            redeliveries = [f["itemIdentifier"] for f in response["batchItemFailures"]]
+    # DuplicateDeliveriesAbsorbed metric lines (embedded metric format)
+    absorbed = sum(json.loads(line).get("DuplicateDeliveriesAbsorbed", 0)
+                   for line in stdout.getvalue().splitlines() if line.startswith('{"_aws"'))
+
+    conversations = Counter(i["sender"] for i in {
+        i["conversation_id"]: i for i in dynamodb.Table("Conversations").items.values()}.values())
+    replies = Counter(m["target"] for m in sqs.messages)
+    n = args.emails
+    print(f"{pattern:<11} {'ledger' if ledger else 'no ledger':<10} "
+          f"s3_reads/email={s3.calls['get_object'] / n:4.2f} spam_llm/email={llm_calls['spam'] / n:4.2f} "
+          f"ev/email={lambda_client.calls['GenerateEV'] / n:4.2f} "
+          f"llm_reply/email={lambda_client.calls['LCPLlmResponse'] / n:4.2f} "
+          f"split_threads={sum(c > 1 for c in conversations.values()):<3} "
+          f"duplicate_replies={sum(c - 1 for c in replies.values()):<3} absorbed={absorbed:<3} unfinished={len(redeliveries)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=20)
+    args = parser.parse_args()
+
+    for pattern in ("duplicate", "ev-failure", "crash"):
+        for ledger in (False, True):
+            run(pattern, ledger, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Token cost of incremental thread-attribute extraction in getThreadAttrs (ATTRIBUTES_MODE).
+
+Grows synthetic threads of each --lengths one email at a time and refreshes the
+attributes after every email, as Process-SQS-Queued-Emails does per inbound
+email, once per mode:
+
+- full:         the whole conversation is sent on every refresh.
+- incremental:  the saved attributes plus the emails after the thread's
+                watermark, with a full extraction every
+                --full-every updates (ATTRIBUTES_FULL_RECOMPUTE_EVERY).
+
+DynamoDB and DBSelect are in-memory fakes, the LLM is StubTogetherServer with
+prompt tokens estimated at 4 characters per token, and the LLM cache is off so
+every refresh is an LLM call. Reports, per thread length and mode, the full and
+incremental calls, total input tokens over the thread's life and the input
+tokens of the last refresh, then the savings. Exits non-zero if incremental
+mode does not save input tokens or leaves the watermark behind the thread.
+
+Usage:
+    python benchmarks/bench_incremental_attrs.py [--lengths 10,25,50,100] [--full-every 5] [--words 90]
+"""
+
+import argparse
+import json
+import random
+import sys
+
+import harness
+from harness import FakeDynamoResource, FakeLambdaClient, FakeTable, StubTogetherServer, load_lambda
+
+MODES = ("full", "incremental")
+ACCOUNT_ID = "acct-bench"
+BUYER, REALTOR = "buyer@example.com", "agent@realty.test"
+ATTRIBUTES_REPLY = ("ai_summary: Buyer comparing listings and scheduling tours\nbudget_range: $450k-$550k\n"
+                    "preferred_property_types: Single family home\ntimeline: Within three months")
+PHRASES = [
+    "Is the house on Oak St still available?", "We'd like to tour it this weekend if possible.",
+    "Our budget is around $500k and we're pre-approved.", "Could you send the HOA fees and property taxes?",
+    "The backyard looked smaller than in the photos.", "We're hoping to move before the school year starts.",
+    "Do you have any three bedroom listings closer to downtown?", "What did the comparable homes sell for?",
+    "The inspection report mentioned the roof, can we ask for a credit?", "Happy to set that up for you.",
+    "I've attached the disclosures and the listing sheet.", "The sellers are reviewing offers on Friday.",
+]
+
+
+def synthetic_thread(length, words, seed):
+    """Emails of one conversation, alternating buyer and realtor, about --words words each."""
+    rng = random.Random(seed)
+    emails = []
+    for i in range(length):
+        body, count = [], 0
+        while count < words:
+            phrase = rng.choice(PHRASES)
+            body.append(phrase)
+            count += len(phrase.split())
+        emails.append({
+            "conversation_id": f"conv-{length}", "response_id": f"r{i:04d}", "associated_account": ACCOUNT_ID,
+            "sender": REALTOR if i % 2 else BUYER, "subject": "Re: 12 Oak St", "body": " ".join(body),
+            "timestamp": f"2025-01-01T{i // 60:02d}:{i % 60:02d}:00Z",
+            "type": "outbound-email" if i % 2 else "inbound-email",
+        })
+    return emails
+
+
+def estimate_prompt_tokens(payload):
+    return sum(len(m["content"]) for m in payload["messages"]) // 4
+
+
+def run_thread(emails, mode, llm_url, args):
+    """Refresh after each email; returns the Invocations rows and the final Threads row."""
+    conversation_id = emails[0]["conversation_id"]
+    visible = []
+    lambda_client = FakeLambdaClient()
+    lambda_client.route("DBSelect", lambda payload: {"statusCode": 200, "body": json.dumps(visible)})
+    threads = FakeTable("Threads", ("conversation_id",), [{"conversation_id": conversation_id}])
+    invocations = FakeTable("Invocations", ("id",))
+    dynamodb = FakeDynamoResource([threads, invocations])
+    env = {"TOGETHER_API_URL": llm_url, "LLM_CACHE_ENABLED": "false", "ATTRIBUTES_MODE": mode,
+           "ATTRIBUTES_FULL_RECOMPUTE_EVERY": str(args.full_every)}
+    thread_logic = load_lambda("getThreadAttrs", module="thread_logic", env=env,
+                               dynamodb=dynamodb, lambda_client=lambda_client)
+    with harness.fake_aws(lambda_client, dynamodb, env):
+        for email in emails:
+            visible.append(email)
+            thread_logic.get_attributes_for_thread(conversation_id, ACCOUNT_ID, "bench-session")
+    rows = sorted(invocations.items.values(), key=lambda row: row["timestamp"])
+    return rows, threads.items[(conversation_id,)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", default="10,25,50,100", help="comma-separated thread lengths")
+    parser.add_argument("--full-every", type=int, default=5)
+    parser.add_argument("--words", type=int, default=90, help="words per email")
+    parser.add_argument("--llm-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    failed = []
+    print(f"{'emails':>6} {'mode':<12} {'full':>5} {'incr':>5} {'in_tokens':>10} {'last_refresh':>12} {'saved':>7}")
+    with StubTogetherServer(latency_ms=args.llm_ms, reply=ATTRIBUTES_REPLY, prompt_tokens=estimate_prompt_tokens,
+                            completion_tokens=40) as llm:
+        for length in (int(n) for n in args.lengths.split(",")):
+            emails = synthetic_thread(length, args.words, seed=length)
+            totals = {}
+            for mode in MODES:
+                rows, thread = run_thread(emails, mode, llm.url, args)
+                full = sum(row["llm_email_type"] == "thread_attributes" for row in rows)
+                incremental = len(rows) - full
+                total = totals[mode] = sum(row["input_tokens"] for row in rows)
+                saved = 1 - total / totals["full"] if totals.get("full") else 0.0
+                print(f"{length:>6} {mode:<12} {full:>5} {incremental:>5} {total:>10} "
+                      f"{rows[-1]['input_tokens']:>12} {100 * saved:>6.1f}%")
+                if thread.get("attributes_watermark_id") != emails[-1]["response_id"]:
+                    failed.append(f"{length}/{mode}: watermark {thread.get('attributes_watermark_id')}")
+            if length > 1 and totals["incremental"] >= totals["full"]:
+                failed.append(f"{length}: incremental used {totals['incremental']} input tokens, full {totals['full']}")
+    if failed:
+        sys.exit(f"failed: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+The content-addressed LLM result cache (llm_cache.py) at each classification call site.
+
+Each Lambda that ships llm_cache.py classifies the same input three times against
+StubTogetherServer (--llm-ms per request) and the in-memory DynamoDB fake
+(--dynamodb-ms per call):
+
+- miss:         first classification; LLM call, result stored in LLMCache.
+- local hit:    same container again; served from the in-memory LRU.
+- dynamodb hit: a fresh container (the module reloaded); one LLMCache read.
+
+Reports the latency and LLM requests of each run, and checks that every run
+returns the same result and that the hits are in Invocations with 0 tokens and
+cache_status 'cached'. Exits non-zero if a check fails.
+
+Usage:
+    python benchmarks/bench_llm_cache.py [--llm-ms 300] [--dynamodb-ms 5]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import harness
+from harness import FakeDynamoResource, FakeLambdaClient, FakeTable, StubTogetherServer, load_lambda
+
+CHAIN = [
+    {"sender": "buyer@example.com", "subject": "12 Oak St", "body": "Is it still available? Can I tour tomorrow?",
+     "timestamp": "2025-01-01T10:00:00Z", "type": "inbound-email", "message_id": "m1"},
+    {"sender": "agent@realty.test", "subject": "Re: 12 Oak St", "body": "It is! Saturday at 10 works.",
+     "timestamp": "2025-01-01T11:00:00Z", "type": "outbound-email", "message_id": "m2"},
+    {"sender": "buyer@example.com", "subject": "Re: 12 Oak St", "body": "Great, we're pre-approved too.",
+     "timestamp": "2025-01-01T12:00:00Z", "type": "inbound-email", "message_id": "m3"},
+]
+ATTRIBUTES_REPLY = ("ai_summary: Buyer wants to tour 12 Oak St and is pre-approved\nbudget_range: UNKNOWN\n"
+                    "preferred_property_types: Single family home\ntimeline: This week")
+
+# (Lambda, module, stub reply, llm_email_type of the Invocations rows, classify(module) -> result)
+SITES = [
+    ("GenerateEV", "ev_calculator", "37", "ev_calculation",
+     lambda m: m.calc_ev(CHAIN, "acct-bench", "conv-bench", "bench-session")[0]),
+    ("Process-SQS-Queued-Emails", "llm_interface", "not spam", "spam_detection",
+     lambda m: m.detect_spam("12 Oak St", CHAIN[0]["body"], CHAIN[0]["sender"], "acct-bench", "bench-session")),
+    ("getThreadAttrs", "llm_interface", ATTRIBUTES_REPLY, "thread_attributes",
+     lambda m: m.get_thread_attributes("\n".join(e["body"] for e in CHAIN), "acct-bench", "conv-bench")),
+    ("LCPLlmResponse", "llm_interface", "continuation_email", "selector_llm",
+     lambda m: m.select_scenario_with_llm(CHAIN, "conv-bench", "acct-bench", "bench-session")),
+]
+
+
+def run_site(name, module, reply, llm_email_type, classify, args):
+    lambda_client = FakeLambdaClient()
+    ok = {"statusCode": 200, "body": json.dumps({"message": "ok"})}
+    for function in ("RateLimitAI", "DBSelect"):
+        lambda_client.route(function, lambda payload: ok)
+    invocations = FakeTable("Invocations", ("id",))
+    dynamodb = FakeDynamoResource([invocations, FakeTable("Users", ("id",), [{"id": "acct-bench"}])],
+                                  latency_ms=args.dynamodb_ms)
+    runs, failed = [], []
+    with StubTogetherServer(latency_ms=args.llm_ms, reply=reply) as llm:
+        env = {"TOGETHER_API_URL": llm.url}
+        loaded = load_lambda(name, module=module, env=env, dynamodb=dynamodb, lambda_client=lambda_client)
+        for label, fresh in (("miss", False), ("local hit", False), ("dynamodb hit", True)):
+            if fresh:
+                loaded = load_lambda(name, module=module, env=env, dynamodb=dynamodb, lambda_client=lambda_client)
+            calls = llm.calls
+            with harness.fake_aws(lambda_client, dynamodb, env):
+                start = time.perf_counter()
+                result = classify(loaded)
+                elapsed_ms = (time.perf_counter() - start) * 1000.0
+            runs.append((label, elapsed_ms, llm.calls - calls, result))
+
+    results = {json.dumps(result, sort_keys=True) for *_, result in runs}
+    if len(results) != 1:
+        failed.append(f"results differ: {results}")
+    if [calls for _, _, calls, _ in runs] != [1, 0, 0]:
+        failed.append(f"LLM requests per run {[calls for _, _, calls, _ in runs]}, expected [1, 0, 0]")
+    cached = [row for row in invocations.items.values()
+              if row.get("llm_email_type") == llm_email_type and row.get("cache_status") == "cached"]
+    if not cached or any(row["input_tokens"] or row["output_tokens"] for row in cached):
+        failed.append("no 0-token cached Invocations row")
+
+    print(f"{name:<28} " + "  ".join(f"{label}={ms:.1f}ms/{calls} llm" for label, ms, calls, _ in runs)
+          + f"  {'ok' if not failed else 'FAILED: ' + '; '.join(failed)}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    failed = [name for name, *site in SITES if run_site(name, *site, args)]
+    if failed:
+        sys.exit(f"failed: {failed}")
+
+
+if __name__ == "__main__":
+    main()
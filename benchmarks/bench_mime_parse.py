@@ -0,0 +1,140 @@
+"""
+Inbound email parsing: parse_email (full message tree) versus parse_email_stream.
+
+Each (email, parser) pair runs in a fresh subprocess so peak RSS is not
+shared between runs. Reported per run:
+
+- parse time (median of ``--repeat`` parses),
+- peak RSS growth over the process baseline taken just before parsing,
+- peak Python heap during one parse (tracemalloc),
+- bytes of the message the parser actually read (stream parser only).
+
+The corpus covers a small plain-text reply, a single-part plain-text email
+larger than MAX_TEXT_PART_BYTES, a large HTML-only newsletter and multipart
+emails with attachments of increasing size. Exits non-zero if the stream parser
+returns more text than the cap or reads past it on the single-part email.
+
+Usage:
+    python benchmarks/bench_mime_parse.py [--repeat 5]
+"""
+
+import argparse
+import io
+import json
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from email.message import EmailMessage
+
+from harness import load_lambda
+
+CORPUS = {
+    "small-plain": {"html_kb": 0, "attachments_mb": []},
+    "single-plain-3MB": {"html_kb": 0, "attachments_mb": [], "plain_mb": 3},
+    "large-html": {"html_kb": 600, "attachments_mb": []},
+    "multipart-2MB": {"html_kb": 20, "attachments_mb": [2]},
+    "multipart-15MB": {"html_kb": 20, "attachments_mb": [5, 5, 5]},
+}
+
+REPLY = ("Hi, thanks for getting back to me. We'd like to see the house on Saturday "
+         "if possible; our budget is around 650k and we need three bedrooms.\n\n"
+         "On Mon, Oct 12, 2026 at 9:14 AM Agent <agent@bench.test> wrote:\n> Happy to help.\n")
+
+
+def build_email(name):
+    spec = CORPUS[name]
+    rng = random.Random(name)
+    msg = EmailMessage()
+    msg["From"] = "Bench Lead <lead@example.com>"
+    msg["To"] = "agent@bench.test"
+    msg["Subject"] = f"Re: Listing inquiry ({name})"
+    msg["Message-ID"] = f"<{name}@mail.bench.test>"
+    msg["In-Reply-To"] = "<previous@mail.bench.test>"
+    if spec["html_kb"] and name == "large-html":
+        rows = "".join(f"<tr><td>Listing {i}</td><td>${rng.randint(200, 900)}k</td></tr>"
+                       for i in range(spec["html_kb"] * 1024 // 48))
+        msg.set_content(f"<html><body><p>{REPLY}</p><table>{rows}</table></body></html>", subtype="html")
+    elif spec.get("plain_mb"):
+        filler = "".join(f"Listing {i}: ${rng.randint(200, 900)}k, {rng.randint(1, 5)} bedrooms.\n"
+                         for i in range(spec["plain_mb"] * 1024 * 1024 // 34))
+        msg.set_content(REPLY + filler)
+    else:
+        msg.set_content(REPLY)
+        if spec["html_kb"]:
+            msg.add_alternative(f"<html><body><p>{REPLY}</p>{'<br>' * spec['html_kb'] * 256}</body></html>",
+                                subtype="html")
+    for i, size_mb in enumerate(spec["attachments_mb"]):
+        msg.add_attachment(rng.randbytes(size_mb * 1024 * 1024), maintype="application",
+                           subtype="pdf", filename=f"disclosure-{i}.pdf")
+    return msg.as_bytes()
+
+
+def child(name, parser_name, repeat):
+    parser = load_lambda("Process-SQS-Queued-Emails", "parser")
+    raw = build_email(name)
+
+    def parse():
+        if parser_name == "parse_email":
+            return parser.parse_email(raw), None
+        stream = io.BytesIO(raw)
+        result = parser.parse_email_stream(stream)
+        return result, stream.tell()
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    (_, text), bytes_read = parse()
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse()
+        samples.append((time.perf_counter() - start) * 1000.0)
+
+    print(json.dumps({
+        "size": len(raw),
+        "ms": statistics.median(samples),
+        "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb,
+        "heap": heap_peak,
+        "read": bytes_read,
+        "cap": parser.MAX_TEXT_PART_BYTES,
+        "text_len": len(text),
+        "text": text[:60],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", nargs=2, metavar=("EMAIL", "PARSER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.repeat)
+        return
+
+    failed = []
+    for name in CORPUS:
+        for parser_name in ("parse_email", "parse_email_stream"):
+            out = subprocess.run([sys.executable, __file__, "--repeat", str(args.repeat), "--child", name, parser_name],
+                                 capture_output=True, text=True, check=True).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            read = f"{r['read'] / 1024:8.0f}KB" if r["read"] is not None else "     all"
+            print(f"{name:<15} {parser_name:<19} size={r['size'] / 1024:8.0f}KB read={read} "
+                  f"time={r['ms']:8.2f}ms rss+={r['rss_kb'] / 1024:6.1f}MB heap_peak={r['heap'] / 1048576:6.1f}MB "
+                  f"text={r['text'][:30]!r}")
+            if parser_name == "parse_email_stream" and CORPUS[name].get("plain_mb"):
+                # Headers plus at most one cap of body; only the body text counts against the cap
+                if r["text_len"] > r["cap"] or r["read"] > r["cap"] + 64 * 1024:
+                    failed.append(f"{name}: text={r['text_len']} read={r['read']} cap={r['cap']}")
+    if failed:
+        sys.exit(f"failed: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+DBSelect end-to-end latency with and without the ParseEvent hop.
+
+Runs the DBSelect ``lambda_handler`` in-process against fake AWS clients.
+Every ``lambda_client.invoke`` costs ``--invoke-ms`` of simulated round trip;
+sessions, users and rate-limit counters live in fake DynamoDB tables.
+
+- in-process: ``utils.parse_event`` decodes the event locally (current code).
+- with hop:   ``parse_event`` is swapped for the previous implementation,
+              which invoked the ParseEvent Lambda and re-decoded its body.
+
+Usage:
+    python benchmarks/bench_parse_event.py [--iterations 200] [--invoke-ms 15]
+"""
+
+import argparse
+import json
+
+from harness import FakeDynamoResource, FakeLambdaClient, FakeTable, load_lambda, summarize, time_calls
+
+ACCOUNT_ID = "acct-bench"
+SESSION_ID = "session-bench"
+
+
+def build_event():
+    return {
+        "httpMethod": "POST",
+        "headers": {"Cookie": f"session_id={SESSION_ID}; theme=dark"},
+        "body": json.dumps({
+            "table_name": "Threads",
+            "index_name": "associated_account-index",
+            "key_name": "associated_account",
+            "key_value": ACCOUNT_ID,
+            "account_id": ACCOUNT_ID,
+        }),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--invoke-ms", type=float, default=15.0,
+                        help="simulated latency of one synchronous Lambda invoke")
+    args = parser.parse_args()
+
+    lambda_client = FakeLambdaClient(latency_ms=args.invoke_ms)
+    dynamodb = FakeDynamoResource([
+        FakeTable("Sessions", ("session_id",), [
+            {"session_id": SESSION_ID, "associated_account": ACCOUNT_ID},
+        ]),
+        FakeTable("Users", ("id",), [{"id": ACCOUNT_ID, "rl_aws": 10 ** 9}]),
+        FakeTable("RL_AWS", ("associated_account",)),
+        FakeTable("Threads", ("conversation_id",), [
+            {"conversation_id": f"conv-{i}", "associated_account": ACCOUNT_ID, "read": True}
+            for i in range(20)
+        ]),
+    ])
+
+    parse_event_fn = load_lambda("ParseEvent", lambda_client=lambda_client, dynamodb=dynamodb)
+    db_select = load_lambda("DBSelect", lambda_client=lambda_client, dynamodb=dynamodb)
+
+    lambda_client.route("ParseEvent", lambda payload: parse_event_fn.lambda_handler(payload, None))
+
+    event = build_event()
+    in_process_parse = db_select.parse_event
+
+    def hop_parse_event(evt):
+        response = db_select.invoke_lambda("ParseEvent", evt)
+        return json.loads(response.get("body", "{}"))
+
+    def run():
+        response = db_select.lambda_handler(event, None)
+        assert response["statusCode"] == 200, response
+
+    results = {}
+    for label, parse_fn in (("in-process parse", in_process_parse), ("ParseEvent hop", hop_parse_event)):
+        db_select.parse_event = parse_fn
+        lambda_client.reset_calls()
+        results[label] = time_calls(run, args.iterations)
+        invokes = sum(lambda_client.calls.values()) / (args.iterations + 3)
+        print(f"{summarize(label, results[label])} invokes/request={invokes:.1f}")
+
+    saved = (sum(results["ParseEvent hop"]) - sum(results["in-process parse"])) / args.iterations
+    print(f"mean latency saved per request: {saved:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Response dispatch: one EventBridge schedule per LLM reply versus the response
+dispatch queue (Process-SQS-Queued-Emails/scheduling.py), plus the
+Sweep-Response-Schedules Lambda.
+
+Dispatches ``--replies`` replies from ``--workers`` threads (the inbound record
+concurrency) through ``dispatch_response`` in each mode. The Scheduler stub
+adds ``--scheduler-ms`` per call and admits ``--scheduler-tps`` calls per
+second (the account quota); the SQS stub adds ``--sqs-ms`` per send. Reports
+time spent dispatching on the inbound path, API calls, schedules created, and
+the Send-Email invocations needed to deliver everything (the
+queue is drained in batches of 10 through ``process_dispatch_batch``, with
+every 20th reply enqueued twice as a redelivery would).
+
+The sweep run deletes ``--leftover`` stale schedules with one worker and with
+SWEEP_CONCURRENCY workers.
+
+Usage:
+    python benchmarks/bench_response_dispatch.py [--replies 400] [--workers 5]
+                                                 [--scheduler-ms 40] [--scheduler-tps 50] [--sqs-ms 8]
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from harness import load_lambda, summarize
+
+QUEUE_URL = "https://sqs.us-east-2.amazonaws.com/000000000000/ResponseDispatchQueue"
+
+
+class FakeScheduler:
+    """create/delete/list_schedules with a per-call latency and a calls-per-second quota."""
+
+    class exceptions:
+        class ConflictException(Exception):
+            pass
+
+    def __init__(self, latency_ms, tps):
+        self.latency_ms = latency_ms
+        self.interval = 1.0 / tps
+        self.schedules = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            now = time.perf_counter()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now) + self.latency_ms / 1000.0)
+
+    def create_schedule(self, Name, **kwargs):
+        self._call()
+        with self._lock:
+            if Name in self.schedules:
+                raise self.exceptions.ConflictException(Name)
+            self.schedules[Name] = {"Name": Name, "GroupName": "default", **kwargs,
+                                    "CreationDate": datetime.now(timezone.utc)}
+
+    def delete_schedule(self, Name, **kwargs):
+        self._call()
+        with self._lock:
+            self.schedules.pop(Name, None)
+
+    def get_paginator(self, operation):
+        scheduler = self
+
+        class Paginator:
+            def paginate(self, NamePrefix="", **kwargs):
+                names = sorted(n for n in scheduler.schedules if n.startswith(NamePrefix))
+                for start in range(0, len(names), 100):
+                    scheduler._call()
+                    yield {"Schedules": [scheduler.schedules[n] for n in names[start:start + 100]]}
+
+        return Paginator()
+
+
+class FakeSQS:
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+        self.messages = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send_message(self, QueueUrl, MessageBody, DelaySeconds=0, MessageAttributes=None):
+        time.sleep(self.latency_ms / 1000.0)
+        with self._lock:
+            self.calls += 1
+            self.messages.append({
+                "messageId": f"m-{len(self.messages)}",
+                "body": MessageBody,
+                "eventSource": "aws:sqs",
+                "messageAttributes": {k: {"stringValue": v["StringValue"]} for k, v in (MessageAttributes or {}).items()},
+            })
+        return {"MessageId": f"m-{len(self.messages)}"}
+
+
+def payload(i):
+    return {"response_body": f"Reply {i}", "account": "acct-bench", "target": f"lead{i}@example.com",
+            "in_reply_to": f"<m{i}@mail.test>", "conversation_id": f"conv-{i}", "subject": "Listing",
+            "ev_score": 50, "account_id": "acct-bench", "session_id": "bench-admin-bypass"}
+
+
+def run_dispatch(mode, args):
+    scheduler, sqs = FakeScheduler(args.scheduler_ms, args.scheduler_tps), FakeSQS(args.sqs_ms)
+    scheduling = load_lambda("Process-SQS-Queued-Emails", "scheduling", env={
+        "RESPONSE_DISPATCH_MODE": mode, "RESPONSE_DISPATCH_QUEUE_URL": QUEUE_URL,
+    }, clients={"scheduler": scheduler, "sqs": sqs})
+    os.environ.setdefault("SCHEDULER_ROLE_ARN", "arn:aws:iam::000000000000:role/bench")  # read per call
+
+    jobs = list(range(args.replies)) + list(range(0, args.replies, 20))  # redeliveries
+    samples = []
+
+    def dispatch(i):
+        name = scheduling.generate_safe_schedule_name(f"process-email-m{i}mailtest")
+        start = time.perf_counter()
+        scheduling.dispatch_response(name, payload(i))
+        samples.append((time.perf_counter() - start) * 1000.0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(dispatch, jobs))
+    elapsed = time.perf_counter() - start
+
+    sent, skipped = set(), []
+    if mode == "queue":
+        send_logic = load_lambda("Send-Email", "send_email_logic")
+
+        def send(event):
+            # Stands in for the conditional 'busy' claim: a reply is sent at most once
+            if event["conversation_id"] in sent:
+                skipped.append(event["conversation_id"])
+                return {"message": "Thread not busy, email not sent."}
+            sent.add(event["conversation_id"])
+            return {"message": "sent"}
+
+        send_logic.process_and_send_email = send
+        invocations = 0
+        for start_index in range(0, len(sqs.messages), 10):
+            invocations += 1
+            send_logic.process_dispatch_batch(sqs.messages[start_index:start_index + 10])
+    else:
+        # Redeliveries hit ConflictException; each schedule invokes Send-Email once
+        invocations = len(scheduler.schedules)
+        sent = set(scheduler.schedules)
+
+    print(f"{mode:<10} replies={args.replies} wall={elapsed:6.2f}s api_calls={scheduler.calls + sqs.calls:<5} "
+          f"schedules_created={len(scheduler.schedules):<5} send_email_invocations={invocations:<4} "
+          f"sent={len(sent)} duplicates_skipped={len(skipped)}")
+    print("  " + summarize(f"{mode} dispatch per reply", samples))
+
+
+def run_sweep(args):
+    for concurrency in (1, None):
+        scheduler = FakeScheduler(args.scheduler_ms, args.scheduler_tps)
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        for i in range(args.leftover):
+            scheduler.schedules[f"process-email-{i:06d}"] = {"Name": f"process-email-{i:06d}", "CreationDate": old}
+        scheduler.schedules["process-email-pending"] = {"Name": "process-email-pending",
+                                                        "CreationDate": datetime.now(timezone.utc)}
+        env = {"SWEEP_CONCURRENCY": str(concurrency)} if concurrency else {}
+        sweeper = load_lambda("Sweep-Response-Schedules", env=env, clients={"scheduler": scheduler})
+        start = time.perf_counter()
+        summary = sweeper.lambda_handler({}, None)
+        elapsed = time.perf_counter() - start
+        print(f"sweep workers={sweeper.SWEEP_CONCURRENCY:<2} leftover={args.leftover} {summary} "
+              f"remaining={sorted(scheduler.schedules)} wall={elapsed:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--replies", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=5)
+    parser.add_argument("--scheduler-ms", type=float, default=40.0)
+    parser.add_argument("--scheduler-tps", type=float, default=50.0)
+    parser.add_argument("--sqs-ms", type=float, default=8.0)
+    parser.add_argument("--leftover", type=int, default=1000)
+    args = parser.parse_args()
+
+    run_dispatch("scheduler", args)
+    run_dispatch("queue", args)
+    run_sweep(args)
+
+
+if __name__ == "__main__":
+    main()
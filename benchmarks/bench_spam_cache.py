@@ -0,0 +1,101 @@
+"""
+Spam checks per inbound email: the LLM for every email versus the sender /
+domain verdict cache in Process-SQS-Queued-Emails/spam_cache.py.
+
+Replays a stream of emails to one account: newsletters sent from per-message
+bounce addresses of a few marketing domains, leads writing from gmail.com and
+their own domains (some emailing several times), and a spammer on gmail.com.
+The LLM check is a stub with ``--llm-ms`` latency whose verdict depends only
+on the sender. Reports LLM calls, cache hit rate (from the Invocations
+records), time per check, and misclassifications against the stub's verdicts.
+
+The allow/deny list run adds a deny entry for one lead's domain and an allow
+entry for the gmail.com spammer.
+
+Usage:
+    python benchmarks/bench_spam_cache.py [--emails 400] [--llm-ms 300] [--dynamodb-ms 5]
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+
+from harness import FakeDynamoResource, FakeTable, load_lambda
+
+ACCOUNT_ID = "acct-bench"
+
+
+def build_stream(n, rng):
+    newsletters = [f"news.brand{i}.test" for i in range(4)]
+    leads = [f"lead{i}@gmail.com" for i in range(25)] + [f"buyer{i}@family{i}.test" for i in range(10)]
+    stream = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.55:
+            sender = f"bounce-{rng.randrange(10 ** 6)}@{rng.choice(newsletters)}"
+        elif roll < 0.95:
+            sender = rng.choice(leads)
+        else:
+            sender = "deals.spammer@gmail.com"
+        stream.append(sender)
+    return stream
+
+
+def is_spam_sender(sender):
+    return sender.startswith("bounce-") or sender.startswith("deals.")
+
+
+def run(label, stream, args, lists=()):
+    dynamodb = FakeDynamoResource([
+        FakeTable("SpamVerdicts", ("id",), list(lists)),
+        FakeTable("Invocations", ("id",)),
+    ], latency_ms=args.dynamodb_ms)
+    cache_module = load_lambda("Process-SQS-Queued-Emails", "spam_cache", dynamodb=dynamodb)
+    cache = cache_module.SpamVerdictCache()
+    llm_calls = []
+
+    def classify(sender):
+        llm_calls.append(sender)
+        time.sleep(args.llm_ms / 1000.0)
+        return is_spam_sender(sender)
+
+    wrong = 0
+    start = time.perf_counter()
+    for sender in stream:
+        if label == "llm every email":
+            verdict = classify(sender)
+        else:
+            verdict = cache.check(sender, ACCOUNT_ID, lambda s=sender: classify(s))
+        expected = is_spam_sender(sender)
+        for entry in lists:
+            if entry["id"] in (f"{ACCOUNT_ID}#{sender}", f"{ACCOUNT_ID}#@{sender.split('@')[1]}"):
+                expected = entry["list"] == "deny"
+        wrong += verdict != expected
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter(i.get("cache_status") for i in dynamodb.Table("Invocations").items.values())
+    hits = sum(statuses.values())
+    print(f"{label:<16} emails={len(stream)} llm_calls={len(llm_calls):<4} "
+          f"hit_rate={100.0 * hits / len(stream):5.1f}% ms/check={elapsed * 1000.0 / len(stream):6.1f} "
+          f"misclassified={wrong}  {dict(statuses) if statuses else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=400)
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    stream = build_stream(args.emails, random.Random(7))
+    run("llm every email", stream, args)
+    run("verdict cache", stream, args)
+    run("with lists", stream, args, lists=[
+        {"id": f"{ACCOUNT_ID}#@family3.test", "list": "deny"},
+        {"id": f"{ACCOUNT_ID}#deals.spammer@gmail.com", "list": "allow"},
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Lambda invocations per processed email in Process-SQS-Queued-Emails.
+
+Feeds a small corpus of inbound emails (new threads plus replies) through the
+SQS handler against fake AWS clients and counts ``lambda_client.invoke`` calls
+per email, grouped by target function.
+
+- direct reads: the current code, reading through repository.py.
+- via DBSelect: repository reads are swapped for the previous implementation,
+                which invoked the DBSelect Lambda (and DBUpdate for the
+                Users.new_email flag).
+
+Spam detection is stubbed to "not spam" and LCP auto-response is off, so the
+counts cover the store / EV / thread-attribute path every email takes.
+
+Usage:
+    python benchmarks/bench_sqs_invocations.py [--threads 5] [--replies 3]
+"""
+
+import argparse
+import io
+import json
+from collections import Counter
+from contextlib import redirect_stdout
+
+from harness import (
+    DEFAULT_ENV, FakeDynamoResource, FakeLambdaClient, FakeS3, FakeTable,
+    load_lambda, make_eml, make_ses_sqs_record,
+)
+
+ACCOUNT_ID = "acct-bench"
+RESPONSE_EMAIL = "agent@bench.test"
+
+
+def build_corpus(s3, threads, replies):
+    records = []
+    for t in range(threads):
+        previous = None
+        for r in range(replies + 1):
+            message_id = f"t{t}-r{r}@mail.bench.test"
+            s3_key = f"ses-{t}-{r}"
+            subject = f"Listing inquiry {t}" if r == 0 else f"Re: Listing inquiry {t}"
+            s3.put_object(Bucket=DEFAULT_ENV["BUCKET_NAME"], Key=s3_key, Body=make_eml(
+                message_id, f"lead{t}@example.com", RESPONSE_EMAIL, subject,
+                f"Message {r} about the house on street {t}.",
+                in_reply_to=previous, references=[previous] if previous else None,
+            ))
+            records.append(make_ses_sqs_record(s3_key, f"lead{t}@example.com", RESPONSE_EMAIL, subject))
+            previous = message_id
+    return records
+
+
+def build_env():
+    lambda_client = FakeLambdaClient()
+    dynamodb = FakeDynamoResource([
+        FakeTable("Users", ("id",), [
+            {"id": ACCOUNT_ID, "responseEmail": RESPONSE_EMAIL, "lcp_automatic_enabled": "false"},
+        ]),
+        FakeTable("Sessions", ("session_id",)),
+        FakeTable("Conversations", ("conversation_id", "response_id")),
+        FakeTable("MessageIndex", ("msg_id",)),
+        FakeTable("EmailLedger", ("message_id",)),
+        FakeTable("Threads", ("conversation_id",)),
+    ])
+    s3 = FakeS3()
+
+    db_select = load_lambda("DBSelect", lambda_client=lambda_client, dynamodb=dynamodb)
+    processor = load_lambda("Process-SQS-Queued-Emails", lambda_client=lambda_client,
+                            dynamodb=dynamodb, clients={"s3": s3})
+
+    lambda_client.route("DBSelect", lambda payload: db_select.lambda_handler(payload, None))
+    lambda_client.route("DBUpdate", lambda payload: {"statusCode": 200, "body": json.dumps({"message": "ok"})})
+    lambda_client.route("GenerateEV", lambda payload: {
+        "statusCode": 200, "body": json.dumps({"status": "success", "ev_score": 42})})
+    lambda_client.route("getThreadAttrs", lambda payload: {
+        "statusCode": 200, "body": json.dumps({"attributes": {"Budget": "500k"}, "metadata": {}})})
+
+    processor.detect_spam = lambda **kwargs: False
+    return lambda_client, processor, s3, dynamodb
+
+
+def use_dbselect_reads(processor):
+    """Swap repository reads for the pre-repository DBSelect invocations."""
+    # db.py is not importable by name once the loader has purged it; reach it via a function it defines.
+    db_module = processor.get_thread.__globals__
+    repository = db_module["repository"]
+    invoke_db_select = db_module["invoke_db_select"]
+    invoke_lambda = db_module["invoke_lambda"]
+    auth_bp = DEFAULT_ENV["AUTH_BP"]
+
+    def first(result):
+        return result[0] if isinstance(result, list) and result else None
+
+    repository.get_account_by_response_email = lambda email: first(invoke_db_select(
+        "Users", "responseEmail-index", "responseEmail", email.lower(), "null", auth_bp))
+    repository.get_conversation_by_response_id = lambda response_id: first(invoke_db_select(
+        "Conversations", "response_id-index", "response_id", response_id, ACCOUNT_ID, auth_bp))
+    repository.get_thread = lambda conversation_id: first(invoke_db_select(
+        "Threads", "conversation_id-index", "conversation_id", conversation_id, ACCOUNT_ID, auth_bp))
+    repository.get_user = lambda account_id: first(invoke_db_select(
+        "Users", "id-index", "id", account_id, account_id, auth_bp))
+    processor.set_user_new_email_flag = lambda account_id: invoke_lambda("DBUpdate", {"body": json.dumps({
+        "table_name": "Users", "key_name": "id", "key_value": account_id, "index_name": "id-index",
+        "update_data": {"new_email": True}, "account_id": account_id, "session_id": auth_bp})})
+
+
+def run(label, threads, replies, legacy):
+    lambda_client, processor, s3, dynamodb = build_env()
+    if legacy:
+        use_dbselect_reads(processor)
+    records = build_corpus(s3, threads, replies)
+
+    with redirect_stdout(io.StringIO()):
+        for record in records:
+            processor.lambda_handler({"Records": [record]}, None)
+
+    calls = Counter(lambda_client.calls)
+    total = sum(calls.values())
+    breakdown = ", ".join(f"{fn}={n / len(records):.1f}" for fn, n in sorted(calls.items()))
+    threads_created = len(dynamodb.Table("Threads").items)
+    print(f"{label:<14} emails={len(records):<4} threads={threads_created:<3} "
+          f"invokes/email={total / len(records):5.2f}  ({breakdown})")
+    return total / len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--replies", type=int, default=3)
+    args = parser.parse_args()
+
+    before = run("via DBSelect", args.threads, args.replies, legacy=True)
+    after = run("direct reads", args.threads, args.replies, legacy=False)
+    print(f"invocations saved per email: {before - after:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Process-SQS-Queued-Emails batch throughput: serial versus concurrent records.
+
+Feeds SQS batches of inbound emails (new threads interleaved with their
+replies) through the handler against fake AWS clients. Downstreams are stubs
+with fixed latencies: ``--invoke-ms`` per Lambda invoke (GenerateEV,
+getThreadAttrs), ``--dynamodb-ms`` per DynamoDB call, ``--s3-ms`` per S3 read
+and ``--llm-ms`` for the spam check.
+
+Each run also checks correctness: every reply must land in its thread's
+conversation, and with ``--fail-thread N`` the GenerateEV stub fails for that
+thread, whose records must come back in ``batchItemFailures`` while the rest
+of the batch succeeds.
+
+Usage:
+    python benchmarks/bench_sqs_throughput.py [--threads 10] [--replies 2] [--batch-size 10]
+                                              [--concurrency 1 5 10] [--fail-thread 3]
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from harness import (
+    DEFAULT_ENV, FakeDynamoResource, FakeLambdaClient, FakeS3, FakeTable,
+    load_lambda, make_eml, make_ses_sqs_record,
+)
+
+ACCOUNT_ID = "acct-bench"
+RESPONSE_EMAIL = "agent@bench.test"
+
+
+def build_corpus(s3, threads, replies):
+    """Records in arrival order: round r of every thread, then round r + 1."""
+    records = []
+    for r in range(replies + 1):
+        for t in range(threads):
+            s3_key = f"ses-{t}-{r}"
+            previous = f"t{t}-r{r - 1}@mail.bench.test" if r else None
+            subject = f"Listing inquiry {t}" if r == 0 else f"Re: Listing inquiry {t}"
+            s3.put_object(Bucket=DEFAULT_ENV["BUCKET_NAME"], Key=s3_key, Body=make_eml(
+                f"t{t}-r{r}@mail.bench.test", f"lead{t}@example.com", RESPONSE_EMAIL, subject,
+                f"Message {r} about the house on street {t}.",
+                in_reply_to=previous, references=[previous] if previous else None,
+            ))
+            records.append(make_ses_sqs_record(s3_key, f"lead{t}@example.com", RESPONSE_EMAIL, subject))
+    return records
+
+
+def build_env(args):
+    lambda_client = FakeLambdaClient(latency_ms=args.invoke_ms)
+    dynamodb = FakeDynamoResource([
+        FakeTable("Users", ("id",), [
+            {"id": ACCOUNT_ID, "responseEmail": RESPONSE_EMAIL, "lcp_automatic_enabled": "false"},
+        ]),
+        FakeTable("Conversations", ("conversation_id", "response_id")),
+        FakeTable("MessageIndex", ("msg_id",)),
+        FakeTable("EmailLedger", ("message_id",)),
+        FakeTable("Threads", ("conversation_id",)),
+    ], latency_ms=args.dynamodb_ms)
+    s3 = FakeS3(latency_ms=args.s3_ms)
+    processor = load_lambda("Process-SQS-Queued-Emails", lambda_client=lambda_client,
+                            dynamodb=dynamodb, clients={"s3": s3})
+
+    failing_sender = f"lead{args.fail_thread}@example.com" if args.fail_thread is not None else None
+    conversations = dynamodb.Table("Conversations")
+
+    def generate_ev(payload):
+        senders = {i.get("sender") for i in conversations.items.values()
+                   if i.get("conversation_id") == payload["conversation_id"]}
+        if failing_sender in senders:
+            return {"statusCode": 500, "body": json.dumps({"status": "error"})}
+        return {"statusCode": 200, "body": json.dumps({"status": "success", "ev_score": 42})}
+
+    lambda_client.route("GenerateEV", generate_ev)
+    lambda_client.route("getThreadAttrs", lambda payload: {
+        "statusCode": 200, "body": json.dumps({"attributes": {"Budget": "500k"}, "metadata": {}})})
+
+    def detect_spam(**kwargs):
+        time.sleep(args.llm_ms / 1000.0)
+        return False
+
+    processor.detect_spam = detect_spam
+    # Injected failures log errors by design; keep the report readable.
+    logging.disable(logging.CRITICAL)
+    return processor, s3, dynamodb
+
+
+def run(args, concurrency):
+    processor, s3, dynamodb = build_env(args)
+    processor.SQS_RECORD_CONCURRENCY = concurrency
+    records = build_corpus(s3, args.threads, args.replies)
+
+    failed = []
+    start = time.perf_counter()
+    for i in range(0, len(records), args.batch_size):
+        response = processor.lambda_handler({"Records": records[i:i + args.batch_size]}, None)
+        failed.extend(f["itemIdentifier"] for f in response["batchItemFailures"])
+    elapsed = time.perf_counter() - start
+
+    # Every stored message of a thread must share one conversation id
+    by_sender = {}
+    for item in dynamodb.Table("Conversations").items.values():
+        by_sender.setdefault(item["sender"], set()).add(item["conversation_id"])
+    split_threads = sum(1 for ids in by_sender.values() if len(ids) > 1)
+
+    expected = set()
+    if args.fail_thread is not None:
+        expected = {f"sqs-ses-{args.fail_thread}-{r}" for r in range(args.replies + 1)}
+
+    print(f"concurrency={concurrency:<3} emails={len(records):<4} elapsed={elapsed:7.3f}s "
+          f"throughput={len(records) / elapsed:7.1f} emails/s  failed={len(failed)} "
+          f"split_threads={split_threads} failures_ok={set(failed) == expected}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--replies", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--invoke-ms", type=float, default=40.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0)
+    parser.add_argument("--s3-ms", type=float, default=20.0)
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    parser.add_argument("--fail-thread", type=int, default=None,
+                        help="make GenerateEV fail for this thread index")
+    args = parser.parse_args()
+
+    timings = {c: run(args, c) for c in args.concurrency}
+    baseline = timings[args.concurrency[0]]
+    for c, elapsed in timings.items():
+        print(f"speedup at concurrency={c}: {baseline / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Reply stripping: the previous line-by-line strip_quoted_reply versus the
+compiled single-pass matcher in Process-SQS-Queued-Emails/parser.py.
+
+1. Checks both implementations against the regression corpus (reply_corpus.py).
+2. Fuzzes them against each other on ``--fuzz`` random bodies assembled from
+   reply-like lines, marker lookalikes and noise; any difference is printed.
+3. Reports throughput (emails/s) on the corpus bodies with longer quoted
+   sections, at the Lambda's INFO log level with output discarded.
+
+Usage:
+    python benchmarks/bench_strip_reply.py [--fuzz 20000] [--seconds 2]
+"""
+
+import argparse
+import io
+import logging
+import random
+import re
+import time
+
+from harness import load_lambda
+from reply_corpus import CORPUS
+
+logger = logging.getLogger()
+
+
+def legacy_strip_quoted_reply(text):
+    """strip_quoted_reply as it was before the markers were compiled (verbatim)."""
+    if not text:
+        return text
+
+    reply_markers = [
+        r'^On .+?\d{4}.*wrote:$',
+        r'^On .+?\d{4}.*\n.*wrote:$',
+        r'^From:.*$',
+        r'^Sent:.*$',
+        r'^To:.*$',
+        r'^Subject:.*$',
+        r'^Date:.*$',
+        r'^Cc:.*$',
+        r'^Bcc:.*$',
+        r'^>.*$',
+        r'^--\s*$',
+        r'^_{2,}$',
+        r'^={2,}$',
+        r'^Begin forwarded message:$',
+        r'^Forwarded by .*$',
+        r'^From:.*\nSent:.*\nTo:.*$',
+        r'^On .* wrote:.*$',
+        r'^On .* \d{1,2}/\d{1,2}/\d{2,4}.*wrote:$',
+        r'^On .* \d{1,2} \w+ \d{4}.*wrote:$',
+    ]
+
+    lines = text.split('\n')
+    filtered_lines = []
+    in_quoted_section = False
+    consecutive_empty_lines = 0
+    original_line_count = len(lines)
+
+    for i, line in enumerate(lines):
+        line = line.rstrip()
+
+        if not in_quoted_section:
+            if any(re.match(pattern, line.strip(), re.IGNORECASE) for pattern in reply_markers):
+                logger.info(f"Found reply marker at line {i}: {line.strip()}")
+                in_quoted_section = True
+                continue
+
+            if i < len(lines) - 1:
+                next_line = lines[i + 1].strip()
+                combined = f"{line}\n{next_line}"
+                if any(re.match(pattern, combined, re.IGNORECASE) for pattern in reply_markers):
+                    logger.info(f"Found multi-line reply marker at line {i}")
+                    in_quoted_section = True
+                    continue
+
+        if not in_quoted_section:
+            if line.strip() == '':
+                consecutive_empty_lines += 1
+                if consecutive_empty_lines <= 2:
+                    filtered_lines.append(line)
+            else:
+                consecutive_empty_lines = 0
+                filtered_lines.append(line)
+
+    cleaned_text = '\n'.join(filtered_lines)
+    cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)
+    cleaned_text = cleaned_text.strip()
+
+    if len(cleaned_text) < 10 and original_line_count > 1:
+        logger.info(f"Stripping removed too much content (cleaned: {len(cleaned_text)} chars), restoring original")
+        return text.strip()
+
+    logger.info(f"Original text length: {len(text)}, Cleaned text length: {len(cleaned_text)}")
+    return cleaned_text
+
+
+FUZZ_LINES = [
+    "", " ", "  \t", "Thanks!", "Sounds good, see you then.", "We can do 3pm.", "ok",
+    "On Mon, Oct 12, 2026 at 9:14 AM Jane <jane@realty.test> wrote:",
+    "On Mon, Oct 12, 2026 at 9:14 AM Jane <jane@realty.test>", "wrote:", "  wrote:",
+    "on 12/10/2026 jane wrote:", "On 12 October 2026 Jane wrote:", "On second thought, 2027 works.",
+    "On my way", "ON TUESDAY 2026", "  On Mon, 2026", "On x wrote: extra", "On", "On ",
+    "From: Jane", "from:", " From: indented", "Sent: Monday", "To: Bob", "Subject: Re: 12 Oak",
+    "Date: today", "Cc: x", "Bcc: y", "> quoted", ">", "  > indented quote", "--", "-- ", "---",
+    "-----Original Message-----", "__", "________________________________", "_", "==", "=====", "=",
+    "Begin forwarded message:", "begin forwarded message: ", "Forwarded by Jane", "Forwarded by",
+    "\r", "Budget is 500k\r", "Tomorrow, 2026 wrote:", "x" * 200,
+]
+
+
+def fuzz_body(rng):
+    lines = [rng.choice(FUZZ_LINES) for _ in range(rng.randint(0, 12))]
+    return rng.choice(["\n", "\r\n"]).join(lines) + rng.choice(["", "\n", " "])
+
+
+def throughput(fn, bodies, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for body in bodies:
+            fn(body)
+        count += len(bodies)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fuzz", type=int, default=20000)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--quoted-lines", type=int, default=40,
+                        help="quoted lines appended to each corpus body for the throughput run")
+    args = parser.parse_args()
+
+    email_parser = load_lambda("Process-SQS-Queued-Emails", "parser")
+    # Keep the INFO records flowing (as in the Lambda) but discard the output.
+    logging.getLogger().handlers[:] = [logging.StreamHandler(io.StringIO())]
+    logging.getLogger().setLevel(logging.INFO)
+
+    failures = 0
+    for case in CORPUS:
+        for label, fn in (("legacy", legacy_strip_quoted_reply), ("compiled", email_parser.strip_quoted_reply)):
+            got = fn(case["text"])
+            if got != case["expected"]:
+                failures += 1
+                print(f"corpus mismatch {label} {case['client']}/{case['name']}: {got!r}")
+    print(f"corpus: {len(CORPUS)} replies, {failures} mismatches")
+
+    rng = random.Random(0)
+    differences = 0
+    for _ in range(args.fuzz):
+        body = fuzz_body(rng)
+        old, new = legacy_strip_quoted_reply(body), email_parser.strip_quoted_reply(body)
+        if old != new:
+            differences += 1
+            if differences <= 5:
+                print(f"fuzz difference on {body!r}: {old!r} != {new!r}")
+    print(f"fuzz: {args.fuzz} bodies, {differences} differences")
+
+    quoted = "\n".join(f"> line {i} of the earlier message in the thread" for i in range(args.quoted_lines))
+    bodies = [f"{case['text']}\n{quoted}" for case in CORPUS]
+    for label, fn in (("legacy", legacy_strip_quoted_reply), ("compiled", email_parser.strip_quoted_reply)):
+        print(f"{label:<9} {throughput(fn, bodies, args.seconds):10.0f} emails/s")
+
+
+if __name__ == "__main__":
+    main()
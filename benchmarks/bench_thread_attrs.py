@@ -0,0 +1,138 @@
+"""
+Thread-attribute refreshes per inbound email in Process-SQS-Queued-Emails.
+
+Runs SQS batches through the processor with the real getThreadAttrs and
+DBSelect handlers behind the fake Lambda client. The getThreadAttrs LLM call
+is stubbed with ``--llm-ms`` of latency and counted.
+
+- previous:     two synchronous getThreadAttrs calls per email (after storing,
+                and again at the end of the pipeline), each calling the LLM.
+- deferred:     one asynchronous refresh per changed conversation per batch;
+                getThreadAttrs skips the LLM when the chain is unchanged.
+- refresh again: every conversation refreshed once more with no new email;
+                the content hash matches, so no LLM calls are made.
+
+Usage:
+    python benchmarks/bench_thread_attrs.py [--threads 5] [--replies 3] [--batch-size 10]
+"""
+
+import argparse
+import io
+import json
+import logging
+import time
+from contextlib import redirect_stdout
+
+from harness import FakeDynamoResource, FakeLambdaClient, FakeS3, FakeTable, load_lambda
+from bench_sqs_throughput import build_corpus
+
+ACCOUNT_ID = "acct-bench"
+RESPONSE_EMAIL = "agent@bench.test"
+
+
+class LegacyRefresh:
+    """The previous behaviour: refresh synchronously, twice per email, always calling the LLM."""
+
+    def __init__(self, lambda_client):
+        self.lambda_client = lambda_client
+
+    def request(self, conversation_id, account_id):
+        payload = json.dumps({"body": json.dumps({
+            "conversationId": conversation_id, "accountId": account_id, "force": True})})
+        for _ in range(2):
+            self.lambda_client.invoke(FunctionName="getThreadAttrs", InvocationType="RequestResponse", Payload=payload)
+
+    def flush(self):
+        return 0
+
+
+def build_env(args):
+    lambda_client = FakeLambdaClient(latency_ms=args.invoke_ms)
+    dynamodb = FakeDynamoResource([
+        FakeTable("Users", ("id",), [
+            {"id": ACCOUNT_ID, "responseEmail": RESPONSE_EMAIL, "lcp_automatic_enabled": "false"},
+        ]),
+        FakeTable("Conversations", ("conversation_id", "response_id")),
+        FakeTable("MessageIndex", ("msg_id",)),
+        FakeTable("EmailLedger", ("message_id",)),
+        FakeTable("Threads", ("conversation_id",)),
+        FakeTable("Invocations", ("id",)),
+    ], latency_ms=args.dynamodb_ms)
+    s3 = FakeS3()
+
+    db_select = load_lambda("DBSelect", lambda_client=lambda_client, dynamodb=dynamodb)
+    thread_attrs = load_lambda("getThreadAttrs", lambda_client=lambda_client, dynamodb=dynamodb)
+    processor = load_lambda("Process-SQS-Queued-Emails", lambda_client=lambda_client,
+                            dynamodb=dynamodb, clients={"s3": s3})
+
+    llm_calls = []
+
+    def get_thread_attributes(conversation_text, account_id=None, conversation_id=None, previous_attributes=None):
+        llm_calls.append(conversation_id)
+        time.sleep(args.llm_ms / 1000.0)
+        return {"ai_summary": "Lead asking about a listing", "budget_range": "UNKNOWN",
+                "preferred_property_types": "Single family", "timeline": "Next few months"}
+
+    # thread_logic is not importable by name once the loader has purged it; reach it via its function.
+    thread_attrs.get_attributes_for_thread.__globals__["get_thread_attributes"] = get_thread_attributes
+
+    lambda_client.route("DBSelect", lambda payload: db_select.lambda_handler(payload, None))
+    lambda_client.route("getThreadAttrs", lambda payload: thread_attrs.lambda_handler(payload, None))
+    lambda_client.route("GenerateEV", lambda payload: {
+        "statusCode": 200, "body": json.dumps({"status": "success", "ev_score": 42})})
+    processor.detect_spam = lambda **kwargs: False
+    logging.disable(logging.CRITICAL)
+    return lambda_client, processor, s3, dynamodb, llm_calls
+
+
+def deliver(processor, lambda_client, records, batch_size):
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for i in range(0, len(records), batch_size):
+            processor.lambda_handler({"Records": records[i:i + batch_size]}, None)
+        elapsed = time.perf_counter() - start
+        lambda_client.drain()
+    return elapsed
+
+
+def report(label, records, elapsed, lambda_client, llm_calls, dynamodb):
+    attributed = sum(1 for t in dynamodb.Table("Threads").items.values() if t.get("ai_summary"))
+    print(f"{label:<12} emails={len(records):<4} processor_ms/email={elapsed * 1000.0 / len(records):7.1f} "
+          f"getThreadAttrs/email={lambda_client.calls['getThreadAttrs'] / len(records):4.2f} "
+          f"llm_calls/email={len(llm_calls) / len(records):4.2f} threads_with_attrs={attributed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--replies", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--invoke-ms", type=float, default=20.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=2.0)
+    parser.add_argument("--llm-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    lambda_client, processor, s3, dynamodb, llm_calls = build_env(args)
+    processor.thread_attrs_refresh = LegacyRefresh(lambda_client)
+    records = build_corpus(s3, args.threads, args.replies)
+    elapsed = deliver(processor, lambda_client, records, args.batch_size)
+    report("previous", records, elapsed, lambda_client, llm_calls, dynamodb)
+
+    lambda_client, processor, s3, dynamodb, llm_calls = build_env(args)
+    records = build_corpus(s3, args.threads, args.replies)
+    elapsed = deliver(processor, lambda_client, records, args.batch_size)
+    report("deferred", records, elapsed, lambda_client, llm_calls, dynamodb)
+
+    lambda_client.reset_calls()
+    llm_calls.clear()
+    for conversation_id in list(dynamodb.Table("Threads").items):
+        processor.thread_attrs_refresh.request(conversation_id[0], ACCOUNT_ID)
+    with redirect_stdout(io.StringIO()):
+        processor.thread_attrs_refresh.flush()
+        lambda_client.drain()
+    print(f"{'refresh again':<12} threads={len(dynamodb.Table('Threads').items):<3} "
+          f"getThreadAttrs={lambda_client.calls['getThreadAttrs']} llm_calls={len(llm_calls)}")
+
+
+if __name__ == "__main__":
+    main()
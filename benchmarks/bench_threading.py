@@ -0,0 +1,107 @@
+"""
+Inbound email threading: the previous In-Reply-To / References lookups versus
+the MessageIndex batched lookup in Process-SQS-Queued-Emails.
+
+Builds conversations of ``--depth`` messages alternating between the lead and
+the agent (stored the way the processor and Send-Email store them), then
+threads a new reply from the lead in three shapes:
+
+- direct:          In-Reply-To is the last stored message.
+- unseen-parent:   the agent answered from their own mail client, so
+                   In-Reply-To is a message the system never stored; the
+                   References chain still contains the stored messages.
+- references-only: no In-Reply-To header, only References.
+
+Reports the share of replies threaded into the right conversation and the
+DynamoDB round trips per reply.
+
+Usage:
+    python benchmarks/bench_threading.py [--conversations 50] [--depth 6]
+"""
+
+import argparse
+from email import message_from_bytes, policy
+
+from harness import FakeDynamoResource, FakeTable, load_lambda, make_eml
+
+ACCOUNT_ID = "acct-bench"
+RESPONSE_EMAIL = "agent@bench.test"
+SHAPES = ("direct", "unseen-parent", "references-only")
+
+
+def build_env(conversations, depth):
+    dynamodb = FakeDynamoResource([
+        FakeTable("Conversations", ("conversation_id", "response_id")),
+        FakeTable("MessageIndex", ("msg_id",)),
+    ])
+    processor = load_lambda("Process-SQS-Queued-Emails", dynamodb=dynamodb)
+    db = processor.find_conversation_id.__globals__
+
+    chains = {}
+    for c in range(conversations):
+        conversation_id = f"conv-{c}"
+        chain = []
+        for m in range(depth):
+            msg_id = f"c{c}-m{m}"
+            timestamp = f"2026-10-{1 + m:02d}T09:00:00Z"
+            dynamodb.Table("Conversations").put_item(Item={
+                "conversation_id": conversation_id, "response_id": msg_id, "timestamp": timestamp,
+                "associated_account": ACCOUNT_ID, "type": "outbound-email" if m % 2 else "inbound-email",
+            })
+            db["index_message"](msg_id, conversation_id, ACCOUNT_ID, timestamp)
+            chain.append(msg_id)
+        chains[conversation_id] = chain
+    dynamodb.reset_calls()
+    return dynamodb, processor, db, chains
+
+
+def reply_headers(parser, chain, shape, n):
+    references = [f"{ref}@mail.bench.test" for ref in chain]
+    in_reply_to = references[-1]
+    if shape == "unseen-parent":
+        in_reply_to = f"manual-{n}@gmail.test"
+        references.append(in_reply_to)
+    elif shape == "references-only":
+        in_reply_to = None
+    raw = make_eml(f"reply-{n}@example.com", "lead@example.com", RESPONSE_EMAIL, "Re: Listing",
+                   "Sounds good.", in_reply_to=in_reply_to, references=references)
+    _, in_reply_to, references = parser.extract_email_headers(message_from_bytes(raw, policy=policy.default))
+    return {"in_reply_to": in_reply_to, "references": references}
+
+
+def legacy_resolve(db, email, account):
+    """The previous lookup: In-Reply-To, then the whole References string as one response_id."""
+    conv_id = None
+    if email["in_reply_to"]:
+        conv_id = db["get_conversation_id"](email["in_reply_to"], account, "")
+    if not conv_id and email["references"]:
+        conv_id = db["get_conversation_id"](email["references"], account, "")
+    return conv_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=6)
+    args = parser.parse_args()
+
+    dynamodb, processor, db, chains = build_env(args.conversations, args.depth)
+    email_parser = load_lambda("Process-SQS-Queued-Emails", "parser")
+
+    for shape in SHAPES:
+        for label in ("previous", "message-index"):
+            correct = 0
+            dynamodb.reset_calls()
+            for n, (conversation_id, chain) in enumerate(chains.items()):
+                email = reply_headers(email_parser, chain, shape, n)
+                if label == "previous":
+                    conv_id = legacy_resolve(db, email, ACCOUNT_ID)
+                else:
+                    conv_id = processor.resolve_conversation(email, ACCOUNT_ID)["conv_id"]
+                correct += conv_id == conversation_id
+            print(f"{shape:<16} {label:<14} threaded={100.0 * correct / len(chains):5.1f}% "
+                  f"dynamodb_calls/reply={dynamodb.total_calls() / len(chains):4.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+together_client.py against a local Together AI stub that injects faults.
+
+Every Lambda that calls Together AI ships its own copy of together_client.py
+(GenerateEV, LCPLlmResponse, Process-SQS-Queued-Emails, getThreadAttrs). Each
+copy is loaded with short timeouts and backoff and run through these scenarios
+against StubTogetherServer (harness.py):
+
+- ok:                 one attempt; content and usage come back typed.
+- 503-then-ok:        retried, succeeds on the second attempt.
+- 429-retry-after:    the retry waits at least the Retry-After delay.
+- 429-long-retry:     a Retry-After beyond the backoff cap is not waited out.
+- 503-exhausted:      TOGETHER_MAX_ATTEMPTS attempts, then TogetherError(503).
+- 400-no-retry:       client errors fail at once.
+- slow-then-ok:       a response slower than the read timeout is retried.
+- bad-body:           a 200 without choices raises TogetherError.
+
+It then times ``--calls`` sequential requests through the shared keep-alive
+pool against a fresh connection per request (the previous behaviour of the
+call sites that built their own pools per cold start or used bare
+``requests.post``). Exits non-zero if any scenario fails.
+
+Usage:
+    python benchmarks/bench_together_client.py [--calls 200] [--latency-ms 2]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import urllib3
+
+from harness import StubTogetherServer, load_lambda
+
+LAMBDAS = ("GenerateEV", "LCPLlmResponse", "Process-SQS-Queued-Emails", "getThreadAttrs")
+ENV = {
+    "TOGETHER_CONNECT_TIMEOUT": "0.5",
+    "TOGETHER_READ_TIMEOUT": "0.3",
+    "TOGETHER_MAX_ATTEMPTS": "3",
+    "TOGETHER_BACKOFF_BASE": "0.02",
+    "TOGETHER_BACKOFF_MAX": "1",
+}
+PAYLOAD = {"model": "bench", "messages": [{"role": "user", "content": "hello"}]}
+
+
+def expect_error(client, server, status):
+    try:
+        client.chat_completion(PAYLOAD, api_key="bench", url=server.url)
+    except client.TogetherError as e:
+        return e.status == status
+    return False
+
+
+def scenarios(client):
+    """(name, faults, check(client, server) -> bool)"""
+    def call(server):
+        return client.chat_completion(PAYLOAD, api_key="bench", url=server.url)
+
+    def ok(server):
+        result = call(server)
+        return (result.content == "not spam" and result.attempts == 1 and server.calls == 1
+                and result.usage == client.LLMUsage(400, 5, 405) and result.latency_ms > 0)
+
+    def retry_after(server):
+        result = call(server)
+        return result.attempts == 2 and server.arrivals[1] - server.arrivals[0] >= 0.3
+
+    return [
+        ("ok", [], ok),
+        ("503-then-ok", [{"status": 503}], lambda s: call(s).attempts == 2 and s.calls == 2),
+        ("429-retry-after", [{"status": 429, "headers": {"Retry-After": "0.3"}}], retry_after),
+        ("429-long-retry", [{"status": 429, "headers": {"Retry-After": "60"}}],
+         lambda s: expect_error(client, s, 429) and s.calls == 1),
+        ("503-exhausted", [{"status": 503}] * 3, lambda s: expect_error(client, s, 503) and s.calls == 3),
+        ("400-no-retry", [{"status": 400}], lambda s: expect_error(client, s, 400) and s.calls == 1),
+        ("slow-then-ok", [{"delay_ms": 600}], lambda s: call(s).attempts == 2 and s.calls == 2),
+        ("bad-body", [{"status": 200, "body": {"id": "x"}}], lambda s: expect_error(client, s, 200) and s.calls == 1),
+    ]
+
+
+def run_scenarios(name):
+    client = load_lambda(name, module="together_client", env=ENV)
+    failed = []
+    for scenario, faults, check in scenarios(client):
+        with StubTogetherServer(faults=faults) as server:
+            try:
+                passed = check(server)
+            except Exception as e:
+                passed = False
+                print(f"  {scenario}: {type(e).__name__}: {e}")
+        if not passed:
+            failed.append(scenario)
+    print(f"{name:<28} scenarios={len(scenarios(client))} failed={failed or 'none'}")
+    return failed
+
+
+def time_pooling(args):
+    client = load_lambda("GenerateEV", module="together_client")
+    with StubTogetherServer(latency_ms=args.latency_ms) as server:
+        pooled = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            client.chat_completion(PAYLOAD, api_key="bench", url=server.url)
+            pooled.append((time.perf_counter() - start) * 1000.0)
+        fresh = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            http = urllib3.PoolManager()
+            http.request("POST", server.url, body=b"{}", headers={"Content-Type": "application/json"})
+            http.clear()
+            fresh.append((time.perf_counter() - start) * 1000.0)
+    print(f"keep-alive pool      calls={args.calls} p50={statistics.median(pooled):.2f}ms")
+    print(f"new connection each  calls={args.calls} p50={statistics.median(fresh):.2f}ms "
+          "(local loopback; TLS to the real endpoint adds a handshake per connection)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    failed = [(name, s) for name in LAMBDAS for s in run_scenarios(name)]
+    time_pooling(args)
+    if failed:
+        sys.exit(f"failed: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Offline A/B of the GenerateEV scoring modes (EV_SCORING_MODE in GenerateEV/config.py).
+
+Scores each stored thread twice through ev_logic: ``separate`` (calc_ev, then
+the flag LLM) and ``combined`` (one calc_ev_and_flag call). Reports, per mode,
+LLM calls, input/output tokens, AI rate limit reservations and latency per
+thread, then how far the two modes agree: mean and max absolute EV difference,
+EV within --tolerance points, and flag agreement.
+
+DynamoDB and the RateLimitAI Lambda are in-memory fakes. The LLM is the live
+Together AI API with --live (TAI_KEY from the environment, real tokens are
+spent), otherwise StubTogetherServer with a keyword-based reply and prompt
+tokens estimated at 4 characters per token, which checks the plumbing and the
+token savings but not score agreement.
+
+Sources:
+    --aws               inbound/outbound rows of the Conversations table,
+                        grouped by conversation_id (newest --limit threads).
+    --threads-file F    JSON {"conversation_id": [{"sender", "subject", "body"}, ...]}.
+    (default)           a small synthetic set of threads.
+
+Usage:
+    python benchmarks/eval_ev_scoring.py [--live] [--llm-ms 300] [--tolerance 5] [--show-threads]
+    python benchmarks/eval_ev_scoring.py --aws [--table Conversations] [--limit 200] --live
+    python benchmarks/eval_ev_scoring.py --threads-file threads.json --live
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+
+from harness import FakeDynamoResource, FakeLambdaClient, FakeTable, StubTogetherServer, load_lambda
+
+MODES = ("separate", "combined")
+REALTOR = "agent@realty.test"
+
+
+def demo_threads():
+    """conversation_id -> chain, from early browsing to ready-to-offer."""
+    def chain(*turns):
+        return [{"sender": REALTOR if i % 2 else "buyer@example.com", "subject": "Re: 12 Oak St",
+                 "body": body, "timestamp": f"2025-01-0{i + 1}T10:00:00Z",
+                 "type": "outbound-email" if i % 2 else "inbound-email"} for i, body in enumerate(turns)]
+
+    return {
+        "browsing": chain("Hi, just curious what the neighborhood is like."),
+        "availability": chain("Is 12 Oak St still available?", "Yes it is! Would you like details?",
+                              "Maybe, I'm looking at a few places next month."),
+        "tour": chain("Is 12 Oak St still available?", "It is. Happy to show it.",
+                      "Can I tour it tomorrow? We're pre-approved."),
+        "financing": chain("What would the monthly payment be with 10% down?", "Roughly $2,400.",
+                           "Great, can you send me a lender for pre-approval?"),
+        "offer": chain("We loved the house.", "Glad to hear it!",
+                       "Looks perfect. Let's make an offer, what are the next steps?"),
+        "hesitant": chain("The price seems high and the yard is small.", "It's priced to the market.",
+                          "I'm not sure, we'll think about it."),
+    }
+
+
+def file_threads(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def aws_threads(table_name, region, limit):
+    import boto3
+
+    table = boto3.resource("dynamodb", region_name=region).Table(table_name)
+    threads = defaultdict(list)
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        for item in response.get("Items", []):
+            if item.get("type") in ("inbound-email", "outbound-email") and item.get("conversation_id"):
+                threads[item["conversation_id"]].append(item)
+        if "LastEvaluatedKey" not in response:
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    # Same shape as GenerateEV db.get_email_chain
+    newest = sorted(threads, key=lambda c: max(i.get("timestamp", "") for i in threads[c]), reverse=True)
+    return {
+        conversation_id: [{
+            "subject": item.get("subject", ""), "body": item.get("body", ""), "sender": item.get("sender", ""),
+            "timestamp": item.get("timestamp", ""), "type": item.get("type", ""),
+            "message_id": item.get("response_id"),
+        } for item in sorted(threads[conversation_id], key=lambda x: x.get("timestamp", ""))]
+        for conversation_id in newest[:limit]
+    }
+
+
+def stub_reply(payload):
+    """A plausible reply to the EV, flag or combined prompt from keywords in the thread."""
+    system, thread = payload["messages"][0]["content"], payload["messages"][-1]["content"].lower()
+    score = 12
+    for words, points in ((("tour", "viewing", "see it"), 18), (("pre-approv", "lender", "down"), 14),
+                          (("offer", "next steps", "contract"), 27), (("perfect", "loved"), 16),
+                          (("not sure", "think about", "maybe", "high"), -8)):
+        if any(w in thread for w in words):
+            score += points
+    score = max(0, min(100, score + thread.count("re:")))
+    flag = "flag" if score >= 60 else "ok"
+    if system.startswith("You make two assessments"):
+        return f"{score};{flag}"
+    return flag if system.startswith("You are an assistant that evaluates") else str(score)
+
+
+def estimate_prompt_tokens(payload):
+    return sum(len(m["content"]) for m in payload["messages"]) // 4
+
+
+def score_threads(ev_logic, lambda_client, threads):
+    """Per mode: {conversation_id: {"ev", "flag", "ms", "llm_calls", "reservations", "input_tokens", "output_tokens"}}."""
+    metrics = ev_logic.metrics
+    scorers = {"separate": ev_logic.score_separately, "combined": ev_logic.score_combined}
+    results = {mode: {} for mode in MODES}
+    for conversation_id, chain in threads.items():
+        for mode in MODES:
+            metrics.reset()
+            lambda_client.reset_calls()
+            start = time.perf_counter()
+            try:
+                ev, flag, usage_ev, usage_flag = scorers[mode](chain, "acct-eval", conversation_id, "eval-session")
+            except ev_logic.LambdaError as e:
+                print(f"  {mode} {conversation_id}: {e.message}")
+                continue
+            results[mode][conversation_id] = {
+                "ev": ev, "flag": flag, "ms": (time.perf_counter() - start) * 1000.0,
+                "llm_calls": metrics.counters.get("LLMCalls", 0),
+                "reservations": lambda_client.calls.get("RateLimitAI", 0),
+                "input_tokens": usage_ev["input_tokens"] + usage_flag["input_tokens"],
+                "output_tokens": usage_ev["output_tokens"] + usage_flag["output_tokens"],
+            }
+    return results
+
+
+def report(results, tolerance, show_threads):
+    print(f"{'mode':<10} {'threads':>7} {'llm_calls':>9} {'rate_limit':>10} {'in_tokens':>10} {'out_tokens':>10} "
+          f"{'p50_ms':>8} {'p95_ms':>8}")
+    totals = {}
+    for mode in MODES:
+        rows = list(results[mode].values())
+        if not rows:
+            print(f"{mode:<10} {0:>7}")
+            continue
+        ms = sorted(r["ms"] for r in rows)
+        total = totals[mode] = {key: sum(r[key] for r in rows)
+                                for key in ("llm_calls", "reservations", "input_tokens", "output_tokens", "ms")}
+        print(f"{mode:<10} {len(rows):>7} {total['llm_calls']:>9g} {total['reservations']:>10} "
+              f"{total['input_tokens']:>10} {total['output_tokens']:>10} {statistics.median(ms):>8.1f} "
+              f"{ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]:>8.1f}")
+
+    both = sorted(set(results["separate"]) & set(results["combined"]))
+    if not both:
+        return
+    if len(totals) == 2:
+        saved = {key: 1 - totals["combined"][key] / totals["separate"][key] if totals["separate"][key] else 0.0
+                 for key in ("llm_calls", "input_tokens", "ms")}
+        print(f"combined saves: llm_calls={100 * saved['llm_calls']:.1f}% input_tokens={100 * saved['input_tokens']:.1f}% "
+              f"latency={100 * saved['ms']:.1f}%")
+    diffs = [abs(results["separate"][c]["ev"] - results["combined"][c]["ev"]) for c in both]
+    flags_agree = sum(results["separate"][c]["flag"] == results["combined"][c]["flag"] for c in both)
+    print(f"agreement on {len(both)} threads: mean_abs_ev_diff={statistics.mean(diffs):.1f} max_abs_ev_diff={max(diffs)} "
+          f"ev_within_{tolerance}={100.0 * sum(d <= tolerance for d in diffs) / len(both):.1f}% "
+          f"flag_agreement={100.0 * flags_agree / len(both):.1f}%")
+    if show_threads:
+        for c in both:
+            s, m = results["separate"][c], results["combined"][c]
+            print(f"  {c:<32} separate={s['ev']:>3}/{'flag' if s['flag'] else 'ok':<4} "
+                  f"combined={m['ev']:>3}/{'flag' if m['flag'] else 'ok':<4}")
+
+
+def run(args, threads, llm_url=None):
+    lambda_client = FakeLambdaClient()
+    lambda_client.route("RateLimitAI", lambda payload: {"statusCode": 200, "body": json.dumps({"message": "ok"})})
+    dynamodb = FakeDynamoResource([FakeTable("Invocations", ("id",))])
+    env = {"TOGETHER_API_URL": llm_url} if llm_url else {"TAI_KEY": os.environ["TAI_KEY"]}
+    ev_logic = load_lambda("GenerateEV", module="ev_logic", env=env, dynamodb=dynamodb, lambda_client=lambda_client)
+    report(score_threads(ev_logic, lambda_client, threads), args.tolerance, args.show_threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--aws", action="store_true")
+    parser.add_argument("--table", default="Conversations")
+    parser.add_argument("--region", default=os.environ.get("AWS_REGION", "us-east-2"))
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--threads-file")
+    parser.add_argument("--live", action="store_true", help="score with the Together AI API (needs TAI_KEY)")
+    parser.add_argument("--llm-ms", type=float, default=300.0, help="stub LLM latency")
+    parser.add_argument("--tolerance", type=int, default=5, help="EV points counted as agreement")
+    parser.add_argument("--show-threads", action="store_true")
+    args = parser.parse_args()
+
+    if args.aws:
+        threads = aws_threads(args.table, args.region, args.limit)
+    elif args.threads_file:
+        threads = file_threads(args.threads_file)
+    else:
+        threads = demo_threads()
+    if not threads:
+        print("no threads to evaluate")
+        return
+    print(f"threads={len(threads)} llm={'together' if args.live else 'stub'}")
+
+    if args.live:
+        if "TAI_KEY" not in os.environ:
+            parser.error("--live needs TAI_KEY")
+        run(args, threads)
+    else:
+        with StubTogetherServer(latency_ms=args.llm_ms, reply=stub_reply, prompt_tokens=estimate_prompt_tokens,
+                                completion_tokens=2) as llm:
+            run(args, threads, llm.url)
+
+
+if __name__ == "__main__":
+    main()
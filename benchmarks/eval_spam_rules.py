@@ -0,0 +1,170 @@
+"""
+Offline evaluation of the spam header rules (Process-SQS-Queued-Emails/header_rules.py).
+
+Replays stored emails through the ruleset and compares each decided email
+with the verdict the LLM gave it. Reports the share of LLM calls the rules
+would save, agreement with the past LLM verdicts on the emails they decide
+(rule-spam / LLM-not-spam disagreements are emails the rules would drop),
+per-rule match counts and evaluation time per email.
+
+Sources:
+    --aws            inbound-email rows of the Conversations table (spam='true'
+                     marks an LLM spam verdict; spam rows expire after
+                     SPAM_TTL_DAYS) and their raw emails in --bucket.
+    --eml-dir DIR    DIR/*.eml plus DIR/verdicts.json ({"file.eml": true, ...},
+                     true meaning spam).
+    (default)        a small synthetic corpus, to exercise the tool.
+
+Usage:
+    python benchmarks/eval_spam_rules.py [--rules PATH] [--show-disagreements]
+    python benchmarks/eval_spam_rules.py --aws --bucket BUCKET [--table Conversations] [--limit 2000]
+    python benchmarks/eval_spam_rules.py --eml-dir ./labelled-emails
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from email.message import EmailMessage
+from email.parser import BytesHeaderParser
+from email import policy
+
+from harness import load_lambda
+
+
+def demo_corpus():
+    """(name, raw bytes, LLM verdict) for common inbound email shapes."""
+    def build(name, sender, subject, body, spam, **headers):
+        msg = EmailMessage()
+        msg["From"] = sender
+        msg["To"] = "agent@realty.test"
+        msg["Subject"] = subject
+        msg["Message-ID"] = f"<{name}@mail.test>"
+        for header, value in headers.items():
+            msg[header.replace("_", "-")] = value
+        msg.set_content(body)
+        return name, msg.as_bytes(), spam
+
+    return [
+        build("newsletter", "Brand News <news@brand.test>", "Our fall sale", "50% off", True,
+              List_Unsubscribe="<https://brand.test/unsub>", List_Id="<news.brand.test>", Precedence="bulk"),
+        build("mailchimp", "Shop <hello@shop.test>", "New arrivals", "See what's new", True,
+              List_Unsubscribe="<mailto:unsub@shop.test>", X_Mailer="MailChimp Mailer - **CIDab12**"),
+        build("notification", "GitHub <noreply@github.test>", "[repo] CI failed", "Build #12 failed", True,
+              Auto_Submitted="auto-generated"),
+        build("receipt", "Orders <no-reply@store.test>", "Your receipt", "Thanks for your order", True,
+              Feedback_ID="123:store:ses"),
+        build("out-of-office", "Bob <bob@company.test>", "Automatic reply", "I'm out until Monday", True,
+              Auto_Submitted="auto-replied", X_Auto_Response_Suppress="All"),
+        build("cold-marketing", "Dana <dana@seo-agency.test>", "Grow your traffic", "We can rank you #1", True),
+        build("lead-gmail", "Carla <carla.m@gmail.com>", "House on Maple", "Is it still available?", False),
+        build("lead-reply", "Bob <bob.buyer@gmail.com>", "Re: 12 Oak St", "Saturday works", False,
+              In_Reply_To="<abc@amazonses.com>", References="<abc@amazonses.com>"),
+        build("forged-reply", "Deals <x@spam.biz>", "Re: your order", "Claim your prize", True,
+              In_Reply_To="<abc@spam.biz>", References="<abc@spam.biz>"),
+        build("forged-portal", "Crypto Deals <win@rent.com>", "Claim your prize", "You won 2 BTC", True),
+        build("lead-display-name", "Marketing Team <jane.doe@gmail.com>", "Looking to buy", "Three bedrooms please",
+              False),
+        build("lead-outlook", "Pat <pat@family.test>", "Selling our condo", "Can you help?", False,
+              X_Mailer="Microsoft Outlook 16.0"),
+        build("zillow-lead", "Zillow <leads@zillow.com>", "New lead: 12 Oak St", "Jane wants a tour", False,
+              List_Unsubscribe="<https://zillow.com/unsub>", Feedback_ID="1:zillow:ses"),
+        build("mortgage-offer", "Rates <offers@lender.test>", "Lower your rate", "Refinance today", True,
+              List_Unsubscribe="<https://lender.test/u>"),
+    ]
+
+
+def eml_dir_corpus(path):
+    with open(os.path.join(path, "verdicts.json"), encoding="utf-8") as f:
+        verdicts = json.load(f)
+    for name, spam in sorted(verdicts.items()):
+        with open(os.path.join(path, name), "rb") as f:
+            yield name, f.read(), bool(spam)
+
+
+def aws_corpus(table_name, bucket, region, limit):
+    import boto3
+    from boto3.dynamodb.conditions import Attr
+
+    table = boto3.resource("dynamodb", region_name=region).Table(table_name)
+    s3 = boto3.client("s3", region_name=region)
+    kwargs = {"FilterExpression": Attr("type").eq("inbound-email") & Attr("s3_location").ne("")}
+    count = 0
+    while count < limit:
+        response = table.scan(**kwargs)
+        for item in response.get("Items", []):
+            try:
+                raw = s3.get_object(Bucket=bucket, Key=item["s3_location"])["Body"].read()
+            except Exception:
+                continue  # Raw email no longer stored
+            yield item.get("response_id", item["s3_location"]), raw, item.get("spam") == "true"
+            count += 1
+            if count >= limit:
+                return
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", help="ruleset JSON to evaluate (default: the deployed spam_rules.json)")
+    parser.add_argument("--aws", action="store_true")
+    parser.add_argument("--table", default="Conversations")
+    parser.add_argument("--bucket")
+    parser.add_argument("--region", default=os.environ.get("AWS_REGION", "us-east-2"))
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--eml-dir")
+    parser.add_argument("--show-disagreements", action="store_true")
+    args = parser.parse_args()
+
+    module = load_lambda("Process-SQS-Queued-Emails", "header_rules")
+    rules = module.HeaderRules.load(args.rules) if args.rules else module.header_rules
+
+    if args.aws:
+        if not args.bucket:
+            parser.error("--aws needs --bucket")
+        corpus = aws_corpus(args.table, args.bucket, args.region, args.limit)
+    elif args.eml_dir:
+        corpus = eml_dir_corpus(args.eml_dir)
+    else:
+        corpus = demo_corpus()
+
+    header_parser = BytesHeaderParser(policy=policy.default)
+    outcomes, rule_hits, disagreements = Counter(), Counter(), []
+    total, eval_seconds = 0, 0.0
+    for name, raw, llm_spam in corpus:
+        msg = header_parser.parsebytes(raw)
+        start = time.perf_counter()
+        verdict = rules.evaluate(msg)
+        eval_seconds += time.perf_counter() - start
+        total += 1
+        rule_hits.update(verdict.matched)
+        if verdict.is_spam is None:
+            outcomes["undecided"] += 1
+        elif verdict.is_spam == llm_spam:
+            outcomes["agree-spam" if llm_spam else "agree-not-spam"] += 1
+        else:
+            outcomes["rules-spam-llm-not-spam" if verdict.is_spam else "rules-not-spam-llm-spam"] += 1
+            disagreements.append((name, verdict))
+
+    if not total:
+        print("no emails to evaluate")
+        return
+    decided = total - outcomes["undecided"]
+    agreed = outcomes["agree-spam"] + outcomes["agree-not-spam"]
+    print(f"emails={total} ruleset_version={rules.version}")
+    print(f"llm_calls_saved={decided} ({100.0 * decided / total:.1f}%)  "
+          f"agreement_on_decided={100.0 * agreed / decided if decided else 0.0:.1f}%  "
+          f"eval_us/email={eval_seconds * 1e6 / total:.1f}")
+    for outcome in ("agree-spam", "agree-not-spam", "rules-spam-llm-not-spam", "rules-not-spam-llm-spam", "undecided"):
+        print(f"  {outcome:<26} {outcomes[outcome]}")
+    print("rule matches: " + ", ".join(f"{name}={count}" for name, count in rule_hits.most_common()))
+    if args.show_disagreements:
+        for name, verdict in disagreements:
+            print(f"  disagree {name}: score={verdict.score} matched={verdict.matched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Offline replay of inbound emails through Process-SQS-Queued-Emails.
+
+Takes a directory of raw ``.eml`` files (or generates a corpus of threads and
+replies), stores each in a fake S3 bucket, wraps it in the SES -> SNS -> SQS
+envelopes from ``--envelopes`` and feeds the records, in file-name order and
+``--batch-size`` at a time, to ``lambda_handler``. Everything downstream is
+local:
+
+- DynamoDB and S3 are the in-memory fakes of harness.py, with ``--dynamodb-ms``
+  and ``--s3-ms`` per call. Every distinct recipient address is the
+  responseEmail of its own bench account.
+- ``lambda_client.invoke`` is routed in-process to GenerateEV, getThreadAttrs
+  and LCPLlmResponse stubs that answer after ``--invoke-ms``.
+- The Together AI API is a local HTTP server answering after ``--llm-ms``.
+
+Reports emails/second, per-stage latency percentiles (from the metrics lines
+the handler prints, see report_stage_metrics.py) and Lambda, DynamoDB and LLM
+calls per email. Use it as the baseline run before and after a change to the
+inbound path.
+
+Envelope templates are JSON files (``ses.json``, ``sns.json``, ``sqs.json``)
+whose string values may contain ``${field}`` placeholders: ``s3_key``,
+``source``, ``destination``, ``subject``, ``message_id``, ``timestamp``,
+``epoch_ms`` and ``bucket``; ``sns.json`` also gets ``ses`` and ``sqs.json``
+gets ``sns``, the serialized inner envelope.
+
+Usage:
+    python benchmarks/replay_emails.py [--eml-dir DIR] [--envelopes DIR] [--batch-size 10]
+                                       [--concurrency 5] [--llm-ms 300] [--auto-reply]
+    python benchmarks/replay_emails.py --threads 20 --replies 3
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import time
+from contextlib import redirect_stdout
+from email.parser import BytesHeaderParser
+from email.utils import getaddresses, parsedate_to_datetime
+from string import Template
+
+from harness import (
+    DEFAULT_ENV, FakeDynamoResource, FakeLambdaClient, FakeS3, FakeSQS, FakeTable,
+    StubTogetherServer, load_lambda, make_eml,
+)
+from report_stage_metrics import aggregate, parse_lines, report
+
+ENVELOPES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replay", "envelopes")
+RESPONSE_EMAIL = "agent@bench.test"
+DISPATCH_QUEUE_URL = "https://sqs.us-east-2.amazonaws.com/000000000000/ResponseDispatchQueue"
+PER_EMAIL_COUNTERS = ("LambdaInvokes", "DynamoDBCalls", "LLMCalls", "LLMInputTokens", "S3Calls", "SQSCalls")
+
+
+def load_envelopes(path):
+    envelopes = {}
+    for layer in ("ses", "sns", "sqs"):
+        with open(os.path.join(path, f"{layer}.json")) as f:
+            envelopes[layer] = json.load(f)
+    return envelopes
+
+
+def fill(template, fields):
+    """Copy of a JSON template with ``${field}`` placeholders in its strings substituted."""
+    if isinstance(template, dict):
+        return {key: fill(value, fields) for key, value in template.items()}
+    if isinstance(template, list):
+        return [fill(value, fields) for value in template]
+    if isinstance(template, str):
+        return Template(template).safe_substitute(fields)
+    return template
+
+
+def make_record(envelopes, s3_key, raw):
+    """The SQS record for the raw email stored at ``s3_key``, built from its headers."""
+    headers = BytesHeaderParser().parsebytes(raw)
+    source = (getaddresses([headers.get("From", "")]) or [("", "")])[0][1]
+    destination = (getaddresses([headers.get("To", "")]) or [("", "")])[0][1]
+    try:
+        sent = parsedate_to_datetime(headers["Date"])
+    except (TypeError, ValueError):
+        sent = None
+    epoch = sent.timestamp() if sent else time.time()
+    fields = {
+        "s3_key": s3_key,
+        "source": source,
+        "destination": destination,
+        "subject": str(headers.get("Subject", "")),
+        "message_id": str(headers.get("Message-ID", "")).strip(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(epoch)),
+        "epoch_ms": str(int(epoch * 1000)),
+        "bucket": DEFAULT_ENV["BUCKET_NAME"],
+    }
+    fields["ses"] = json.dumps(fill(envelopes["ses"], fields))
+    fields["sns"] = json.dumps(fill(envelopes["sns"], fields))
+    return fill(envelopes["sqs"], fields)
+
+
+def read_corpus(eml_dir):
+    """(s3_key, raw bytes) for every .eml file in ``eml_dir``, in file-name order."""
+    corpus = []
+    for name in sorted(os.listdir(eml_dir)):
+        if name.endswith(".eml"):
+            with open(os.path.join(eml_dir, name), "rb") as f:
+                corpus.append((f"replay-{len(corpus)}-{name[:-4]}", f.read()))
+    return corpus
+
+
+def generate_corpus(threads, replies):
+    """Round r of every thread, then round r + 1, each reply In-Reply-To the previous round."""
+    corpus = []
+    for r in range(replies + 1):
+        for t in range(threads):
+            previous = f"t{t}-r{r - 1}@mail.bench.test" if r else None
+            subject = f"{'Re: ' if r else ''}House {t}"
+            corpus.append((f"replay-{t}-{r}", make_eml(
+                f"t{t}-r{r}@mail.bench.test", f"lead{t}@example.com", RESPONSE_EMAIL, subject,
+                f"Message {r} about house {t}. Is it still available, and what is the asking price?",
+                in_reply_to=previous, references=[previous] if previous else None,
+            )))
+    return corpus
+
+
+def build_env(args, corpus, llm_url):
+    lambda_client = FakeLambdaClient(latency_ms=args.invoke_ms)
+    s3 = FakeS3(latency_ms=args.s3_ms)
+    for s3_key, raw in corpus:
+        s3.put_object(Bucket=DEFAULT_ENV["BUCKET_NAME"], Key=s3_key, Body=raw)
+        s3.calls.clear()
+
+    destinations = sorted({
+        addr for _, raw in corpus
+        for _, addr in getaddresses([BytesHeaderParser().parsebytes(raw).get("To", "")]) if addr
+    })
+    users = [{"id": f"acct-replay-{i}", "responseEmail": addr,
+              "lcp_automatic_enabled": "true" if args.auto_reply else "false"}
+             for i, addr in enumerate(destinations)]
+    dynamodb = FakeDynamoResource([
+        FakeTable("Users", ("id",), users),
+        FakeTable("Conversations", ("conversation_id", "response_id")),
+        FakeTable("MessageIndex", ("msg_id",)),
+        FakeTable("EmailLedger", ("message_id",)),
+        FakeTable("Threads", ("conversation_id",)),
+    ], latency_ms=args.dynamodb_ms)
+    sqs = FakeSQS()
+
+    processor = load_lambda("Process-SQS-Queued-Emails", lambda_client=lambda_client, dynamodb=dynamodb,
+                            env={"TOGETHER_API_URL": llm_url, "RESPONSE_DISPATCH_QUEUE_URL": DISPATCH_QUEUE_URL},
+                            clients={"s3": s3, "sqs": sqs})
+    processor.SQS_RECORD_CONCURRENCY = args.concurrency
+
+    ok = lambda body: {"statusCode": 200, "body": json.dumps(body)}
+    lambda_client.route("GenerateEV", lambda payload: ok({"status": "success", "ev_score": 42}))
+    lambda_client.route("getThreadAttrs", lambda payload: ok({"attributes": {}, "metadata": {}}))
+    lambda_client.route("LCPLlmResponse", lambda payload: ok({
+        "status": "success", "response": "Thanks for reaching out. It is still available.",
+        "llm_email_type": "continuation_email"}))
+    # Failed records log errors by design; the report counts them instead
+    logging.disable(logging.CRITICAL)
+    return processor, lambda_client, dynamodb
+
+
+def run(args):
+    envelopes = load_envelopes(args.envelopes)
+    corpus = read_corpus(args.eml_dir) if args.eml_dir else generate_corpus(args.threads, args.replies)
+    if not corpus:
+        raise SystemExit(f"no .eml files in {args.eml_dir}")
+    records = [make_record(envelopes, s3_key, raw) for s3_key, raw in corpus]
+
+    with StubTogetherServer(latency_ms=args.llm_ms) as llm:
+        processor, lambda_client, dynamodb = build_env(args, corpus, llm.url)
+        failed = []
+        captured = io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(captured):
+            for i in range(0, len(records), args.batch_size):
+                response = processor.lambda_handler({"Records": records[i:i + args.batch_size]}, None)
+                failed.extend(f["itemIdentifier"] for f in response["batchItemFailures"])
+        elapsed = time.perf_counter() - start
+        # Asynchronous invokes (getThreadAttrs refreshes) run after the clock stops
+        lambda_client.drain()
+        llm_calls = llm.calls
+
+    emails = len(records)
+    print(f"emails={emails} batches={-(-emails // args.batch_size)} concurrency={args.concurrency} "
+          f"elapsed={elapsed:.3f}s throughput={emails / elapsed:.1f} emails/s failed={len(failed)}")
+
+    functions = aggregate(parse_lines(captured.getvalue().splitlines()))
+    counters = functions.get("Process-SQS-Queued-Emails", {}).get("counters", {})
+    print("per email: " + "  ".join(
+        f"{name}={sum(counters.get(name, [0])) / emails:.2f}" for name in PER_EMAIL_COUNTERS))
+    print(f"downstream: lambda_invokes={sum(lambda_client.calls.values())} "
+          f"dynamodb_calls={dynamodb.total_calls()} llm_requests={llm_calls}")
+    report(functions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--eml-dir", help="directory of .eml files; a corpus is generated if omitted")
+    parser.add_argument("--envelopes", default=ENVELOPES_DIR, help="directory with ses.json, sns.json, sqs.json")
+    parser.add_argument("--threads", type=int, default=10, help="generated corpus: threads")
+    parser.add_argument("--replies", type=int, default=2, help="generated corpus: replies per thread")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5, help="SQS_RECORD_CONCURRENCY")
+    parser.add_argument("--auto-reply", action="store_true", help="enable automatic LLM replies for every account")
+    parser.add_argument("--invoke-ms", type=float, default=40.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0)
+    parser.add_argument("--s3-ms", type=float, default=20.0)
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Regression corpus for ``parser.strip_quoted_reply``.
+
+Replies as Gmail, Outlook and Apple Mail format them, plus edge cases of the
+marker rules. ``expected`` is the stripped body; it records the behaviour of
+the line-by-line implementation the compiled matcher replaced, including its
+quirks (a body line starting with "To:" ends the reply; a reply shorter than
+10 characters is returned unstripped).
+"""
+
+GMAIL_QUOTE = (
+    "> Hi Bob,\n"
+    "> \n"
+    "> Would Saturday at 10 work for a showing of 12 Oak St?\n"
+    "> \n"
+    "> Jane\n"
+)
+
+OUTLOOK_HEADER = (
+    "From: Jane Agent <jane@realty.test>\n"
+    "Sent: Monday, October 12, 2026 9:14 AM\n"
+    "To: Bob Buyer <bob@example.com>\n"
+    "Subject: RE: 12 Oak St\n"
+    "\n"
+    "Hi Bob,\n"
+    "\n"
+    "Would Saturday at 10 work for a showing?\n"
+)
+
+CORPUS = [
+    {
+        "client": "gmail",
+        "name": "basic",
+        "text": "Sounds good, see you Saturday at 10.\n\n"
+                "On Mon, Oct 12, 2026 at 9:14 AM Jane Agent <jane@realty.test> wrote:\n" + GMAIL_QUOTE,
+        "expected": "Sounds good, see you Saturday at 10.",
+    },
+    {
+        "client": "gmail",
+        "name": "wrapped-attribution",
+        "text": "Yes, please send over the seller disclosures.\n\n"
+                "On Mon, Oct 12, 2026 at 9:14 AM Jane Agent <jane@realty.test>\n"
+                "wrote:\n\n" + GMAIL_QUOTE,
+        "expected": "Yes, please send over the seller disclosures.",
+    },
+    {
+        "client": "gmail",
+        "name": "signature",
+        "text": "Thanks! We'll bring the pre-approval letter.\n\n-- \nBob Buyer\n555-0134\n\n"
+                "On Mon, Oct 12, 2026 at 9:14 AM Jane Agent <jane@realty.test> wrote:\n" + GMAIL_QUOTE,
+        "expected": "Thanks! We'll bring the pre-approval letter.",
+    },
+    {
+        "client": "gmail",
+        "name": "forwarded",
+        "text": "FYI, this is the listing my wife mentioned.\n\n"
+                "---------- Forwarded message ---------\n"
+                "From: Listings <noreply@mls.test>\n"
+                "Date: Sun, Oct 11, 2026 at 8:00 PM\n"
+                "Subject: New listing: 12 Oak St\n",
+        "expected": "FYI, this is the listing my wife mentioned.\n\n---------- Forwarded message ---------",
+    },
+    {
+        "client": "gmail",
+        "name": "crlf",
+        "text": "Can we push the showing to 11?\r\n\r\n"
+                "On Mon, Oct 12, 2026 at 9:14 AM Jane Agent <jane@realty.test> wrote:\r\n> Saturday at 10?\r\n",
+        "expected": "Can we push the showing to 11?",
+    },
+    {
+        "client": "gmail",
+        "name": "no-quote",
+        "text": "Hello,\n\nI saw your listing on Zillow and would like to know if the\n"
+                "property on Maple Ave is still available. Our budget is 450-500k.\n\nBest,\nCarla",
+        "expected": "Hello,\n\nI saw your listing on Zillow and would like to know if the\n"
+                    "property on Maple Ave is still available. Our budget is 450-500k.\n\nBest,\nCarla",
+    },
+    {
+        "client": "outlook",
+        "name": "desktop",
+        "text": "Hi Jane,\n\nWe are pre-approved up to 700k.\n\nRegards,\nBob\n\n"
+                "________________________________\n" + OUTLOOK_HEADER,
+        "expected": "Hi Jane,\n\nWe are pre-approved up to 700k.\n\nRegards,\nBob",
+    },
+    {
+        "client": "outlook",
+        "name": "original-message",
+        "text": "Saturday works.\n\n-----Original Message-----\n" + OUTLOOK_HEADER,
+        "expected": "Saturday works.\n\n-----Original Message-----",
+    },
+    {
+        "client": "outlook",
+        "name": "mobile",
+        "text": "On my way, running 5 min late.\n\nGet Outlook for iOS<https://aka.ms/o0ukef>\n"
+                "________________________________\n" + OUTLOOK_HEADER,
+        "expected": "On my way, running 5 min late.\n\nGet Outlook for iOS<https://aka.ms/o0ukef>",
+    },
+    {
+        "client": "outlook",
+        "name": "short-reply-restored",
+        "text": "Yes.\n\n" + OUTLOOK_HEADER,
+        "expected": "Yes.\n\n" + OUTLOOK_HEADER.strip(),
+    },
+    {
+        "client": "apple",
+        "name": "iphone",
+        "text": "Perfect, thank you!\n\nSent from my iPhone\n\n"
+                "> On Oct 12, 2026, at 9:14 AM, Jane Agent <jane@realty.test> wrote:\n> \n" + GMAIL_QUOTE,
+        "expected": "Perfect, thank you!\n\nSent from my iPhone",
+    },
+    {
+        "client": "apple",
+        "name": "mac-mail",
+        "text": "Let's do 3pm instead, the kids have practice.\n\n"
+                "On Oct 12, 2026, at 9:14 AM, Jane Agent <jane@realty.test> wrote:\n\n"
+                "Hi Bob,\n\nWould Saturday at 10 work?\n",
+        "expected": "Let's do 3pm instead, the kids have practice.",
+    },
+    {
+        "client": "apple",
+        "name": "forwarded",
+        "text": "Thoughts on this one?\n\nBegin forwarded message:\n\n"
+                "From: Listings <noreply@mls.test>\nSubject: New listing: 12 Oak St\n",
+        "expected": "Thoughts on this one?",
+    },
+    {
+        "client": "other",
+        "name": "blank-line-runs",
+        "text": "First paragraph.\n\n\n\n\nSecond paragraph with more details here.\n\n"
+                "On 12/10/2026 Jane wrote:\nold text",
+        "expected": "First paragraph.\n\nSecond paragraph with more details here.",
+    },
+    {
+        "client": "other",
+        "name": "on-in-body",
+        "text": "On second thought, 2027 works better for the move.\n"
+                "On balance we prefer the bigger yard.\nThanks",
+        "expected": "On second thought, 2027 works better for the move.\n"
+                    "On balance we prefer the bigger yard.\nThanks",
+    },
+    {
+        "client": "other",
+        "name": "to-line-in-body",
+        "text": "Quick update on our search.\nTo: recap, we want 3 bedrooms.\nMore below.",
+        "expected": "Quick update on our search.",
+    },
+]
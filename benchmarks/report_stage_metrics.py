@@ -0,0 +1,129 @@
+"""
+p50/p95 tables of the per-invocation metrics lines written by ``metrics.py``.
+
+Every instrumented Lambda (Process-SQS-Queued-Emails, GenerateEV,
+LCPLlmResponse, getThreadAttrs) prints one embedded metric format line per
+invocation: a value per counter (DynamoDBCalls, LambdaInvokes, LLMCalls,
+LLMInputTokens, ...) and a list of millisecond samples per stage. This script
+reads those lines from log files (CloudWatch Logs exports or captured stdout;
+other lines are skipped) and prints, per function, the p50/p95 of every stage
+and of every counter per invocation.
+
+Without log files it produces its own: SQS batches are run through the
+Process-SQS-Queued-Emails handler against the stubs of bench_sqs_throughput.py
+and the lines it prints are captured.
+
+Usage:
+    python benchmarks/report_stage_metrics.py [LOG_FILE ...]
+    python benchmarks/report_stage_metrics.py [--threads 10] [--replies 2] [--batch-size 10]
+"""
+
+import argparse
+import io
+import json
+import statistics
+import sys
+from collections import defaultdict
+from contextlib import redirect_stdout
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def parse_lines(lines):
+    """Yield the metrics documents among ``lines``."""
+    for line in lines:
+        start = line.find('{"_aws"')
+        if start < 0:
+            continue
+        try:
+            doc = json.loads(line[start:])
+        except json.JSONDecodeError:
+            continue
+        if "Function" in doc:
+            yield doc
+
+
+def aggregate(docs):
+    """Per function: invocation count, stage samples and per-invocation counter values."""
+    functions = defaultdict(lambda: {"invocations": 0, "stages": defaultdict(list), "counters": defaultdict(list)})
+    for doc in docs:
+        entry = functions[doc["Function"]]
+        entry["invocations"] += 1
+        for directive in doc["_aws"]["CloudWatchMetrics"]:
+            for metric in directive["Metrics"]:
+                name, value = metric["Name"], doc.get(metric["Name"])
+                if value is None:
+                    continue
+                if name.startswith("Stage."):
+                    entry["stages"][name[len("Stage."):]].extend(value if isinstance(value, list) else [value])
+                else:
+                    entry["counters"][name].append(value)
+    # A counter missing from an invocation's line was zero for it
+    for entry in functions.values():
+        for values in entry["counters"].values():
+            values.extend([0] * (entry["invocations"] - len(values)))
+    return functions
+
+
+def report(functions):
+    for function, entry in sorted(functions.items()):
+        print(f"\n{function}  invocations={entry['invocations']}")
+        print(f"  {'stage':<24} {'n':>6} {'p50_ms':>10} {'p95_ms':>10} {'max_ms':>10}")
+        for name, samples in sorted(entry["stages"].items(), key=lambda kv: -statistics.median(kv[1])):
+            print(f"  {name:<24} {len(samples):>6} {statistics.median(samples):>10.1f} "
+                  f"{percentile(samples, 0.95):>10.1f} {max(samples):>10.1f}")
+        if entry["counters"]:
+            print(f"  {'per invocation':<24} {'total':>6} {'p50':>10} {'p95':>10} {'max':>10}")
+            for name, values in sorted(entry["counters"].items()):
+                print(f"  {name:<24} {sum(values):>6g} {statistics.median(values):>10g} "
+                      f"{percentile(values, 0.95):>10g} {max(values):>10g}")
+
+
+def run_stubs(args):
+    """Run the SQS handler against stubs and return the lines it printed."""
+    from bench_sqs_throughput import build_corpus, build_env
+
+    processor, s3, _ = build_env(args)
+    records = build_corpus(s3, args.threads, args.replies)
+    captured = io.StringIO()
+    with redirect_stdout(captured):
+        for i in range(0, len(records), args.batch_size):
+            processor.lambda_handler({"Records": records[i:i + args.batch_size]}, None)
+    return captured.getvalue().splitlines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("logs", nargs="*", help="log files to read ('-' for stdin)")
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--replies", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--invoke-ms", type=float, default=40.0)
+    parser.add_argument("--dynamodb-ms", type=float, default=5.0)
+    parser.add_argument("--s3-ms", type=float, default=20.0)
+    parser.add_argument("--llm-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    args.fail_thread = None
+
+    if args.logs:
+        lines = []
+        for path in args.logs:
+            if path == "-":
+                lines.extend(sys.stdin)
+            else:
+                with open(path) as f:
+                    lines.extend(f)
+    else:
+        lines = run_stubs(args)
+
+    functions = aggregate(parse_lines(lines))
+    if not functions:
+        sys.exit("no metrics lines found")
+    report(functions)
+
+
+if __name__ == "__main__":
+    main()
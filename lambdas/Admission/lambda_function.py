@@ -0,0 +1,31 @@
+from config import logger
+from utils import create_response, LambdaError, parse_event
+from admission import admit
+
+def lambda_handler(event, context):
+    """
+    Authorize a session and count one request against its rate limit in a single round trip.
+
+    Request: {"account_id"|"client_id", "session_id"|"session" (or session_id cookie), "limit_type": "aws"|"ai"}
+    Response body: {"allowed", "message", "limit", "current", "remaining"}
+    """
+    try:
+        parsed_event = parse_event(event)
+
+        account_id = parsed_event.get('account_id') or parsed_event.get('client_id') or parsed_event.get('account')
+        session_id = parsed_event.get('session_id') or parsed_event.get('session')
+        if not session_id and parsed_event.get('cookies'):
+            session_id = parsed_event['cookies'].get('session_id')
+        limit_type = parsed_event.get('limit_type', 'aws')
+
+        result = admit(account_id, session_id, limit_type)
+        status_code = result.pop('statusCode')
+        if not result['allowed']:
+            logger.warning(f"Admission denied for {account_id}: [{status_code}] {result['message']}")
+        return create_response(status_code, result)
+
+    except LambdaError as e:
+        return create_response(e.status_code, {"message": e.message, "allowed": False})
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        return create_response(500, {"message": "An internal server error occurred.", "allowed": False})
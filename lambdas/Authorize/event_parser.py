@@ -0,0 +1,51 @@
+# event_parser.py
+import json
+import logging
+
+logger = logging.getLogger()
+
+def parse_cookies(cookie_string):
+    """
+    Parses a cookie string into a dictionary.
+    """
+    if not cookie_string:
+        return {}
+    return dict(cookie.split('=', 1) for cookie in cookie_string.split('; '))
+
+def parse_event_data(event):
+    """
+    Parse an event from either API Gateway or direct Lambda invocation.
+
+    This is the in-process equivalent of the ParseEvent Lambda and returns
+    exactly what that function puts in its response body:
+      - API Gateway events: the decoded JSON body (or {'raw_body': ...} when the
+        body is not valid JSON) plus 'cookies' parsed from the Cookie header.
+      - Direct invocations: a copy of the event itself.
+
+    Raises:
+        ValueError: If the event cannot be parsed (ParseEvent answers 400).
+    """
+    try:
+        parsed_data = {}
+
+        # API Gateway event
+        if 'body' in event and event['body'] is not None:
+            if isinstance(event['body'], str):
+                try:
+                    parsed_data.update(json.loads(event['body']))
+                except json.JSONDecodeError:
+                    logger.warning(f"Request body is not a valid JSON string: {event['body']}")
+                    parsed_data['raw_body'] = event['body']
+            else:
+                parsed_data.update(event.get('body', {}))
+
+            if 'headers' in event and 'Cookie' in event['headers']:
+                parsed_data['cookies'] = parse_cookies(event['headers']['Cookie'])
+
+        # Direct Lambda invocation
+        else:
+            parsed_data.update(event)
+
+        return parsed_data
+    except Exception as e:
+        raise ValueError(str(e)) from e
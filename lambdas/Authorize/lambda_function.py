@@ -1,17 +1,13 @@
 import json
 from config import logger, AUTH_BP
 from utils import create_response, LambdaError, parse_event
-import boto3
+from session_auth import check_session
 from botocore.exceptions import ClientError
 import os
 
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
-sessions_table = dynamodb.Table('Sessions')
-
 def authorize_user(user_id, session_id):
     """
-    Authorizes a user by validating their session ID.
+    Authorizes a user by validating their session ID (Sessions read is cached per warm container).
     """
     logger.info(f"Authorizing user: {user_id} with session: {session_id}")
     if not user_id or not session_id:
@@ -22,16 +18,9 @@ def authorize_user(user_id, session_id):
         return create_response(200,  "Authorized")
 
     try:
-        response = sessions_table.get_item(Key={'session_id': session_id})
-        session = response.get('Item')
-
-        if not session:
-            logger.warning(f"Session not found: {session_id}")
-            raise LambdaError(401, "ACS: Unauthorized")
-
-        if session.get('associated_account') != user_id:
-            logger.warning(f"User ID mismatch: {user_id} != {session.get('associated_account')}")
-            raise LambdaError(401, "ACS: Unauthorized")
+        authorized, message = check_session(user_id, session_id)
+        if not authorized:
+            raise LambdaError(401, message)
 
         return {"message": "Authorized", "authorized": True}
 
@@ -1,13 +1,13 @@
 import json
 import boto3
 import os
+from cors import get_cors_headers
 
 dynamodb = boto3.resource('dynamodb')
 ses_client = boto3.client('ses')
 
 # Environment & AWS clients
 AWS_REGION    = os.environ.get("AWS_REGION", "us-east-2")
-CORS_FUNCTION = os.environ.get("CORS_FUNCTION_NAME", "Allow-Cors")
 lambda_client = boto3.client("lambda", region_name=AWS_REGION)
 
 # DynamoDB table for session storage
@@ -15,24 +15,6 @@ SESSIONS_TABLE = os.environ.get("SESSIONS_TABLE", "Sessions")
 dynamodb       = boto3.resource("dynamodb", region_name=AWS_REGION)
 sessions_table = dynamodb.Table(SESSIONS_TABLE)
 
-def get_cors_headers(event: dict) -> dict:
-    default = {
-        "Access-Control-Allow-Origin":      "*",
-        "Access-Control-Allow-Methods":     "OPTIONS, POST",
-        "Access-Control-Allow-Headers":     "Content-Type",
-        "Access-Control-Allow-Credentials": "true",
-    }
-    try:
-        resp = lambda_client.invoke(
-            FunctionName   = CORS_FUNCTION,
-            InvocationType = "RequestResponse",
-            Payload        = json.dumps(event).encode()
-        )
-        data = json.loads(resp["Payload"].read().decode())
-        return data.get("headers", default)
-    except Exception:
-        return default
-
 def lambda_handler(event, context):
     cors_headers = get_cors_headers(event)
 
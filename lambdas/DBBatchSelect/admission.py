@@ -0,0 +1,121 @@
+# admission.py
+import os
+import time
+import logging
+
+import boto3
+from botocore.exceptions import ClientError
+
+from session_auth import check_session
+
+logger = logging.getLogger()
+
+# Rate-limit window in seconds (same meaning as TTL_S in RateLimitAWS/RateLimitAI)
+TTL_S = int(os.environ.get('TTL_S', 3600))
+
+# Counter table and Users attribute for each limit type. default_limit applies when
+# the Users row has no (valid) limit configured; None means the request is refused.
+LIMIT_POLICIES = {
+    'aws': {'table': 'RL_AWS', 'user_field': 'rl_aws', 'default_limit': 100},
+    'ai': {'table': 'RL_AI', 'user_field': 'rl_ai', 'default_limit': None},
+}
+
+dynamodb = boto3.resource('dynamodb')
+user_table = dynamodb.Table('Users')
+limit_tables = {name: dynamodb.Table(policy['table']) for name, policy in LIMIT_POLICIES.items()}
+
+def _result(status_code, message, limit=None, current=None):
+    remaining = max(limit - current, 0) if limit is not None and current is not None else None
+    return {
+        'statusCode': status_code,
+        'allowed': status_code == 200,
+        'message': message,
+        'limit': limit,
+        'current': current,
+        'remaining': remaining,
+    }
+
+def _get_user_limit(account_id, policy):
+    """Returns the account's limit, or raises LookupError/ValueError if it cannot be determined."""
+    item = user_table.get_item(Key={'id': account_id}).get('Item')
+    if not item:
+        raise LookupError(f"User {account_id} not found.")
+
+    try:
+        return int(item[policy['user_field']])
+    except (KeyError, TypeError, ValueError):
+        if policy['default_limit'] is None:
+            raise ValueError(f"User {account_id} has no {policy['user_field']} limit configured.")
+        logger.warning(f"User {account_id} has no valid {policy['user_field']}; using default {policy['default_limit']}")
+        return policy['default_limit']
+
+def _consume(account_id, limit, table):
+    """
+    Counts one request against the account's window with one conditional write.
+    Same semantics as RateLimitAWS: a window starts with its first request and lasts
+    TTL_S; the count never passes the limit, since refused requests are not counted.
+    """
+    now = int(time.time())
+    key = {'associated_account': account_id}
+    values = {':one': 1, ':now': now, ':expired': now - TTL_S}
+    try:
+        # New row, or a live window below the limit (AND binds tighter than OR)
+        attributes = table.update_item(
+            Key=key,
+            UpdateExpression="ADD invocations :one SET created_at = if_not_exists(created_at, :now)",
+            ConditionExpression="attribute_not_exists(invocations) OR created_at > :expired AND invocations < :limit",
+            ExpressionAttributeValues={**values, ':limit': limit},
+            ReturnValues='UPDATED_NEW'
+        )['Attributes']
+        return _result(200, "Rate limit check passed.", limit, int(attributes['invocations']))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+
+    try:
+        # Refused above: either the window has expired (start a new one) or the limit is reached
+        table.update_item(
+            Key=key,
+            UpdateExpression="SET invocations = :one, created_at = :now",
+            ConditionExpression="attribute_not_exists(created_at) OR created_at <= :expired",
+            ExpressionAttributeValues=values
+        )
+        return _result(200, "Rate limit check passed (TTL reset).", limit, 1)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+    return _result(429, "Rate limit exceeded.", limit, limit)
+
+def admit(account_id, session_id, limit_type='aws'):
+    """
+    Authorize the session and count the request against the account's rate limit in one call.
+
+    Replaces authorize() followed by an invoke of RateLimitAWS/RateLimitAI (which authorized
+    again). Never raises; the result carries the outcome:
+        {"statusCode": 200|400|401|404|429|500, "allowed": bool, "message": str,
+         "limit": int|None, "current": int|None, "remaining": int|None}
+    """
+    policy = LIMIT_POLICIES.get(limit_type)
+    if policy is None:
+        return _result(400, f"Unknown limit type: {limit_type}")
+    if not account_id or not session_id:
+        return _result(400, "Missing required fields: account_id and session_id are required.")
+
+    auth_bp = os.environ.get('AUTH_BP', '')
+    if auth_bp and session_id == auth_bp:
+        return _result(200, "Rate limit check bypassed for admin.")
+
+    try:
+        authorized, message = check_session(account_id, session_id)
+        if not authorized:
+            return _result(401, message)
+
+        limit = _get_user_limit(account_id, policy)
+        return _consume(account_id, limit, limit_tables[limit_type])
+    except LookupError as e:
+        return _result(404, str(e))
+    except ValueError as e:
+        return _result(500, str(e))
+    except ClientError as e:
+        logger.error(f"DynamoDB error during admission for {account_id}: {e}")
+        return _result(500, "Database error during admission check.")
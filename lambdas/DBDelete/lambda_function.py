@@ -88,6 +88,7 @@ from boto3.dynamodb.conditions import Key
 from config import logger, AUTH_BP
 from utils import create_response, LambdaError, parse_event, authorize, invoke_lambda
 import os
+from admission import admit
 
 dynamodb = boto3.resource('dynamodb')
 dynamodb_client = boto3.client('dynamodb')
@@ -161,12 +162,8 @@ def lambda_handler(event, context):
             raise LambdaError(400, "Missing one or more required fields.")
         
         if session_id != AUTH_BP:
-            authorize(parsed_event['account_id'], session_id)
-            # Check rate limit using the rate-limit Lambda
-            rate_limit_response = invoke_lambda(os.environ.get("RATE_LIMIT_AWS_FUNCTION_NAME", "RateLimitAWS"), {
-                'client_id': parsed_event['account_id'],
-                'session': session_id
-            })
+            # Authorize the session and count the request against the rate limit in one step
+            rate_limit_response = admit(parsed_event['account_id'], session_id)
             
             if rate_limit_response.get('statusCode') == 429:
                 logger.warning(f"Rate limit exceeded for account {parsed_event['account_id']}")
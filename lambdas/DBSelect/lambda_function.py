@@ -47,7 +47,9 @@ import boto3
 import logging
 from decimal import Decimal
 from boto3.dynamodb.conditions import Key
+from cors import get_cors_headers
 from utils import invoke_lambda, parse_event, authorize, AuthorizationError, create_response, LambdaError
+from admission import admit
 
 # Configure logging
 logger = logging.getLogger()
@@ -68,23 +70,11 @@ def safe_json_dumps(obj):
 # reuse clients
 dynamodb = boto3.resource('dynamodb')
 
-def fetch_cors_headers():
+def fetch_cors_headers(event=None):
     """
-    Invoke the designated CORS Lambda and extract its 'headers' map.
-    Falls back to empty dict on error.
+    Compute CORS headers for the request's origin in-process (same headers as Allow-Cors).
     """
-    fn = 'Allow-Cors'
-    logger.info(f"Fetching CORS headers from Lambda function: {fn}")
-
-    try:
-        logger.debug("Invoking CORS Lambda function")
-        resp = invoke_lambda(fn, {})
-        headers = resp.get('headers', {})
-        logger.info("Successfully retrieved CORS headers")
-        return headers
-    except Exception as e:
-        logger.error(f"Failed to fetch CORS headers: {str(e)}", exc_info=True)
-        return {}
+    return get_cors_headers(event)
 
 def select_db_items(table_name, index_name, key_name, key_value, account_id, session_id):
     """
@@ -110,7 +100,7 @@ def lambda_handler(event, context):
     logger.info("Lambda function started")
     logger.debug(f"Received event: {safe_json_dumps(event)}")
     
-    cors_headers = fetch_cors_headers()
+    cors_headers = fetch_cors_headers(event)
     logger.debug(f"CORS headers: {safe_json_dumps(cors_headers)}")
 
     # CORS preflight
@@ -155,12 +145,8 @@ def lambda_handler(event, context):
     logger.info("Authorizing request")
     try:
         if session_id != AUTH_BP:
-            authorize(account_id, session_id)
-            # Check rate limit using the rate-limit Lambda
-            rate_limit_response = invoke_lambda(os.environ.get("RATE_LIMIT_AWS_FUNCTION_NAME", "RateLimitAWS"), {
-                'client_id': account_id,
-                'session': session_id
-            })
+            # Authorize the session and count the request against the rate limit in one step
+            rate_limit_response = admit(account_id, session_id)
             
             if rate_limit_response.get('statusCode') == 429:
                 logger.warning(f"Rate limit exceeded for account {account_id}")
@@ -62,21 +62,18 @@ from utils import (
 )
 from utils import invoke_lambda
 from config import logger, AUTH_BP
+from cors import get_cors_headers
 from decimal import Decimal
 import os
+from admission import admit
 
 dynamodb = boto3.resource('dynamodb')
 dynamodb_client = boto3.client('dynamodb')
 
 
-def fetch_cors_headers():
-    from utils import invoke_lambda
-    try:
-        response = invoke_lambda(os.environ.get("CORS_FUNCTION_NAME", "Allow-Cors"), {})
-        return response.get('headers', {})
-    except Exception as e:
-        logger.error(f"Failed to fetch CORS headers: {e}")
-        return {}
+def fetch_cors_headers(event=None):
+    """Compute CORS headers for the request's origin in-process (same headers as Allow-Cors)."""
+    return get_cors_headers(event)
 
 def validate_and_clean_update_data(update_data):
     """
@@ -237,7 +234,7 @@ def db_update_item(table_name, key_name, key_value, index_name, update_data, acc
 
 def lambda_handler(event, context):
     try:
-        cors_headers = fetch_cors_headers()
+        cors_headers = fetch_cors_headers(event)
         if event.get('httpMethod') == 'OPTIONS':
             return {'statusCode': 200, 'headers': cors_headers, 'body': ''}
 
@@ -258,12 +255,8 @@ def lambda_handler(event, context):
         
         if session_id != AUTH_BP:
             logger.info(f"Authorizing account {account_id} with session {session_id}")
-            authorize(account_id, session_id)
-            # Check rate limit using the rate-limit Lambda
-            rate_limit_response = invoke_lambda(os.environ.get("RATE_LIMIT_AWS_FUNCTION_NAME", "RateLimitAWS"), {
-                'client_id': account_id,
-                'session': session_id
-            })
+            # Authorize the session and count the request against the rate limit in one step
+            rate_limit_response = admit(account_id, session_id)
             
             if rate_limit_response.get('statusCode') == 429:
                 logger.warning(f"Rate limit exceeded for account {account_id}")
@@ -300,10 +293,10 @@ def lambda_handler(event, context):
 
     except LambdaError as e:
         response = create_response(e.status_code, {"error": e.message})
-        response['headers'].update(fetch_cors_headers())
+        response['headers'].update(fetch_cors_headers(event))
         return response
     except Exception as e:
         logger.error(f"Unhandled error: {e}")
         response = create_response(500, {"error": "Internal server error."})
-        response['headers'].update(fetch_cors_headers())
+        response['headers'].update(fetch_cors_headers(event))
         return response
@@ -12,4 +12,8 @@ AWS_REGION = os.environ.get('AWS_REGION', 'us-east-2')
 TAI_KEY = os.environ['TAI_KEY']  # Together AI API key
 
 # Database Lambda function name
-DB_SELECT_LAMBDA = os.environ['DB_SELECT_LAMBDA']  # Single Lambda for all DB operations 
\ No newline at end of file
+DB_SELECT_LAMBDA = os.environ['DB_SELECT_LAMBDA']  # Single Lambda for all DB operations 
+
+# 'combined': EV score and handoff flag from one LLM call (ev_flag_llm.py)
+# 'separate': calc_ev followed by the flag LLM, kept for A/B comparison
+EV_SCORING_MODE = os.environ.get('EV_SCORING_MODE', 'combined').lower()
@@ -1,5 +1,4 @@
 # ev_calculator.py
-import urllib3
 import json
 import logging
 import re
@@ -7,12 +6,38 @@ from typing import Dict, Any, Tuple
 from config import TAI_KEY
 from db import check_and_update_ai_rate_limit
 from utils import store_ai_invocation
+from metrics import metrics
+from llm_cache import llm_cache, CACHED
+from together_client import chat_completion, TogetherError
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize urllib3 pool manager
-http = urllib3.PoolManager()
+EV_SYSTEM_PROMPT = (
+    "You are an assistant that assesses how likely a prospective buyer is to convert—"
+    "expressed as an integer percentage from 0 to 100—based solely on the email thread "
+    "between a realtor and a buyer.\n\n"
+    "RULES (follow exactly):\n"
+    "1. Always return exactly one integer between 0 and 100, with no extra text, no explanations, "
+    "and no punctuation.\n"
+    "2. Provide highly granular scores that reflect subtle differences in buyer behavior. "
+    "For example:\n"
+    "   • A buyer asking about viewing next week might be 37% vs 35% if they also mentioned "
+    "   their pre-approval status\n"
+    "   • A buyer expressing interest but with some hesitation might be 42% vs 40% if they "
+    "   asked specific questions about the property\n"
+    "3. NEVER default to round numbers (like 20, 25, 30) unless the signals are truly ambiguous. "
+    "Use the full range of numbers to capture nuanced differences.\n"
+    "4. Evaluate all of the following factors with precise weighting:\n"
+    "   • Buyer's urgency (e.g., 'Can I tour tomorrow?' = +15-20%, 'Maybe next month' = +5-10%)\n"
+    "   • Specific questions about financing (+8-12%), timelines (+5-10%), or next steps (+7-15%)\n"
+    "   • Positive signals (e.g., 'Looks perfect' = +20-25%, 'Interesting' = +5-8%)\n"
+    "   • Hesitations or vague interest (-10-15% for each major hesitation)\n"
+    "   • Message frequency and engagement (each back-and-forth = +3-7%)\n"
+    "   • Pre-approval status (+12-18%), tour readiness (+15-20%), offer readiness (+25-30%)\n"
+    "5. If you have very little context, still make your best speculative guess "
+    "based on the available signals, but lean conservative (lower scores)."
+)
 
 def calc_ev(messages: list, account_id: str, conversation_id: str, session_id: str) -> Tuple[int, Dict[str, int]]:
     """
@@ -20,7 +45,9 @@ def calc_ev(messages: list, account_id: str, conversation_id: str, session_id: s
     indicating the percent chance the lead will convert. The system prompt
     has been updated so the AI outputs a granular integer (e.g., 14, 27, 63)
     rather than rounding to multiples of 5 or 10. We also retry once if the model
-    fails to return a valid integer.
+    fails to return a valid integer. A score cached for the same thread (see
+    llm_cache.py) is returned without an LLM call, with 0 tokens and
+    token_usage['cache_status'] set.
     
     Args:
         messages: List of messages to analyze
@@ -33,46 +60,9 @@ def calc_ev(messages: list, account_id: str, conversation_id: str, session_id: s
     """
     logger.info(f"Calculating EV for {len(messages)} messages")
     
-    # Check AI rate limit
-    is_allowed, message = check_and_update_ai_rate_limit(account_id, session_id)
-    if not is_allowed:
-        logger.error(f"AI rate limit exceeded for account {account_id}")
-        return -4, {'input_tokens': 0, 'output_tokens': 0}
-    
-    url = "https://api.together.xyz/v1/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {TAI_KEY}",
-        "Content-Type": "application/json"
-    }
-
     system_prompt = {
         "role": "system",
-        "content": (
-            "You are an assistant that assesses how likely a prospective buyer is to convert—"
-            "expressed as an integer percentage from 0 to 100—based solely on the email thread "
-            "between a realtor and a buyer.\n\n"
-            "RULES (follow exactly):\n"
-            "1. Always return exactly one integer between 0 and 100, with no extra text, no explanations, "
-            "and no punctuation.\n"
-            "2. Provide highly granular scores that reflect subtle differences in buyer behavior. "
-            "For example:\n"
-            "   • A buyer asking about viewing next week might be 37% vs 35% if they also mentioned "
-            "   their pre-approval status\n"
-            "   • A buyer expressing interest but with some hesitation might be 42% vs 40% if they "
-            "   asked specific questions about the property\n"
-            "3. NEVER default to round numbers (like 20, 25, 30) unless the signals are truly ambiguous. "
-            "Use the full range of numbers to capture nuanced differences.\n"
-            "4. Evaluate all of the following factors with precise weighting:\n"
-            "   • Buyer's urgency (e.g., 'Can I tour tomorrow?' = +15-20%, 'Maybe next month' = +5-10%)\n"
-            "   • Specific questions about financing (+8-12%), timelines (+5-10%), or next steps (+7-15%)\n"
-            "   • Positive signals (e.g., 'Looks perfect' = +20-25%, 'Interesting' = +5-8%)\n"
-            "   • Hesitations or vague interest (-10-15% for each major hesitation)\n"
-            "   • Message frequency and engagement (each back-and-forth = +3-7%)\n"
-            "   • Pre-approval status (+12-18%), tour readiness (+15-20%), offer readiness (+25-30%)\n"
-            "5. If you have very little context, still make your best speculative guess "
-            "based on the available signals, but lean conservative (lower scores)."
-        )
+        "content": EV_SYSTEM_PROMPT
     }
 
     user_message = {
@@ -91,40 +81,49 @@ def calc_ev(messages: list, account_id: str, conversation_id: str, session_id: s
         "stop": ["\n", ".", " ", ","]  # Stop at any punctuation or space
     }
 
+    # The same thread was scored before: no LLM call and no rate limit reservation
+    cache_key = llm_cache.key('ev_calculation', payload)
+    hit, ev_score = llm_cache.get(cache_key)
+    if hit:
+        logger.info(f"EV served from the LLM cache: {ev_score}")
+        store_ai_invocation(
+            associated_account=account_id,
+            input_tokens=0,
+            output_tokens=0,
+            llm_email_type='ev_calculation',
+            model_name='meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8',
+            conversation_id=conversation_id,
+            session_id=session_id,
+            cache_status=CACHED
+        )
+        return ev_score, {'input_tokens': 0, 'output_tokens': 0, 'cache_status': CACHED}
+
+    # Check AI rate limit
+    is_allowed, message = check_and_update_ai_rate_limit(account_id, session_id)
+    if not is_allowed:
+        logger.error(f"AI rate limit exceeded for account {account_id}")
+        return -4, {'input_tokens': 0, 'output_tokens': 0}
+    
     try:
         # We'll allow up to 2 attempts if the output isn't a clean integer.
         for attempt in range(2):
             logger.info(f"Sending request to Together AI API (attempt {attempt+1})")
-            encoded_data = json.dumps(payload).encode('utf-8')
-            response = http.request(
-                'POST',
-                url,
-                body=encoded_data,
-                headers=headers
-            )
-
-            if response.status != 200:
-                logger.error(f"API call failed with status {response.status}: {response.data.decode('utf-8')}")
-                return -3, {'input_tokens': 0, 'output_tokens': 0}
-
-            response_data = json.loads(response.data.decode('utf-8'))
-            if "choices" not in response_data:
-                logger.error(f"Invalid API response format: {response_data}")
-                return -3, {'input_tokens': 0, 'output_tokens': 0}
-
-            # Get token usage from response
+            with metrics.stage('llm_ev'):
+                result = chat_completion(payload, api_key=TAI_KEY)
+
             token_usage = {
-                'input_tokens': response_data.get('usage', {}).get('prompt_tokens', 0),
-                'output_tokens': response_data.get('usage', {}).get('completion_tokens', 0)
+                'input_tokens': result.usage.input_tokens,
+                'output_tokens': result.usage.output_tokens
             }
 
-            raw_content = response_data["choices"][0]["message"]["content"].strip()
+            raw_content = result.content.strip()
             logger.info("EV raw response: " + raw_content)
 
             # Check if the content is exactly a 1–3 digit integer (0–100)
             if re.fullmatch(r"\d{1,3}", raw_content):
                 ev = int(raw_content)
                 ev_score = max(0, min(100, ev))
+                llm_cache.put(cache_key, 'ev_calculation', ev_score)
                 
                 # Store the invocation record
                 store_ai_invocation(
@@ -145,6 +144,9 @@ def calc_ev(messages: list, account_id: str, conversation_id: str, session_id: s
         logger.error("The AI did not return a valid integer after retries")
         return -2, {'input_tokens': 0, 'output_tokens': 0}
 
+    except TogetherError as e:
+        logger.error(f"Together AI call failed in calc_ev: {e.message}")
+        return -3, {'input_tokens': 0, 'output_tokens': 0}
     except Exception as e:
         logger.error(f"Error in calc_ev: {str(e)}")
         return -3, {'input_tokens': 0, 'output_tokens': 0}
@@ -0,0 +1,110 @@
+# ev_flag_llm.py
+import logging
+import re
+from typing import Dict, Any, List, Tuple
+from config import TAI_KEY
+from db import check_and_update_ai_rate_limit
+from ev_calculator import EV_SYSTEM_PROMPT
+from flag_llm import FLAG_SYSTEM_PROMPT, format_conversation_for_llm
+from metrics import metrics
+from llm_cache import llm_cache, CACHED
+from together_client import chat_completion, TogetherError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+EV_FLAG_SYSTEM_PROMPT = (
+    "You make two assessments of the same buyer–realtor email thread.\n\n"
+    "ASSESSMENT 1 - EV SCORE:\n"
+    f"{EV_SYSTEM_PROMPT}\n\n"
+    "ASSESSMENT 2 - HANDOFF FLAG:\n"
+    f"{FLAG_SYSTEM_PROMPT}\n\n"
+    "OUTPUT FORMAT (overrides the output rules of both assessments above):\n"
+    "Return exactly one line: the integer score, a semicolon, then \"flag\" or \"ok\". "
+    "Examples: 37;ok or 82;flag. No spaces, no other text."
+)
+
+# Reply of the combined scorer, e.g. "37;ok" or "82;flag"
+EV_FLAG_REPLY = re.compile(r'^\s*(\d{1,3})\s*;\s*(flag|ok)\s*$', re.IGNORECASE)
+
+def calc_ev_and_flag(chain: List[Dict[str, Any]], account_id: str, conversation_id: str, session_id: str) -> Tuple[int, bool, Dict[str, int]]:
+    """
+    Gets the EV score (0–100) and the handoff flag for a conversation from one
+    LLM call and one AI rate limit reservation, instead of calc_ev followed by
+    invoke_flag_llm. The thread is sent once, formatted as for the flag LLM.
+    Retries once if the reply does not match EV_FLAG_REPLY. A result cached for
+    the same thread (see llm_cache.py) is returned without either, with 0 tokens
+    and token_usage['cache_status'] set; the caller records it in Invocations.
+
+    Args:
+        chain: List of email messages in the conversation
+        account_id: The account ID
+        conversation_id: The conversation ID
+        session_id: The session ID for authorization
+
+    Returns:
+        Tuple[int, bool, Dict[str, int]]: (ev_score, should_flag, token_usage). ev_score uses
+        the negative codes of calc_ev on failure (-4 rate limited, -2 no valid reply, -3 error),
+        with should_flag False.
+    """
+    logger.info(f"Calculating EV and flag for {len(chain)} messages")
+
+    payload = {
+        "model": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
+        "messages": [
+            {"role": "system", "content": EV_FLAG_SYSTEM_PROMPT},
+            {"role": "user", "content": format_conversation_for_llm(chain)}
+        ],
+        "max_tokens": 8,  # "100;flag" at most
+        "temperature": 0.0,  # Zero temperature for deterministic responses
+        "top_p": 0.1,  # Low top_p for focused sampling
+        "frequency_penalty": 0.0,  # No frequency penalty needed
+        "presence_penalty": 0.0,  # No presence penalty needed
+        "stop": ["\n"]
+    }
+
+    # The same thread was scored before: no LLM call and no rate limit reservation
+    cache_key = llm_cache.key('ev_flag', payload)
+    hit, cached = llm_cache.get(cache_key)
+    if hit:
+        ev_score, should_flag = cached
+        logger.info(f"EV and flag served from the LLM cache: {ev_score}, {should_flag}")
+        return ev_score, should_flag, {'input_tokens': 0, 'output_tokens': 0, 'cache_status': CACHED}
+
+    # Check AI rate limit
+    is_allowed, message = check_and_update_ai_rate_limit(account_id, session_id)
+    if not is_allowed:
+        logger.error(f"AI rate limit exceeded for account {account_id}")
+        return -4, False, {'input_tokens': 0, 'output_tokens': 0}
+
+    token_usage = {'input_tokens': 0, 'output_tokens': 0}
+    try:
+        # Same two attempts as calc_ev; usage of both counts
+        for attempt in range(2):
+            logger.info(f"Sending request to Together AI API (attempt {attempt+1})")
+            with metrics.stage('llm_ev_flag'):
+                result = chat_completion(payload, api_key=TAI_KEY)
+
+            token_usage['input_tokens'] += result.usage.input_tokens
+            token_usage['output_tokens'] += result.usage.output_tokens
+
+            raw_content = result.content.strip()
+            logger.info("EV/flag raw response: " + raw_content)
+
+            match = EV_FLAG_REPLY.match(raw_content)
+            if match:
+                ev_score = max(0, min(100, int(match.group(1))))
+                should_flag = match.group(2).lower() == 'flag'
+                llm_cache.put(cache_key, 'ev_flag', [ev_score, should_flag])
+                return ev_score, should_flag, token_usage
+            logger.warning(f"Attempt {attempt+1}: AI returned \"{raw_content}\", expected <score>;<flag|ok>. Retrying...")
+
+        logger.error("The AI did not return a valid score and flag after retries")
+        return -2, False, token_usage
+
+    except TogetherError as e:
+        logger.error(f"Together AI call failed in calc_ev_and_flag: {e.message}")
+        return -3, False, token_usage
+    except Exception as e:
+        logger.error(f"Error in calc_ev_and_flag: {str(e)}")
+        return -3, False, token_usage
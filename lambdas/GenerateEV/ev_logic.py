@@ -1,13 +1,78 @@
 import time
 import boto3
-from config import logger
+from config import logger, EV_SCORING_MODE
 from utils import LambdaError, store_ai_invocation, update_thread_ev, update_conversation_ev
 from ev_calculator import calc_ev
 from db import get_email_chain, update_thread_attributes
 from flag_llm import invoke_flag_llm
+from ev_flag_llm import calc_ev_and_flag
+from metrics import metrics
 
 dynamodb = boto3.resource('dynamodb')
 
+def score_separately(chain: list, account_id: str, conversation_id: str, session_id: str) -> tuple[int, bool, dict[str, int], dict[str, int]]:
+    """
+    EV score from calc_ev, then the flag decision from invoke_flag_llm.
+    
+    Returns:
+        Tuple[int, bool, Dict[str, int], Dict[str, int]]: (ev_score, should_flag, token_usage_ev, token_usage_flag)
+        
+    Raises:
+        LambdaError: If the EV score cannot be calculated
+    """
+    # Calculate EV score
+    with metrics.stage('ev'):
+        ev_result = calc_ev(chain, account_id, conversation_id, session_id)
+    if isinstance(ev_result, tuple):
+        ev_score, token_usage_ev = ev_result
+    else:
+        ev_score = ev_result
+        token_usage_ev = {'input_tokens': 0, 'output_tokens': 0}
+    
+    if ev_score < 0:
+        raise LambdaError(500, f"Failed to calculate EV score for conversation {conversation_id}")
+    
+    # Get flag decision
+    with metrics.stage('flag'):
+        flag_result = invoke_flag_llm(chain, account_id, conversation_id, session_id)
+    if isinstance(flag_result, tuple):
+        should_flag, token_usage_flag = flag_result
+    else:
+        should_flag = flag_result
+        token_usage_flag = {'input_tokens': 0, 'output_tokens': 0}
+    
+    # Ensure should_flag is a boolean
+    if isinstance(should_flag, (tuple, list)):
+        should_flag = bool(should_flag[0]) if should_flag else False
+    else:
+        should_flag = bool(should_flag)
+    
+    return ev_score, should_flag, token_usage_ev, token_usage_flag
+
+def score_combined(chain: list, account_id: str, conversation_id: str, session_id: str) -> tuple[int, bool, dict[str, int], dict[str, int]]:
+    """
+    EV score and flag decision from one calc_ev_and_flag call. Its token usage is
+    split evenly between the EV and flag decisions so Invocations keeps one
+    ev_calculation and one flag record per conversation.
+    
+    Returns:
+        Tuple[int, bool, Dict[str, int], Dict[str, int]]: (ev_score, should_flag, token_usage_ev, token_usage_flag)
+        
+    Raises:
+        LambdaError: If the EV score cannot be calculated
+    """
+    with metrics.stage('ev_flag'):
+        ev_score, should_flag, token_usage = calc_ev_and_flag(chain, account_id, conversation_id, session_id)
+    
+    if ev_score < 0:
+        raise LambdaError(500, f"Failed to calculate EV score for conversation {conversation_id}")
+    
+    token_usage_flag = {key: token_usage[key] // 2 for key in ('input_tokens', 'output_tokens')}
+    token_usage_ev = {key: token_usage[key] - token_usage_flag[key] for key in ('input_tokens', 'output_tokens')}
+    if token_usage.get('cache_status'):
+        token_usage_ev['cache_status'] = token_usage_flag['cache_status'] = token_usage['cache_status']
+    return ev_score, should_flag, token_usage_ev, token_usage_flag
+
 def calculate_ev_for_conversation(conversation_id: str, account_id: str, session_id: str) -> tuple[int, dict[str, int]]:
     """
     Calculate the EV score for a conversation.
@@ -24,7 +89,8 @@ def calculate_ev_for_conversation(conversation_id: str, account_id: str, session
         LambdaError: If any step fails
     """
     # Get the email chain
-    chain_result = get_email_chain(conversation_id, account_id, session_id)
+    with metrics.stage('chain'):
+        chain_result = get_email_chain(conversation_id, account_id, session_id)
     if not chain_result:
         raise LambdaError(404, f"Failed to get email chain for conversation {conversation_id}")
     
@@ -38,38 +104,19 @@ def calculate_ev_for_conversation(conversation_id: str, account_id: str, session
     if not chain:
         raise LambdaError(404, f"Failed to get email chain for conversation {conversation_id}")
     
-    # Calculate EV score
-    ev_result = calc_ev(chain, account_id, conversation_id, session_id)
-    if isinstance(ev_result, tuple):
-        ev_score, token_usage_ev = ev_result
-    else:
-        ev_score = ev_result
-        token_usage_ev = {'input_tokens': 0, 'output_tokens': 0}
-    
-    if ev_score < 0:
-        raise LambdaError(500, f"Failed to calculate EV score for conversation {conversation_id}")
-    
-    # Get flag decision
-    flag_result = invoke_flag_llm(chain, account_id, conversation_id, session_id)
-    if isinstance(flag_result, tuple):
-        should_flag, token_usage_flag = flag_result
-    else:
-        should_flag = flag_result
-        token_usage_flag = {'input_tokens': 0, 'output_tokens': 0}
-    
-    # Ensure should_flag is a boolean
-    if isinstance(should_flag, (tuple, list)):
-        should_flag = bool(should_flag[0]) if should_flag else False
+    if EV_SCORING_MODE == 'combined':
+        ev_score, should_flag, token_usage_ev, token_usage_flag = score_combined(chain, account_id, conversation_id, session_id)
     else:
-        should_flag = bool(should_flag)
+        ev_score, should_flag, token_usage_ev, token_usage_flag = score_separately(chain, account_id, conversation_id, session_id)
     
-    # Update thread EV with flag decision
-    if not update_thread_ev(conversation_id, ev_score, should_flag, account_id, session_id):
-        raise LambdaError(500, f"Failed to update thread EV for conversation {conversation_id}")
-    
-    # Update conversation EV (using conversation_id as message_id if not available)
-    if not update_conversation_ev(conversation_id, conversation_id, ev_score, account_id, session_id):
-        raise LambdaError(500, f"Failed to update conversation EV for conversation {conversation_id}")
+    with metrics.stage('save'):
+        # Update thread EV with flag decision
+        if not update_thread_ev(conversation_id, ev_score, should_flag, account_id, session_id):
+            raise LambdaError(500, f"Failed to update thread EV for conversation {conversation_id}")
+
+        # Update conversation EV (using conversation_id as message_id if not available)
+        if not update_conversation_ev(conversation_id, conversation_id, ev_score, account_id, session_id):
+            raise LambdaError(500, f"Failed to update conversation EV for conversation {conversation_id}")
     
     # Calculate total token usage
     total_input_tokens = token_usage_ev.get('input_tokens', 0) + token_usage_flag.get('input_tokens', 0)
@@ -83,7 +130,8 @@ def calculate_ev_for_conversation(conversation_id: str, account_id: str, session
         llm_email_type='ev_calculation',
         model_name='meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8',
         conversation_id=conversation_id,
-        session_id=session_id
+        session_id=session_id,
+        cache_status=token_usage_ev.get('cache_status')
     ):
         logger.error(f"Failed to store EV calculation invocation record for conversation {conversation_id}")
     
@@ -94,7 +142,8 @@ def calculate_ev_for_conversation(conversation_id: str, account_id: str, session
         llm_email_type='flag',
         model_name='meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8',
         conversation_id=conversation_id,
-        session_id=session_id
+        session_id=session_id,
+        cache_status=token_usage_flag.get('cache_status')
     ):
         logger.error(f"Failed to store flag invocation record for conversation {conversation_id}")
     
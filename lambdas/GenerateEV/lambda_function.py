@@ -3,6 +3,8 @@ import logging
 from typing import Dict, Any
 import os
 
+# Before any module that creates boto3 clients, so their calls are counted
+from metrics import metrics
 from ev_logic import calculate_ev_for_conversation
 from utils import parse_event, authorize, AuthorizationError, invoke_lambda, create_response, LambdaError, check_aws_rate_limit
 
@@ -12,6 +14,7 @@ logger.setLevel(logging.INFO)
 
 AUTH_BP = os.environ.get('AUTH_BP', '')
 
+@metrics.invocation
 def lambda_handler(event, context):
     """
     Main lambda handler for EV calculation.
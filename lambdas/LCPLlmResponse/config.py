@@ -17,6 +17,11 @@ DB_SELECT_LAMBDA = os.environ['DB_SELECT_LAMBDA']  # Single Lambda for all DB op
 AWS_RATE_LIMIT_LAMBDA = "RateLimitAWS"  # AWS rate limit Lambda
 AI_RATE_LIMIT_LAMBDA = "RateLimitAI"    # AI rate limit Lambda
 
+# 'combined' asks the review (FLAG/CONTINUE) and scenario questions in one triage LLM call,
+# falling back to the separate reviewer and selector calls if its reply does not parse;
+# 'separate' always makes the two calls
+TRIAGE_MODE = os.environ.get('TRIAGE_MODE', 'combined').lower()
+
 BEDROCK_KB_ID     = os.getenv("BEDROCK_KB_ID")      # your KB's ID
 BEDROCK_MODEL_ARN = os.getenv("BEDROCK_MODEL_ARN")  # e.g. "anthropic.claude-v2:1"
 
@@ -2,7 +2,7 @@
 import json
 import boto3
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from config import AWS_REGION, DB_SELECT_LAMBDA
 import time
 import uuid
@@ -46,6 +46,40 @@ def invoke_db_select(table_name: str, index_name: Optional[str], key_name: str,
         logger.error(f"Error invoking database Lambda: {str(e)}")
         return None
 
+# Users rows fetched during the current invocation, keyed by (account_id, session_id).
+# Cleared by the handler at the start of every invocation so profile edits are seen next time.
+_user_profiles: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+
+def clear_user_profile_cache() -> None:
+    """Forget Users rows cached by a previous invocation."""
+    _user_profiles.clear()
+
+def get_user_profile(account_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the Users row for an account, fetching it at most once per invocation.
+    Returns None if the user does not exist or the lookup failed (failures are not cached).
+    """
+    if not account_id:
+        return None
+
+    key = (account_id, session_id)
+    if key in _user_profiles:
+        return _user_profiles[key]
+
+    result = invoke_db_select(
+        table_name='Users',
+        index_name="id-index",
+        key_name='id',
+        key_value=account_id,
+        account_id=account_id,
+        session_id=session_id
+    )
+    if result is None:
+        return None
+
+    _user_profiles[key] = result[0] if result else None
+    return _user_profiles[key]
+
 def get_conversation_id(message_id: str, account_id: str, session_id: str) -> Optional[str]:
     """Get conversation ID by message ID."""
     if not message_id:
@@ -109,34 +143,13 @@ def get_email_chain(conversation_id: str, account_id: str, session_id: str) -> L
 
 def get_account_email(account_id: str, session_id: str) -> Optional[str]:
     """Get account email by account ID."""
-    result = invoke_db_select(
-        table_name='Users',
-        index_name="id-index",
-        key_name='id',
-        key_value=account_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    # Handle list response
-    if isinstance(result, list) and result:
-        return result[0].get('responseEmail')
-    return None
+    user = get_user_profile(account_id, session_id)
+    return user.get('responseEmail') if user else None
 
 def get_user_preferences(account_id: str, session_id: str) -> Dict[str, str]:
     """Get user's LLM preferences (tone, style, sample prompt) by account ID."""
-    result = invoke_db_select(
-        table_name='Users',
-        index_name="id-index",
-        key_name='id',
-        key_value=account_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    # Handle list response
-    if isinstance(result, list) and result:
-        user = result[0]
+    user = get_user_profile(account_id, session_id)
+    if user:
         return {
             'lcp_tone': user.get('lcp_tone', 'NULL'),
             'lcp_style': user.get('lcp_style', 'NULL'),
@@ -155,7 +168,8 @@ def store_llm_invocation(
     llm_email_type: str,
     model_name: str,
     conversation_id: Optional[str] = None,
-    invocation_id: Optional[str] = None
+    invocation_id: Optional[str] = None,
+    cache_status: Optional[str] = None
 ) -> bool:
     """
     Store an LLM invocation record in DynamoDB.
@@ -165,6 +179,7 @@ def store_llm_invocation(
     - llm_email_type: Can be scenario names like 'intro_email', 'continuation_email' 
                      or middleman types like 'intro_email_middleman', 'continuation_email_middleman'
     - invocation_id: Unique ID for the Lambda invocation (groups all LLM calls within one Lambda execution)
+    - cache_status: Marks a result served without an LLM call (see llm_cache.py)
     
     Returns True if successful, False otherwise.
     """
@@ -185,7 +200,7 @@ def store_llm_invocation(
         # Valid scenarios for validation
         valid_scenarios = [
             "summarizer", "intro_email", "continuation_email", "follow_up", 
-            "closing_referral", "selector_llm", "reviewer_llm"
+            "closing_referral", "selector_llm", "reviewer_llm", "triage_llm"
         ]
         
         # Log detailed information about the invocation
@@ -235,6 +250,8 @@ def store_llm_invocation(
             item['conversation_id'] = conversation_id
         if invocation_id:
             item['invocation_id'] = invocation_id  # Groups all LLM calls within one Lambda execution
+        if cache_status:
+            item['cache_status'] = cache_status
             
         invocations_table.put_item(Item=item)
         
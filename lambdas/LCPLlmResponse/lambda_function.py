@@ -4,8 +4,10 @@ import logging
 import os
 from typing import Dict, Any, Tuple, Optional
 
+# Before any module that creates boto3 clients, so their calls are counted
+from metrics import metrics
 from llm_interface import generate_email_response, invoke_rate_limit
-from db import get_email_chain
+from db import get_email_chain, clear_user_profile_cache
 from config import logger, AWS_REGION, AWS_RATE_LIMIT_LAMBDA, AI_RATE_LIMIT_LAMBDA, AUTH_BP
 from utils import authorize, parse_event
 
@@ -84,11 +86,15 @@ def generate_response_for_conversation(conversation_id: str, account_id: str, se
 
 
 
+@metrics.invocation
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Main Lambda handler for processing email responses.
     """
     try:
+        # Users rows are cached per invocation only
+        clear_user_profile_cache()
+
         # Use robust event parsing
         parsed_event = parse_event(event)
         # Extract fields from parsed_event
@@ -139,7 +145,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Generate email response
         try:
             # Get the email chain
-            chain = get_email_chain(conversation_id, acc_id, session_id)
+            with metrics.stage('chain'):
+                chain = get_email_chain(conversation_id, acc_id, session_id)
 
             response = generate_email_response(
                 emails=chain,
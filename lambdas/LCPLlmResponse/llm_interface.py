@@ -1,22 +1,20 @@
 import json
-import urllib3
 import boto3
 import logging
+import re
 import time
-from config import TAI_KEY, AWS_REGION, AI_RATE_LIMIT_LAMBDA
+from config import TAI_KEY, AWS_REGION, AI_RATE_LIMIT_LAMBDA, TRIAGE_MODE
 from typing import Optional, Dict, Any, List, Tuple
 from prompts import get_prompts, MODEL_MAPPING
 from db import store_llm_invocation
+from metrics import metrics
+from together_client import chat_completion, LLMResult, LLMUsage
+from llm_cache import llm_cache, CACHED
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize urllib3 pool manager
-http = urllib3.PoolManager()
-
-url = "https://api.together.xyz/v1/chat/completions"
-
 
 def invoke_rate_limit(lambda_name: str, account_id: str, session_id: str) -> Tuple[bool, Optional[str]]:
     """
@@ -151,10 +149,6 @@ class LLMResponder:
         logger.info(f"Middleman formatted {len(messages)} total messages (including system prompt)")
         
         # Prepare API payload for middleman
-        headers = {
-            "Authorization": f"Bearer {TAI_KEY}",
-            "Content-Type": "application/json"
-        }
         payload = {
             "model": self.middleman_model,
             "messages": messages,
@@ -167,33 +161,12 @@ class LLMResponder:
             logger.info(f"Calling middleman API with model: {self.middleman_model}")
             logger.info(f"Middleman payload: {json.dumps(payload, indent=2)}")
             
-            encoded_data = json.dumps(payload).encode('utf-8')
-            response = http.request(
-                'POST',
-                url,
-                body=encoded_data,
-                headers=headers
-            )
-            
-            logger.info(f"Middleman API response status: {response.status}")
-            if response.status != 200:
-                error_msg = response.data.decode('utf-8')
-                logger.error(f"Middleman API call failed with status {response.status}: {error_msg}")
-                raise Exception(f"Failed to fetch response from middleman LLM: {error_msg}")
-            
-            response_data = json.loads(response.data.decode('utf-8'))
-            logger.info("Middleman raw API response:")
-            logger.info(json.dumps(response_data, indent=2))
-            
-            if "choices" not in response_data:
-                logger.error(f"Invalid middleman API response format: {response_data}")
-                raise Exception("Invalid response format from middleman LLM")
-            
+            with metrics.stage('llm_middleman'):
+                result = chat_completion(payload, api_key=TAI_KEY)
+            logger.info(f"Middleman API call completed in {result.latency_ms:.0f}ms ({result.attempts} attempt(s))")
+
             # Extract token usage
-            usage = response_data.get("usage", {})
-            input_tokens = usage.get("prompt_tokens", 0)
-            output_tokens = usage.get("completion_tokens", 0)
-            total_tokens = usage.get("total_tokens", 0)
+            input_tokens, output_tokens, total_tokens = result.usage
             
             logger.info(f"Middleman token usage - Input: {input_tokens}, Output: {output_tokens}, Total: {total_tokens}")
             
@@ -210,7 +183,7 @@ class LLMResponder:
                 )
                 logger.info(f"Stored middleman invocation record: {'Success' if invocation_success else 'Failed'}")
             
-            middleman_instructions = response_data["choices"][0]["message"]["content"]
+            middleman_instructions = result.content
             logger.info(f"Middleman instructions generated successfully - length: {len(middleman_instructions)} characters")
             logger.info(f"Middleman instructions preview: {middleman_instructions[:500]}...")
             logger.info(f"=== MIDDLEMAN LLM CALL END ===")
@@ -255,10 +228,6 @@ class LLMResponder:
         logger.info(f"Combined system prompt preview: {combined_system_prompt[:300]}...")
         
         # Prepare API payload for output LLM
-        headers = {
-            "Authorization": f"Bearer {TAI_KEY}",
-            "Content-Type": "application/json"
-        }
         payload = {
             "model": self.model_name,
             "messages": messages,
@@ -271,33 +240,12 @@ class LLMResponder:
             logger.info(f"Calling output API with model: {self.model_name}")
             logger.info(f"Output payload: {json.dumps(payload, indent=2)}")
             
-            encoded_data = json.dumps(payload).encode('utf-8')
-            response = http.request(
-                'POST',
-                url,
-                body=encoded_data,
-                headers=headers
-            )
-            
-            logger.info(f"Output API response status: {response.status}")
-            if response.status != 200:
-                error_msg = response.data.decode('utf-8')
-                logger.error(f"Output API call failed with status {response.status}: {error_msg}")
-                raise Exception(f"Failed to fetch response from output LLM: {error_msg}")
-            
-            response_data = json.loads(response.data.decode('utf-8'))
-            logger.info("Output raw API response:")
-            logger.info(json.dumps(response_data, indent=2))
-            
-            if "choices" not in response_data:
-                logger.error(f"Invalid output API response format: {response_data}")
-                raise Exception("Invalid response format from output LLM")
-            
+            with metrics.stage('llm_output'):
+                result = chat_completion(payload, api_key=TAI_KEY)
+            logger.info(f"Output API call completed in {result.latency_ms:.0f}ms ({result.attempts} attempt(s))")
+
             # Extract token usage
-            usage = response_data.get("usage", {})
-            input_tokens = usage.get("prompt_tokens", 0)
-            output_tokens = usage.get("completion_tokens", 0)
-            total_tokens = usage.get("total_tokens", 0)
+            input_tokens, output_tokens, total_tokens = result.usage
             
             logger.info(f"Output token usage - Input: {input_tokens}, Output: {output_tokens}, Total: {total_tokens}")
             
@@ -314,7 +262,7 @@ class LLMResponder:
                 )
                 logger.info(f"Stored output invocation record: {'Success' if invocation_success else 'Failed'}")
             
-            final_email = response_data["choices"][0]["message"]["content"]
+            final_email = result.content
             logger.info(f"Final email generated successfully - length: {len(final_email)} characters")
             logger.info(f"Final email preview: {final_email[:300]}...")
             logger.info(f"=== OUTPUT LLM CALL END ===")
@@ -325,71 +273,74 @@ class LLMResponder:
             logger.error(f"=== OUTPUT LLM CALL FAILED ===")
             raise
 
-    def send(self, messages: List[Dict[str, str]], conversation_id: Optional[str] = None) -> str:
-        headers = {
-            "Authorization": f"Bearer {TAI_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
+    def payload(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Together AI request body for messages with this responder's model and hyperparameters."""
+        return {
             "model": self.model_name,
             "messages": messages,
             **self.hyperparameters,
             "stop": ["<|im_end|>", "<|endoftext|>"],
             "stream": False
         }
+
+    def complete(self, messages: List[Dict[str, str]], conversation_id: Optional[str] = None) -> LLMResult:
+        """
+        One Together AI completion with this responder's model and hyperparameters.
+        Nothing is recorded in Invocations; see record_invocation.
+        """
+        payload = self.payload(messages)
+        logger.info(f"Sending request to Together AI API:")
+        logger.info(f"Scenario: '{self.scenario}'")
+        logger.info(f"Conversation ID: {conversation_id}")
+        logger.info(f"Account ID: {self.account_id}")
+        logger.info(f"Number of messages: {len(messages)}")
+        logger.info(f"Request payload: {json.dumps(payload, indent=2)}")
+        
+        logger.info("Making API request...")
+        with metrics.stage('llm'):
+            result = chat_completion(payload, api_key=TAI_KEY)
+        logger.info(f"API call completed in {result.latency_ms:.0f}ms ({result.attempts} attempt(s))")
+        logger.info(f"Token usage - Input: {result.usage.input_tokens}, Output: {result.usage.output_tokens}, Total: {result.usage.total_tokens}")
+        return result
+
+    def record_invocation(self, usage: LLMUsage, conversation_id: Optional[str] = None, llm_email_type: Optional[str] = None,
+                          cache_status: Optional[str] = None) -> None:
+        """Store an Invocations row for usage (as llm_email_type, default this responder's scenario) if we have an account_id."""
+        if not self.account_id:
+            return
+        logger.info("Storing invocation record in DynamoDB")
+        invocation_success = store_llm_invocation(
+            associated_account=self.account_id,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            llm_email_type=llm_email_type or self.scenario,
+            model_name=self.model_name,
+            conversation_id=conversation_id,
+            cache_status=cache_status
+        )
+        logger.info(f"Stored invocation record: {'Success' if invocation_success else 'Failed'}")
+
+    def cached_result(self, messages: List[Dict[str, str]], conversation_id: Optional[str] = None,
+                      llm_email_types: Optional[List[str]] = None) -> Tuple[str, bool, Any]:
+        """
+        (cache key, hit, result) for this responder's classification of messages (see llm_cache.py).
+        A hit is recorded in Invocations with 0 tokens and cache_status 'cached', once per
+        llm_email_types entry (default this responder's scenario).
+        """
+        cache_key = llm_cache.key(self.scenario, self.payload(messages))
+        hit, result = llm_cache.get(cache_key)
+        if hit:
+            logger.info(f"{self.scenario} result served from the LLM cache: {result}")
+            for llm_email_type in llm_email_types or [self.scenario]:
+                self.record_invocation(LLMUsage(0, 0, 0), conversation_id, llm_email_type, cache_status=CACHED)
+        return cache_key, hit, result
+
+    def send(self, messages: List[Dict[str, str]], conversation_id: Optional[str] = None) -> str:
         try:
-            logger.info(f"Sending request to Together AI API:")
-            logger.info(f"Scenario: '{self.scenario}'")
-            logger.info(f"Conversation ID: {conversation_id}")
-            logger.info(f"Account ID: {self.account_id}")
-            logger.info(f"Number of messages: {len(messages)}")
-            logger.info(f"Request payload: {json.dumps(payload, indent=2)}")
-            
-            encoded_data = json.dumps(payload).encode('utf-8')
-            logger.info("Making API request...")
-            response = http.request(
-                'POST',
-                url,
-                body=encoded_data,
-                headers=headers
-            )
-            
-            logger.info(f"API response status: {response.status}")
-            if response.status != 200:
-                error_msg = response.data.decode('utf-8')
-                logger.error(f"API call failed with status {response.status}: {error_msg}")
-                raise Exception(f"Failed to fetch response from Together AI API: {error_msg}")
-            
-            response_data = json.loads(response.data.decode('utf-8'))
-            logger.info("Raw API response:")
-            logger.info(json.dumps(response_data, indent=2))
-            
-            if "choices" not in response_data:
-                logger.error(f"Invalid API response format: {response_data}")
-                raise Exception("Invalid response format from Together AI API")
-            
-            # Extract token usage from response
-            usage = response_data.get("usage", {})
-            input_tokens = usage.get("prompt_tokens", 0)
-            output_tokens = usage.get("completion_tokens", 0)
-            total_tokens = usage.get("total_tokens", 0)
-            
-            logger.info(f"Token usage - Input: {input_tokens}, Output: {output_tokens}, Total: {total_tokens}")
-            
-            # Store invocation record if we have an account_id
-            if self.account_id:
-                logger.info("Storing invocation record in DynamoDB")
-                invocation_success = store_llm_invocation(
-                    associated_account=self.account_id,
-                    input_tokens=input_tokens,
-                    output_tokens=output_tokens,
-                    llm_email_type=self.scenario,
-                    model_name=self.model_name,
-                    conversation_id=conversation_id
-                )
-                logger.info(f"Stored invocation record: {'Success' if invocation_success else 'Failed'}")
+            result = self.complete(messages, conversation_id)
+            self.record_invocation(result.usage, conversation_id)
             
-            content = response_data["choices"][0]["message"]["content"]
+            content = result.content
             logger.info(f"Generated response length: {len(content)} characters")
             return content.replace('\\n', '\n')
         except Exception as e:
@@ -645,6 +596,34 @@ def update_thread_flag_review_override(conversation_id: str, flag_value: str) ->
         logger.error(f"Error updating flag_review_override: {str(e)}")
         return False
 
+# Scenarios the selector (and triage) LLM may choose
+SELECTOR_SCENARIOS = ("summarizer", "intro_email", "continuation_email", "closing_referral")
+
+# Triage reply: FLAG or CONTINUE, a semicolon, and a scenario keyword
+TRIAGE_REPLY = re.compile(r'^\s*(FLAG|CONTINUE)\s*;\s*([A-Za-z_]+)\s*$', re.IGNORECASE)
+
+def normalize_scenario(raw_scenario: str) -> Optional[str]:
+    """
+    Lowercased scenario keyword ('intro' maps to 'intro_email'), or None if it is not one of SELECTOR_SCENARIOS.
+    """
+    scenario = raw_scenario.strip().lower()
+    if scenario == 'intro':
+        scenario = 'intro_email'
+    return scenario if scenario in SELECTOR_SCENARIOS else None
+
+def parse_triage_reply(reply: str) -> Optional[Tuple[bool, str]]:
+    """
+    (flagged, scenario) from a 'FLAG;scenario' / 'CONTINUE;scenario' reply,
+    or None if the reply has any other shape or names an unknown scenario.
+    """
+    match = TRIAGE_REPLY.match(reply)
+    if not match:
+        return None
+    scenario = normalize_scenario(match.group(2))
+    if scenario is None:
+        return None
+    return match.group(1).upper() == 'FLAG', scenario
+
 def check_with_reviewer_llm(email_chain: List[Dict[str, Any]], conversation_id: str, account_id, session_id) -> bool:
     """
     Uses the reviewer_llm to determine if a conversation needs human review.
@@ -672,9 +651,13 @@ def check_with_reviewer_llm(email_chain: List[Dict[str, Any]], conversation_id:
     messages = reviewer.format_conversation(email_chain)
     
     try:
-        logger.info("Invoking reviewer LLM to check if conversation needs review...")
-        response = reviewer.send(messages, conversation_id)
-        decision = response.strip().upper()
+        cache_key, hit, decision = reviewer.cached_result(messages, conversation_id)
+        if not hit:
+            logger.info("Invoking reviewer LLM to check if conversation needs review...")
+            response = reviewer.send(messages, conversation_id)
+            decision = response.strip().upper()
+            if decision in ("FLAG", "CONTINUE"):
+                llm_cache.put(cache_key, "reviewer_llm", decision)
         logger.info(f"Reviewer LLM decision: {decision}")
         
         if decision == "FLAG":
@@ -711,37 +694,97 @@ def select_scenario_with_llm(email_chain: List[Dict[str, Any]], conversation_id:
     messages = selector.format_conversation(email_chain)
     
     try:
+        cache_key, hit, scenario = selector.cached_result(messages, conversation_id)
+        if hit:
+            return scenario
+        
         logger.info("Invoking selector LLM to determine scenario...")
         response = selector.send(messages, conversation_id)
         raw_scenario = response.strip()
         logger.info(f"Selector LLM raw response: '{raw_scenario}'")
         
-        # Handle scenarios - convert to lowercase for consistency
-        scenario = raw_scenario.lower()
-        logger.info(f"Normalized scenario: '{scenario}'")
-        
-        # Special handling for 'intro' to map to 'intro_email'
-        if scenario == 'intro':
-            logger.info("Mapping 'intro' to 'intro_email'")
-            scenario = 'intro_email'
-        
         # Validate the scenario is one of the expected email generation scenarios
-        valid_scenarios = ["summarizer", "intro_email", "continuation_email", "closing_referral"]
-        if scenario in valid_scenarios:
+        scenario = normalize_scenario(raw_scenario)
+        if scenario is not None:
+            llm_cache.put(cache_key, "selector_llm", scenario)
             logger.info(f"Selector LLM chose valid scenario: '{scenario}'")
             return scenario
         else:
-            logger.warning(f"Selector LLM returned invalid scenario '{scenario}', defaulting to 'continuation_email'")
+            logger.warning(f"Selector LLM returned invalid scenario '{raw_scenario}', defaulting to 'continuation_email'")
             return "continuation_email"
     except Exception as e:
         logger.error(f"Error in selector LLM: {str(e)}", exc_info=True)  # Added stack trace
         logger.error(f"Defaulting to 'continuation_email' for conversation {conversation_id}")
         return "continuation_email"
 
+def triage_with_llm(email_chain: List[Dict[str, Any]], conversation_id: str, account_id, session_id) -> Optional[Tuple[bool, Optional[str]]]:
+    """
+    Makes the reviewer and selector decisions with one triage_llm call on the conversation.
+    Returns (flagged, scenario); scenario is None when the conversation is flagged without a
+    triage decision (override lookup or LLM call failed). Returns None if the reply does not
+    parse, in which case callers fall back to check_with_reviewer_llm and select_scenario_with_llm.
+
+    The call's tokens are recorded as one reviewer_llm and one selector_llm Invocations row,
+    split evenly between them. A decision cached for the same conversation (see llm_cache.py)
+    is used without the call and recorded as those two rows with 0 tokens.
+    """
+    logger.info(f"Starting triage LLM check for conversation {conversation_id}")
+    
+    # Same override handling as check_with_reviewer_llm
+    override_flag = get_thread_flag_review_override(conversation_id)
+    logger.info(f"Review override flag: {override_flag}")
+    
+    if override_flag is None:
+        logger.error(f"Could not get flag_review_override for conversation {conversation_id}")
+        return True, None  # Default to flagging for review on error
+    
+    if override_flag == 'true':
+        logger.info(f"Review override enabled for conversation {conversation_id} - only selecting the scenario")
+        return False, select_scenario_with_llm(email_chain, conversation_id, account_id, session_id)
+    
+    triage = LLMResponder("triage_llm", account_id, session_id)
+    messages = triage.format_conversation(email_chain)
+    
+    cache_key, hit, decision = triage.cached_result(messages, conversation_id, ['reviewer_llm', 'selector_llm'])
+    if not hit:
+        try:
+            logger.info("Invoking triage LLM to check review and determine scenario...")
+            result = triage.complete(messages, conversation_id)
+        except Exception as e:
+            logger.error(f"Error in triage LLM: {str(e)}", exc_info=True)
+            logger.error(f"Defaulting to FLAG for conversation {conversation_id}")
+            if not update_thread_flag_for_review(conversation_id, 'true'):
+                logger.error(f"Failed to update flag_for_review for conversation {conversation_id}")
+            return True, None
+        
+        decision = parse_triage_reply(result.content)
+        if decision is None:
+            logger.warning(f"Triage LLM reply '{result.content.strip()}' did not parse")
+            triage.record_invocation(result.usage, conversation_id)
+            return None
+        llm_cache.put(cache_key, 'triage_llm', list(decision))
+        
+        # Per-decision usage rows, as the two separate calls would have written
+        input_tokens, output_tokens, _ = result.usage
+        review_input, review_output = input_tokens - input_tokens // 2, output_tokens - output_tokens // 2
+        triage.record_invocation(LLMUsage(review_input, review_output, review_input + review_output),
+                                 conversation_id, 'reviewer_llm')
+        triage.record_invocation(LLMUsage(input_tokens // 2, output_tokens // 2, input_tokens // 2 + output_tokens // 2),
+                                 conversation_id, 'selector_llm')
+    
+    flagged, scenario = decision
+    logger.info(f"Triage LLM decision: {'FLAG' if flagged else 'CONTINUE'}, scenario '{scenario}'")
+    if flagged:
+        logger.info(f"Thread flagged for review: {conversation_id}")
+        if not update_thread_flag_for_review(conversation_id, 'true'):
+            logger.error(f"Failed to update flag_for_review for conversation {conversation_id}")
+    return flagged, scenario
+
 def generate_email_response(emails, uid, conversation_id, scenario, invocation_id, session_id):
     """
     Generates a follow-up email response based on the provided email chain and scenario.
-    If scenario is None, uses the reviewer LLM first, then the selector LLM to determine the scenario.
+    If scenario is None, uses the reviewer LLM first, then the selector LLM to determine the scenario
+    (one triage LLM call for both when TRIAGE_MODE is 'combined').
     
     Args:
         emails: List of email messages in the conversation
@@ -757,10 +800,24 @@ def generate_email_response(emails, uid, conversation_id, scenario, invocation_i
         if invocation_id:
             logger.info(f"Invocation ID: {invocation_id}")
         
-        # 1) First check with reviewer LLM if conversation needs review (only if no scenario is forced)
+        # 1) First check with reviewer LLM if conversation needs review (only if no scenario is forced).
+        # When the selector LLM would run next, triage asks both questions in one call instead.
         if conversation_id and scenario is None:
-            logger.info("No scenario provided - checking with reviewer LLM first...")
-            if check_with_reviewer_llm(emails, conversation_id, uid, session_id):
+            triage = None
+            if TRIAGE_MODE == 'combined' and emails and emails[-1].get('type') != 'outbound-email':
+                logger.info("No scenario provided - triaging with one LLM call...")
+                with metrics.stage('triage'):
+                    triage = triage_with_llm(emails, conversation_id, uid, session_id)
+                if triage is None:
+                    logger.warning("Triage reply did not parse - falling back to reviewer and selector LLMs")
+            
+            if triage is not None:
+                flagged, scenario = triage
+            else:
+                logger.info("No scenario provided - checking with reviewer LLM first...")
+                with metrics.stage('review'):
+                    flagged = check_with_reviewer_llm(emails, conversation_id, uid, session_id)
+            if flagged:
                 # If flagged for review, return None to prevent email sending
                 logger.info(f"Conversation {conversation_id} flagged for review - no email will be sent")
                 return None
@@ -776,10 +833,11 @@ def generate_email_response(emails, uid, conversation_id, scenario, invocation_i
                 logger.info("Most recent email is outbound - using 'follow_up' scenario")
             else:
                 logger.info("No scenario provided - using selector LLM to determine scenario...")
-                scenario = select_scenario_with_llm(emails, conversation_id, uid, session_id)
+                with metrics.stage('select_scenario'):
+                    scenario = select_scenario_with_llm(emails, conversation_id, uid, session_id)
                 logger.info(f"Selector LLM determined scenario: '{scenario}'")
         else:
-            logger.info(f"Using provided scenario: '{scenario}'")
+            logger.info(f"Using scenario: '{scenario}'")
   
         # 3) Generate response using the determined scenario
         logger.info(f"Creating LLMResponder for scenario: '{scenario}'")
@@ -796,7 +854,8 @@ def generate_email_response(emails, uid, conversation_id, scenario, invocation_i
             logger.info(f"Responder has middleman: {responder.has_middleman}")
             
             logger.info(f"Starting response generation using '{scenario}' scenario...")
-            response = responder.generate_response(emails, conversation_id)
+            with metrics.stage('generate'):
+                response = responder.generate_response(emails, conversation_id)
             
             # Validate response
             if not response or not response.strip():
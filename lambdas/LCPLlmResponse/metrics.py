@@ -0,0 +1,142 @@
+# metrics.py
+"""
+Per-invocation instrumentation: stage timings and call counters, written as
+one CloudWatch embedded metric format (EMF) line when the handler returns.
+
+    @metrics.invocation
+    def lambda_handler(event, context): ...
+
+    with metrics.stage('fetch_chain'):   # one sample per use; stages may nest
+        ...
+    metrics.record_llm_call(response_data.get('usage', {}))
+
+Every AWS API call made through boto3 is counted by service (DynamoDBCalls,
+LambdaInvokes, S3Calls, ...) by a hook on the default boto3 session. Clients
+copy the session's hooks when they are created, so import this module before
+any module that creates a client.
+
+The line carries one value per counter and a list of samples per stage (in
+milliseconds), with the function name as the only dimension. The same lines
+are what benchmarks/report_stage_metrics.py aggregates locally.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+import boto3
+
+logger = logging.getLogger()
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ACS/EmailProcessing')
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+# Lambda's own name; the code directory when run locally
+FUNCTION_NAME = os.environ.get('AWS_LAMBDA_FUNCTION_NAME') or os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+
+# EMF accepts at most 100 values per metric
+MAX_SAMPLES = 100
+
+AWS_CALL_COUNTERS = {'dynamodb': 'DynamoDBCalls', 'lambda': 'LambdaInvokes', 's3': 'S3Calls', 'sqs': 'SQSCalls'}
+
+def emit_metric(name: str, value: float, **dimensions: str) -> None:
+    """Write one CloudWatch metric in embedded metric format (Lambda ships stdout to CloudWatch Logs)."""
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': 'Count'}]
+            }]
+        },
+        name: value,
+        **dimensions
+    }))
+
+class InvocationMetrics:
+    def __init__(self, function_name: str = FUNCTION_NAME):
+        self.function_name = function_name
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.stages: Dict[str, List[float]] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters = {}
+            self.stages = {}
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self.stages.setdefault(stage, []).append(elapsed_ms)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the block as one sample of the stage, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000.0)
+
+    def record_llm_call(self, usage: Dict[str, Any]) -> None:
+        """Count one Together AI completion and the tokens in its usage block."""
+        self.count('LLMCalls')
+        self.count('LLMInputTokens', usage.get('prompt_tokens', 0) or 0)
+        self.count('LLMOutputTokens', usage.get('completion_tokens', 0) or 0)
+
+    def count_aws_call(self, event_name: str, **kwargs: Any) -> None:
+        """botocore before-call hook; event_name is 'before-call.<service>.<Operation>'."""
+        service = event_name.split('.')[1]
+        self.count(AWS_CALL_COUNTERS.get(service, service.title().replace('-', '') + 'Calls'))
+
+    def to_emf(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {f'Stage.{name}': samples[-MAX_SAMPLES:] for name, samples in self.stages.items()}
+        return {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Function']],
+                    'Metrics': ([{'Name': name, 'Unit': 'Count'} for name in counters] +
+                                [{'Name': name, 'Unit': 'Milliseconds'} for name in stages])
+                }]
+            },
+            'Function': self.function_name,
+            **counters,
+            **stages
+        }
+
+    def emit(self) -> None:
+        if METRICS_ENABLED:
+            print(json.dumps(self.to_emf()))
+
+    def invocation(self, handler):
+        """Decorate a Lambda handler: start each invocation from zero and emit its line on return."""
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            self.reset()
+            try:
+                with self.stage('invocation'):
+                    return handler(event, context)
+            finally:
+                try:
+                    self.emit()
+                except Exception as e:
+                    logger.error(f"Failed to emit invocation metrics: {str(e)}")
+        return wrapper
+
+metrics = InvocationMetrics()
+
+if boto3.DEFAULT_SESSION is None:
+    boto3.setup_default_session()
+boto3.DEFAULT_SESSION.events.register('before-call', metrics.count_aws_call)
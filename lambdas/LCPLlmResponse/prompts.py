@@ -2,7 +2,7 @@ import boto3
 import logging
 from typing import Dict, Any, Optional
 from config import AWS_REGION
-from db import invoke_db_select
+from db import get_user_profile
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -16,6 +16,7 @@ MODEL_MAPPING = {
     "closing_referral": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
     "selector_llm": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",  # Fast classification task
     "reviewer_llm": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",   # Fast review task
+    "triage_llm": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",     # Review and selection in one call
     # Middleman LLMs for content strategy
     "summarizer_middleman": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
     "intro_email_middleman": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
@@ -24,23 +25,59 @@ MODEL_MAPPING = {
     "closing_referral_middleman": "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8"
 }
 
+# System prompts of the classification calls. triage_llm asks both questions in one call
+# (see llm_interface.triage_with_llm), so it is built from the other two.
+REVIEWER_SYSTEM_PROMPT = """You are a business intelligence reviewer determining when a real estate conversation requires the realtor's personal attention. Output exactly one keyword: FLAG or CONTINUE.
+
+FLAG only when the conversation contains issues that require the realtor's direct expertise or intervention:
+
+BUSINESS LOGIC FLAGS:
+1. Pricing discussions, negotiations, or offer-related conversations
+2. Complex market analysis requests or competitive property comparisons  
+3. Scheduling conflicts, urgent timing issues, or time-sensitive opportunities
+4. Client expressing dissatisfaction, confusion, or service concerns
+5. Legal/contractual questions beyond basic information (HOA bylaws, deed restrictions, etc.)
+6. Financing complications or unique lending situations
+7. Referral requests or partnership/vendor discussions
+8. The AI appears to have given potentially incorrect market information
+9. Conversation is going in circles or AI seems unable to progress the lead
+10. Client requesting direct contact or phone calls
+11. Complex property conditions, inspections, or repair negotiations
+12. Investment property analysis or rental/commercial discussions
+
+Additionally, respond with FLAG if there are any tangibles that the AI is not able to properly answer (meeting times, showing times, etc.)
+
+CONTINUE for typical conversations like:
+- Initial inquiries about buying/selling homes
+- Basic qualification questions (budget, timeline, preferences)
+- General market information and property type discussions
+- Standard showing requests and availability coordination
+- Routine follow-up communications
+- Educational content about the buying/selling process
+
+Remember: The goal is identifying when the REALTOR'S specific expertise is needed, not content safety."""
+
+SELECTOR_SYSTEM_PROMPT = "You are a classifier for real estate email automation. Choose exactly one action: summarizer, intro_email, continuation_email, or closing_referral. Output only that keyword.\n\nRules:\n– intro_email: First contact from a new lead\n– continuation_email: Ongoing conversation that needs more qualification/development\n– closing_referral: Lead is ready for human contact OR needs referral\n– summarizer: Thread is too long and needs condensing before processing\n\nPrioritize continuation_email to maximize information gathering before flagging for human intervention."
+
+TRIAGE_SYSTEM_PROMPT = f"""You make two decisions about a real estate email conversation.
+
+DECISION 1 - review:
+{REVIEWER_SYSTEM_PROMPT}
+
+DECISION 2 - scenario:
+{SELECTOR_SYSTEM_PROMPT}
+
+Ignore the output instructions inside the two decisions above. Output exactly one line in the form DECISION;scenario, where DECISION is FLAG or CONTINUE and scenario is one of summarizer, intro_email, continuation_email, closing_referral. Always include a scenario, even with FLAG. Examples: CONTINUE;continuation_email or FLAG;closing_referral. Output nothing else."""
+
 
 def get_user_tone(account_id: str, session_id: str) -> str:
     """Get user's tone preference by account ID."""
     if not account_id:
         return 'NULL'
     
-    result = invoke_db_select(
-        table_name='Users',
-        index_name="id-index",
-        key_name='id',
-        key_value=account_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    if isinstance(result, list) and result:
-        tone = result[0].get('lcp_tone', 'NULL')
+    user = get_user_profile(account_id, session_id)
+    if user:
+        tone = user.get('lcp_tone', 'NULL')
         return tone if tone != 'NULL' else 'NULL'
     return 'NULL'
 
@@ -49,17 +86,9 @@ def get_user_style(account_id: str, session_id: str) -> str:
     if not account_id:
         return 'NULL'
     
-    result = invoke_db_select(
-        table_name='Users',
-        index_name="id-index",
-        key_name='id',
-        key_value=account_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    if isinstance(result, list) and result:
-        style = result[0].get('lcp_style', 'NULL')
+    user = get_user_profile(account_id, session_id)
+    if user:
+        style = user.get('lcp_style', 'NULL')
         return style if style != 'NULL' else 'NULL'
     return 'NULL'
 
@@ -68,17 +97,9 @@ def get_user_sample_prompt(account_id: str, session_id: str) -> str:
     if not account_id:
         return 'NULL'
     
-    result = invoke_db_select(
-        table_name='Users',
-        index_name="id-index",
-        key_name='id',
-        key_value=account_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    if isinstance(result, list) and result:
-        sample = result[0].get('lcp_sample_prompt', 'NULL')
+    user = get_user_profile(account_id, session_id)
+    if user:
+        sample = user.get('lcp_sample_prompt', 'NULL')
         return sample if sample != 'NULL' else 'NULL'
     return 'NULL'
 
@@ -87,17 +108,8 @@ def get_user_location_data(account_id: str, session_id: str) -> Dict[str, str]:
     if not account_id:
         return {}
     
-    result = invoke_db_select(
-        table_name='Users',
-        index_name="id-index",
-        key_name='id',
-        key_value=account_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    if isinstance(result, list) and result:
-        user_data = result[0]
+    user_data = get_user_profile(account_id, session_id)
+    if user_data:
         return {
             'location': user_data.get('location', ''),
             'state': user_data.get('state', ''),
@@ -146,7 +158,7 @@ def construct_realtor_bio(location_data: Dict[str, str]) -> str:
 def get_prompts(account_id: str, session_id: str) -> Dict[str, Dict[str, Any]]:
     """
     Get the prompts dictionary with user preferences and realtor bio embedded directly into the system prompts.
-    For scenarios that don't use preferences (selector_llm, reviewer_llm), account_id and session_id are ignored.
+    For scenarios that don't use preferences (selector_llm, reviewer_llm, triage_llm), account_id and session_id are ignored.
     """
     
     # Get user preferences and bio if account_id provided
@@ -393,7 +405,7 @@ Only reference details and next steps that were actually established in the conv
         },
 
         "selector_llm": {
-            "system": "You are a classifier for real estate email automation. Choose exactly one action: summarizer, intro_email, continuation_email, or closing_referral. Output only that keyword.\n\nRules:\n– intro_email: First contact from a new lead\n– continuation_email: Ongoing conversation that needs more qualification/development\n– closing_referral: Lead is ready for human contact OR needs referral\n– summarizer: Thread is too long and needs condensing before processing\n\nPrioritize continuation_email to maximize information gathering before flagging for human intervention.",
+            "system": SELECTOR_SYSTEM_PROMPT,
             "hyperparameters": {
                 "max_tokens": 2,
                 "temperature": 0.0,
@@ -404,35 +416,7 @@ Only reference details and next steps that were actually established in the conv
         },
 
         "reviewer_llm": {
-            "system": """You are a business intelligence reviewer determining when a real estate conversation requires the realtor's personal attention. Output exactly one keyword: FLAG or CONTINUE.
-
-FLAG only when the conversation contains issues that require the realtor's direct expertise or intervention:
-
-BUSINESS LOGIC FLAGS:
-1. Pricing discussions, negotiations, or offer-related conversations
-2. Complex market analysis requests or competitive property comparisons  
-3. Scheduling conflicts, urgent timing issues, or time-sensitive opportunities
-4. Client expressing dissatisfaction, confusion, or service concerns
-5. Legal/contractual questions beyond basic information (HOA bylaws, deed restrictions, etc.)
-6. Financing complications or unique lending situations
-7. Referral requests or partnership/vendor discussions
-8. The AI appears to have given potentially incorrect market information
-9. Conversation is going in circles or AI seems unable to progress the lead
-10. Client requesting direct contact or phone calls
-11. Complex property conditions, inspections, or repair negotiations
-12. Investment property analysis or rental/commercial discussions
-
-Additionally, respond with FLAG if there are any tangibles that the AI is not able to properly answer (meeting times, showing times, etc.)
-
-CONTINUE for typical conversations like:
-- Initial inquiries about buying/selling homes
-- Basic qualification questions (budget, timeline, preferences)
-- General market information and property type discussions
-- Standard showing requests and availability coordination
-- Routine follow-up communications
-- Educational content about the buying/selling process
-
-Remember: The goal is identifying when the REALTOR'S specific expertise is needed, not content safety.""",
+            "system": REVIEWER_SYSTEM_PROMPT,
             "hyperparameters": {
                 "max_tokens": 5,
                 "temperature": 0.0,
@@ -440,5 +424,16 @@ Remember: The goal is identifying when the REALTOR'S specific expertise is neede
                 "top_k": 1,
                 "repetition_penalty": 1.0
             }
+        },
+
+        "triage_llm": {
+            "system": TRIAGE_SYSTEM_PROMPT,
+            "hyperparameters": {
+                "max_tokens": 12,
+                "temperature": 0.0,
+                "top_p": 1.0,
+                "top_k": 1,
+                "repetition_penalty": 1.0
+            }
         }
-    }
\ No newline at end of file
+    }
@@ -10,11 +10,11 @@ from datetime import datetime, timezone
 from utils import parse_event, create_response, LambdaError, invoke_lambda
 from login_logic import handle_login
 from config import logger
+from cors import get_cors_headers
 
 
 # Environment & AWS clients
 AWS_REGION    = os.environ.get("AWS_REGION", "us-east-2")
-CORS_FUNCTION = os.environ.get("CORS_FUNCTION_NAME", "Allow-Cors")
 lambda_client = boto3.client("lambda", region_name=AWS_REGION)
 
 
@@ -26,21 +26,8 @@ sessions_table = dynamodb.Table(SESSIONS_TABLE)
 
 VALID_PROVIDERS = ("form", "google")
 
-def get_cors_headers():
-    try:
-        response = invoke_lambda(CORS_FUNCTION, {})
-        return response.get('headers', {})
-    except Exception as e:
-        logger.error(f"Failed to fetch CORS headers: {e}")
-        return {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "OPTIONS, POST",
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Credentials": "true",
-        }
-
 def lambda_handler(event, context):
-    cors_headers = get_cors_headers()
+    cors_headers = get_cors_headers(event)
     
     if event.get("httpMethod") == "OPTIONS":
         return {"statusCode": 200, "headers": cors_headers, "body": ""}
@@ -4,6 +4,7 @@ import uuid
 import os
 from datetime import datetime
 from decimal import Decimal
+from cors import get_cors_headers
 
 dynamodb = boto3.resource('dynamodb')
 organizations_table = dynamodb.Table('Organizations')
@@ -12,7 +13,6 @@ invites_table = dynamodb.Table('OrganizationInvites')
 
 # Environment & AWS clients
 AWS_REGION    = os.environ.get("AWS_REGION", "us-east-2")
-CORS_FUNCTION = os.environ.get("CORS_FUNCTION_NAME", "Allow-Cors")
 lambda_client = boto3.client("lambda", region_name=AWS_REGION)
 
 # DynamoDB table for session storage
@@ -20,24 +20,6 @@ SESSIONS_TABLE = os.environ.get("SESSIONS_TABLE", "Sessions")
 dynamodb       = boto3.resource("dynamodb", region_name=AWS_REGION)
 sessions_table = dynamodb.Table(SESSIONS_TABLE)
 
-def get_cors_headers(event):
-    default = {
-        "Access-Control-Allow-Origin":      "localhost:3000",
-        "Access-Control-Allow-Methods":     "OPTIONS, POST",
-        "Access-Control-Allow-Headers":     "Content-Type",
-        "Access-Control-Allow-Credentials": "true",
-    }
-    try:
-        resp = lambda_client.invoke(
-            FunctionName   = CORS_FUNCTION,
-            InvocationType = "RequestResponse",
-            Payload        = json.dumps(event).encode()
-        )
-        data = json.loads(resp["Payload"].read().decode())
-        return data.get("headers", default)
-    except Exception:
-        return default
-
 cors_headers = {}
 
 def decimal_default(obj):
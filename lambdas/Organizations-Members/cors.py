@@ -0,0 +1,57 @@
+# cors.py
+import os
+from functools import lru_cache
+
+# Origins allowed to make credentialed requests. Override with a comma-separated
+# CORS_ALLOWED_ORIGINS environment variable.
+DEFAULT_ALLOWED_ORIGINS = (
+    "https://acs-next-js.vercel.app",
+    "https://automatedconsultancy.com",
+    "http://localhost:3000",
+    "localhost:3000",
+)
+
+ALLOWED_ORIGINS = frozenset(
+    origin.strip()
+    for origin in os.environ.get("CORS_ALLOWED_ORIGINS", ",".join(DEFAULT_ALLOWED_ORIGINS)).split(",")
+    if origin.strip()
+)
+
+ALLOW_METHODS = os.environ.get("CORS_ALLOW_METHODS", "OPTIONS, POST, GET, PUT, DELETE")
+ALLOW_HEADERS = os.environ.get("CORS_ALLOW_HEADERS", "Content-Type, Authorization")
+
+def get_request_origin(event):
+    """
+    Returns the Origin header of an API Gateway event, or None for direct invocations.
+    """
+    headers = (event or {}).get("headers") or {}
+    return headers.get("origin") or headers.get("Origin")
+
+@lru_cache(maxsize=256)
+def _headers_for_origin(origin):
+    if origin is None:
+        # Direct Lambda invocations carry no Origin; Allow-Cors answered '*' for these.
+        allow_origin = "*"
+    elif origin in ALLOWED_ORIGINS:
+        allow_origin = origin
+    else:
+        allow_origin = "null"  # CORS spec requires 'null' for disallowed origins
+    return (
+        ("Access-Control-Allow-Origin", allow_origin),
+        ("Access-Control-Allow-Methods", ALLOW_METHODS),
+        ("Access-Control-Allow-Headers", ALLOW_HEADERS),
+        ("Access-Control-Allow-Credentials", "true"),
+    )
+
+def get_cors_headers(event=None):
+    """
+    Computes CORS headers locally for the request's origin (Get-Cors shape: a bare headers dict).
+    Results are memoized per origin; a fresh dict is returned so callers may modify it.
+    """
+    return dict(_headers_for_origin(get_request_origin(event)))
+
+def get_cors_response(event=None):
+    """
+    Same headers wrapped the way the Allow-Cors Lambda returns them.
+    """
+    return {"statusCode": 200, "headers": get_cors_headers(event), "body": ""}
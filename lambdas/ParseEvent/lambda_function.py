@@ -1,18 +1,14 @@
 import json
 from config import logger
 from utils import create_response
-
-def parse_cookies(cookie_string):
-    """
-    Parses a cookie string into a dictionary.
-    """
-    if not cookie_string:
-        return {}
-    return dict(cookie.split('=', 1) for cookie in cookie_string.split('; '))
+from event_parser import parse_event_data
 
 def lambda_handler(event, context):
     """
     Parse an event from either API Gateway or direct Lambda invocation
+
+    Handlers in this repo parse in-process via event_parser.parse_event_data;
+    this function stays deployed for external callers only.
     
     Args:
         event (dict): The event to parse, either from API Gateway or direct Lambda
@@ -27,27 +23,7 @@ def lambda_handler(event, context):
     """
     try:
         print(f"DEBUG: ParseEvent received event: {json.dumps(event, default=str)}")
-        parsed_data = {}
-        
-        # API Gateway event
-        if 'body' in event and event['body'] is not None:
-            if isinstance(event['body'], str):
-                try:
-                    parsed_data.update(json.loads(event['body']))
-                except json.JSONDecodeError:
-                    # If body is not a valid JSON, it might be a different format.
-                    # This could be handled more gracefully depending on expected inputs.
-                    logger.warning(f"Request body is not a valid JSON string: {event['body']}")
-                    parsed_data['raw_body'] = event['body']
-            else:
-                parsed_data.update(event.get('body', {}))
-
-            if 'headers' in event and 'Cookie' in event['headers']:
-                parsed_data['cookies'] = parse_cookies(event['headers']['Cookie'])
-        
-        # Direct Lambda invocation
-        else:
-            parsed_data.update(event)
+        parsed_data = parse_event_data(event)
         
         print(f"DEBUG: ParseEvent returning parsed_data: {json.dumps(parsed_data, default=str)}")
         return create_response(200, parsed_data)
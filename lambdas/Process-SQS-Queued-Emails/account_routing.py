@@ -0,0 +1,139 @@
+# account_routing.py
+"""
+Per-container cache from inbound destination address to account id.
+
+Inbound email goes to a handful of response addresses, so the Users
+responseEmail-index lookup is cached, keyed by the lower-cased address. Found
+accounts are kept for ACCOUNT_ROUTING_TTL_SECONDS and unknown addresses
+(negative entries) for ACCOUNT_ROUTING_NEGATIVE_TTL_SECONDS. Failed lookups are
+not cached.
+
+verifyNewDomainValid bumps the 'account-routing' generation in CacheGenerations
+when it changes a user's responseEmail. The cache reads the generation at most
+every ACCOUNT_ROUTING_CHECK_SECONDS and drops every entry when it has changed.
+
+With ACCOUNT_ROUTING_WARM, every mapping is loaded when the container starts
+(one paginated, projected scan), and again when it expires or is invalidated.
+The warm map is complete, so an address at a domain no user receives mail on
+is treated as unknown without a lookup.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from config import (
+    ACCOUNT_ROUTING_TTL_SECONDS, ACCOUNT_ROUTING_NEGATIVE_TTL_SECONDS, ACCOUNT_ROUTING_CHECK_SECONDS,
+    ACCOUNT_ROUTING_WARM
+)
+import repository
+
+logger = logging.getLogger()
+
+GENERATION_KEY = 'account-routing'
+
+class AccountRoutingCache:
+    def __init__(self, ttl: float = ACCOUNT_ROUTING_TTL_SECONDS, negative_ttl: float = ACCOUNT_ROUTING_NEGATIVE_TTL_SECONDS,
+                 check_interval: float = ACCOUNT_ROUTING_CHECK_SECONDS):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Optional[str], float]] = {}  # address -> (account id or None, expires)
+        self._warm_domains: Optional[Set[str]] = None
+        self._warm_expires = 0.0
+        self._keep_warm = False
+        self._warming = False
+        self._generation: Optional[int] = None
+        self._next_check = 0.0
+        self.stats: Dict[str, int] = {'hits': 0, 'negative_hits': 0, 'lookups': 0, 'invalidations': 0}
+
+    def _check_generation(self, now: float) -> None:
+        """Drop every entry if the routing generation changed since it was last read."""
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+        try:
+            generation = repository.get_cache_generation(GENERATION_KEY)
+        except Exception as e:
+            logger.error(f"Error reading the account routing generation: {str(e)}")
+            return
+        with self._lock:
+            if self._generation is not None and generation != self._generation:
+                logger.info(f"Account routing changed (generation {self._generation} -> {generation}); clearing cache")
+                self._entries.clear()
+                self._warm_domains = None
+                self._warm_expires = 0.0
+                self.stats['invalidations'] += 1
+            self._generation = generation
+
+    def warm(self) -> int:
+        """Load every responseEmail mapping, and keep reloading it. Returns the number of addresses loaded."""
+        self._keep_warm = True
+        now = time.time()
+        self._check_generation(now)
+        rows = repository.get_all_response_emails()
+        expires = now + self.ttl
+        with self._lock:
+            for row in rows:
+                address = str(row.get('responseEmail', '')).strip().lower()
+                if address and row.get('id'):
+                    self._entries[address] = (row['id'], expires)
+            self._warm_domains = {address.rpartition('@')[2] for address, (account, _) in self._entries.items() if account}
+            self._warm_expires = expires
+        logger.info(f"Warmed account routing cache with {len(rows)} address(es)")
+        return len(rows)
+
+    def _rewarm(self) -> None:
+        with self._lock:
+            if self._warming:
+                return
+            self._warming = True
+        try:
+            self.warm()
+        except Exception as e:
+            logger.error(f"Could not reload the account routing cache: {str(e)}")
+            self._warm_expires = time.time() + self.negative_ttl  # Look addresses up one by one meanwhile
+        finally:
+            self._warming = False
+
+    def lookup(self, address: str) -> Optional[str]:
+        """Account id that receives mail at address, or None if there is none (or the lookup failed)."""
+        address = (address or '').strip().lower()
+        if not address:
+            return None
+        now = time.time()
+        self._check_generation(now)
+        if self._keep_warm and self._warm_expires <= now:
+            self._rewarm()
+
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry and entry[1] > now:
+                self.stats['hits' if entry[0] else 'negative_hits'] += 1
+                return entry[0]
+            if (self._warm_domains is not None and self._warm_expires > now
+                    and address.rpartition('@')[2] not in self._warm_domains):
+                self.stats['negative_hits'] += 1
+                return None
+            self.stats['lookups'] += 1
+
+        try:
+            account = repository.get_account_by_response_email(address)
+        except Exception as e:
+            logger.error(f"Error looking up account for {address}: {str(e)}")
+            return None
+        account_id = account.get('id') if account else None
+        with self._lock:
+            self._entries[address] = (account_id, now + (self.ttl if account_id else self.negative_ttl))
+        return account_id
+
+account_routing = AccountRoutingCache()
+
+if ACCOUNT_ROUTING_WARM:
+    try:
+        account_routing.warm()
+    except Exception as e:
+        # Addresses are then looked up one by one, as they arrive
+        logger.error(f"Could not warm the account routing cache: {str(e)}")
@@ -20,6 +20,52 @@ AWS_REGION = os.environ.get('AWS_REGION', 'us-east-2')
 SPAM_TTL_DAYS = int(os.environ.get('SPAM_TTL_DAYS', 30))  # Default 30 days TTL for spam emails
 AUTH_BP = os.environ.get('AUTH_BP', '')
 
+# Spam verdict cache (see spam_cache.py)
+SPAM_CACHE_TTL_DAYS = int(os.environ.get('SPAM_CACHE_TTL_DAYS', 90))
+SPAM_CACHE_HALF_LIFE_DAYS = float(os.environ.get('SPAM_CACHE_HALF_LIFE_DAYS', 14))
+SPAM_CACHE_MIN_CONFIDENCE = float(os.environ.get('SPAM_CACHE_MIN_CONFIDENCE', 0.6))
+SPAM_CACHE_DOMAIN_MIN_OBSERVATIONS = int(os.environ.get('SPAM_CACHE_DOMAIN_MIN_OBSERVATIONS', 2))
+SPAM_CACHE_LOCAL_TTL_SECONDS = int(os.environ.get('SPAM_CACHE_LOCAL_TTL_SECONDS', 300))
+SPAM_CACHE_LOCAL_SIZE = int(os.environ.get('SPAM_CACHE_LOCAL_SIZE', 2048))
+# Header rules scored before the LLM spam check (see header_rules.py)
+SPAM_RULES_FILE = os.environ.get('SPAM_RULES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spam_rules.json'))
+
+# Destination address -> account routing cache (see account_routing.py)
+ACCOUNT_ROUTING_TTL_SECONDS = int(os.environ.get('ACCOUNT_ROUTING_TTL_SECONDS', 900))
+ACCOUNT_ROUTING_NEGATIVE_TTL_SECONDS = int(os.environ.get('ACCOUNT_ROUTING_NEGATIVE_TTL_SECONDS', 120))
+ACCOUNT_ROUTING_CHECK_SECONDS = int(os.environ.get('ACCOUNT_ROUTING_CHECK_SECONDS', 30))
+# Load every responseEmail mapping when the container starts
+ACCOUNT_ROUTING_WARM = os.environ.get('ACCOUNT_ROUTING_WARM', 'false').lower() == 'true'
+
+# Idempotency ledger keyed by SES messageId (see ledger.py). The lease must outlast the Lambda
+# timeout and stay below the queue's visibility timeout, so a redelivery finds it lapsed
+LEDGER_TTL_DAYS = int(os.environ.get('LEDGER_TTL_DAYS', 14))
+LEDGER_LEASE_SECONDS = int(os.environ.get('LEDGER_LEASE_SECONDS', 120))
+
+# How LLM replies reach Send-Email after their send delay (see scheduling.py): 'queue' sends
+# them to the response dispatch queue, 'scheduler' creates one EventBridge schedule per reply
+RESPONSE_DISPATCH_MODE = os.environ.get('RESPONSE_DISPATCH_MODE', 'queue').lower()
+RESPONSE_DISPATCH_QUEUE_URL = os.environ.get('RESPONSE_DISPATCH_QUEUE_URL', '')
+RESPONSE_DISPATCH_DELAY_SECONDS = int(os.environ.get('RESPONSE_DISPATCH_DELAY_SECONDS', 10))
+
+# Number of SQS records processed concurrently (records of one conversation always run in order)
+SQS_RECORD_CONCURRENCY = int(os.environ.get('SQS_RECORD_CONCURRENCY', 5))
+# Threads per email for independent pipeline stages (1 runs the stages one after another)
+PIPELINE_STAGE_CONCURRENCY = int(os.environ.get('PIPELINE_STAGE_CONCURRENCY', 3))
+
+# BatchGetItem reads in repository.py: unprocessed (throttled) keys are retried after
+# exponential backoff with full jitter, then the read fails and callers fall back
+BATCH_GET_MAX_ATTEMPTS = int(os.environ.get('BATCH_GET_MAX_ATTEMPTS', 5))
+BATCH_GET_BACKOFF_BASE = float(os.environ.get('BATCH_GET_BACKOFF_BASE', 0.05))
+BATCH_GET_BACKOFF_MAX = float(os.environ.get('BATCH_GET_BACKOFF_MAX', 1.0))
+
+# Inbound email parsing: stop reading the S3 object after this many bytes, and keep at most
+# this many bytes of each text part (attachments are skipped without being buffered)
+MAX_EMAIL_READ_BYTES = int(os.environ.get('MAX_EMAIL_READ_BYTES', 10 * 1024 * 1024))
+MAX_TEXT_PART_BYTES = int(os.environ.get('MAX_TEXT_PART_BYTES', 1024 * 1024))
+# Characters of text kept from an HTML-only email (the text goes into every LLM prompt)
+MAX_HTML_TEXT_CHARS = int(os.environ.get('MAX_HTML_TEXT_CHARS', 20000))
+
 # Together AI API configuration
 TOGETHER_API_KEY = os.environ['TAI_KEY']
 TOGETHER_API_URL = os.environ.get('TOGETHER_API_URL', 'https://api.together.xyz/v1/chat/completions')
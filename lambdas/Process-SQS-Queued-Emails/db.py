@@ -2,11 +2,14 @@
 import json
 import boto3
 import logging
+from botocore.exceptions import ClientError
 from typing import Dict, Any, Optional, List
 from config import AWS_REGION, DB_SELECT_LAMBDA
 from datetime import datetime, timedelta
 import uuid
 from utils import invoke_lambda, db_select, db_update, LambdaError
+import repository
+from account_routing import account_routing
 import time
 
 logger = logging.getLogger()
@@ -19,6 +22,9 @@ def invoke_db_select(table_name: str, index_name: Optional[str], key_name: str,
     """
     Generic function to invoke the db-select Lambda for read operations only.
     Returns the parsed response or None if the invocation failed.
+
+    Internal reads should use repository.py; this remains for callers that
+    need DBSelect's authorization checks.
     """
     try:
         payload = {
@@ -76,55 +82,68 @@ def get_conversation_id(message_id: str, account_id: str, session_id: str) -> Op
     """Get conversation ID by message ID."""
     if not message_id:
         return None
-    
-    result = invoke_db_select(
-        table_name='Conversations',
-        index_name='response_id-index',
-        key_name='response_id',
-        key_value=message_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    # Handle list response
-    if isinstance(result, list) and result:
-        return result[0].get('conversation_id')
-    return None
+
+    try:
+        conversation = repository.get_conversation_by_response_id(message_id)
+    except Exception as e:
+        logger.error(f"Error looking up conversation for message {message_id}: {str(e)}")
+        return None
+    return conversation.get('conversation_id') if conversation else None
+
+def find_conversation_id(message_ids: List[str], account_id: str, session_id: str) -> Optional[str]:
+    """
+    Conversation ID for an email that refers to message_ids (In-Reply-To and References).
+
+    All IDs are looked up in MessageIndex with one batched read; of the hits that
+    belong to the account, the most recently indexed message wins. If none is
+    indexed (messages stored before the index existed), the first ID is looked up
+    by response_id as before.
+    """
+    if not message_ids:
+        return None
+
+    try:
+        entries = [entry for entry in repository.get_message_index_entries(message_ids)
+                   if entry.get('account_id') == account_id]
+    except Exception as e:
+        logger.error(f"Error looking up message index for {len(message_ids)} message ID(s): {str(e)}")
+        entries = []
+    if entries:
+        return max(entries, key=lambda entry: entry.get('timestamp', ''))['conversation_id']
+
+    return get_conversation_id(message_ids[0], account_id, session_id)
+
+def index_message(msg_id: str, conversation_id: str, account_id: str, timestamp: str) -> bool:
+    """Record msg_id -> conversation_id in MessageIndex so replies to this message thread in one lookup."""
+    if not msg_id:
+        return False
+    try:
+        dynamodb.Table('MessageIndex').put_item(Item={
+            'msg_id': msg_id,
+            'conversation_id': conversation_id,
+            'account_id': account_id,
+            'timestamp': timestamp
+        })
+        return True
+    except Exception as e:
+        logger.error(f"Error indexing message {msg_id}: {str(e)}")
+        return False
 
 def get_associated_account(email: str, account_id: str, session_id: str) -> Optional[str]:
-    """Get account ID by email."""
-    result = invoke_db_select(
-        table_name='Users',
-        index_name='responseEmail-index',
-        key_name='responseEmail',
-        key_value=email.lower(),
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    # Handle list response
-    if isinstance(result, list) and result:
-        return result[0].get('id')
-    return None
+    """Get account ID by email (cached per container; see account_routing.py)."""
+    return account_routing.lookup(email)
 
 def get_email_chain(conversation_id: str, account_id: str, session_id: str) -> List[Dict[str, Any]]:
     """Get email chain for a conversation."""
-    result = invoke_db_select(
-        table_name='Conversations',
-        index_name=None,  # Primary key query
-        key_name='conversation_id',
-        key_value=conversation_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    # Handle list response directly
-    if not isinstance(result, list):
+    try:
+        items = repository.get_conversation_items(conversation_id)
+    except Exception as e:
+        logger.error(f"Error fetching email chain for {conversation_id}: {str(e)}")
         return []
-        
+
     # Sort by timestamp and format items
-    sorted_items = sorted(result, key=lambda x: x.get('timestamp', ''))
-    
+    sorted_items = sorted(items, key=lambda x: x.get('timestamp', ''))
+
     return [{
         'subject': item.get('subject', ''),
         'body': item.get('body', ''),
@@ -135,37 +154,45 @@ def get_email_chain(conversation_id: str, account_id: str, session_id: str) -> L
 
 def get_account_email(account_id: str, session_id: str) -> Optional[str]:
     """Get account email by account ID."""
-    result = invoke_db_select(
-        table_name='Users',
-        index_name=None,  # Primary key query
-        key_name='id',
-        key_value=account_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    # Handle list response
-    if isinstance(result, list) and result:
-        return result[0].get('responseEmail')
-    return None
+    try:
+        user = repository.get_user(account_id)
+    except Exception as e:
+        logger.error(f"Error fetching user {account_id}: {str(e)}")
+        return None
+    return user.get('responseEmail') if user else None
 
 def get_user_lcp_automatic_enabled(account_id: str, session_id: str) -> bool:
     """Get lcp_automatic_enabled status for a user by account ID."""
-    result = invoke_db_select(
-        table_name='Users',
-        index_name='id-index',  # Primary key query
-        key_name='id',
-        key_value=account_id,
-        account_id=account_id,
-        session_id=session_id
-    )
-    
-    # Handle list response
-    if isinstance(result, list) and result:
-        lcp_automatic_enabled = result[0].get('lcp_automatic_enabled', 'false')
-        return lcp_automatic_enabled.lower() == 'true'
+    try:
+        user = repository.get_user(account_id)
+    except Exception as e:
+        logger.error(f"Error fetching user {account_id}: {str(e)}")
+        return False
+    if user:
+        return str(user.get('lcp_automatic_enabled', 'false')).lower() == 'true'
     return False
 
+def get_thread(conversation_id: str) -> Optional[Dict[str, Any]]:
+    """Get the Threads row for a conversation, or None if missing or the read fails."""
+    try:
+        return repository.get_thread(conversation_id)
+    except Exception as e:
+        logger.error(f"Error fetching thread {conversation_id}: {str(e)}")
+        return None
+
+def set_user_new_email_flag(account_id: str) -> bool:
+    """Mark the user as having a new email using direct DynamoDB access."""
+    try:
+        dynamodb.Table('Users').update_item(
+            Key={'id': account_id},
+            UpdateExpression='SET new_email = :new_email',
+            ExpressionAttributeValues={':new_email': True}
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error setting new_email flag for {account_id}: {str(e)}")
+        return False
+
 def update_thread_attributes(conversation_id: str, attributes: Dict[str, Any]) -> bool:
     """Update thread with new attributes using direct DynamoDB access."""
     try:
@@ -259,16 +286,82 @@ def update_thread_read_status(conversation_id: str, read_status: str) -> bool:
         logger.error(f"Error updating thread read status: {str(e)}")
         return False
 
+def save_spam_verdict(item: Dict[str, Any]) -> bool:
+    """Save a cached spam verdict; rows that are allow/deny list entries are never overwritten."""
+    try:
+        dynamodb.Table('SpamVerdicts').put_item(
+            Item=item,
+            ConditionExpression='attribute_not_exists(#list)',
+            ExpressionAttributeNames={'#list': 'list'}
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error saving spam verdict {item.get('id')}: {str(e)}")
+        return False
+
+def create_ledger_entry(item: Dict[str, Any]) -> bool:
+    """
+    Create the EmailLedger row for an SES messageId with a conditional put.
+    Returns False if the row already exists; other errors propagate.
+    """
+    try:
+        dynamodb.Table('EmailLedger').put_item(
+            Item=item,
+            ConditionExpression='attribute_not_exists(message_id)'
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+def update_ledger_entry(message_id: str, attributes: Dict[str, Any], count_delivery: bool = False,
+                        expected_lease: Optional[int] = None) -> bool:
+    """
+    Set attributes on an EmailLedger row, optionally counting one more delivery.
+    With expected_lease, the update only applies while claimed_until still has
+    that value (so only one redelivery takes over a lapsed lease).
+    """
+    sets, names, values = [], {}, {}
+    for i, (key, value) in enumerate(attributes.items()):
+        sets.append(f"#attr{i} = :val{i}")
+        names[f"#attr{i}"] = key
+        values[f":val{i}"] = value
+    if count_delivery:
+        sets.append("deliveries = if_not_exists(deliveries, :zero) + :one")
+        values.update({':zero': 0, ':one': 1})
+
+    kwargs = {'Key': {'message_id': message_id}, 'UpdateExpression': 'SET ' + ', '.join(sets),
+              'ExpressionAttributeValues': values}
+    if names:
+        kwargs['ExpressionAttributeNames'] = names
+    if expected_lease is not None:
+        kwargs['ConditionExpression'] = 'claimed_until = :expected_lease'
+        values[':expected_lease'] = expected_lease
+    try:
+        dynamodb.Table('EmailLedger').update_item(**kwargs)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        logger.error(f"Error updating ledger entry {message_id}: {str(e)}")
+        return False
+    except Exception as e:
+        logger.error(f"Error updating ledger entry {message_id}: {str(e)}")
+        return False
+
 def store_ai_invocation(
     associated_account: str,
     input_tokens: int,
     output_tokens: int,
     llm_email_type: Optional[str] = None,
     conversation_id: Optional[str] = None,
-    model_name: str = "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8"
+    model_name: str = "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
+    cache_status: Optional[str] = None
 ) -> bool:
     """
     Store an AI invocation record in the Invocations table.
+    cache_status marks a result served without an LLM call (see spam_cache.py).
     Returns True if successful, False otherwise.
     """
     try:
@@ -292,6 +385,8 @@ def store_ai_invocation(
             invocation_data['llm_email_type'] = llm_email_type
         if conversation_id:
             invocation_data['conversation_id'] = conversation_id
+        if cache_status:
+            invocation_data['cache_status'] = cache_status
             
         # Store in Invocations table
         invocations_table.put_item(Item=invocation_data)
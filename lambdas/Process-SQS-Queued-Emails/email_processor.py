@@ -9,7 +9,7 @@ from parser import parse_email, extract_email_headers
 from db import (
     get_conversation_id, get_associated_account, update_thread_attributes,
     store_conversation_item, store_spam_conversation_item, store_thread_item,
-    invoke_db_select, update_thread_read_status
+    update_thread_read_status, get_thread, get_user_lcp_automatic_enabled
 )
 from scheduling import generate_safe_schedule_name, schedule_email_processing
 from llm_interface import detect_spam
@@ -79,14 +79,13 @@ def handle_ham(data):
         logger.error(f"Failed to calculate EV for {data['conv_id']}. Aborting further processing.")
         return
 
-    thread = invoke_db_select('Threads', 'conversation_id-index', 'conversation_id', data['conv_id'], data['account_id'], AUTH_BP)
+    thread = get_thread(data['conv_id'])
     if not thread:
         logger.error(f"Could not find thread for conversation {data['conv_id']}.")
         return
 
-    should_respond = thread[0].get('lcp_enabled', 'false') == 'true'
-    user_settings = invoke_db_select('Users', 'id-index', 'id', data['account_id'], data['account_id'], AUTH_BP)
-    if should_respond and user_settings and user_settings[0].get('lcp_automatic_enabled', 'false') == 'true':
+    should_respond = thread.get('lcp_enabled', 'false') == 'true'
+    if should_respond and get_user_lcp_automatic_enabled(data['account_id'], AUTH_BP):
         llm_response = invoke_llm_response(data['conv_id'], data['account_id'], data['is_first'], AUTH_BP)
         if llm_response:
             schedule_llm_response(llm_response, data, ev_score)
@@ -100,10 +99,9 @@ def store_email_data(data):
     }
     store_conversation_item(conversation_data)
 
-    existing_thread = invoke_db_select('Threads', 'conversation_id-index', 'conversation_id', data['conv_id'], data['account_id'], AUTH_BP)
+    existing_thread = get_thread(data['conv_id'])
     if data['is_first'] and not existing_thread:
-        user_lcp_enabled = invoke_db_select('Users', 'id-index', 'id', data['account_id'], data['account_id'], AUTH_BP)
-        lcp_enabled = user_lcp_enabled[0].get('lcp_automatic_enabled', 'false') if user_lcp_enabled else 'false'
+        lcp_enabled = 'true' if get_user_lcp_automatic_enabled(data['account_id'], AUTH_BP) else 'false'
         
         thread_data = {
             'conversation_id': data['conv_id'], 'source': data['source'], 'source_name': data['user_info'].get('sender_name', ''),
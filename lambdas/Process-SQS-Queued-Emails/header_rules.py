@@ -0,0 +1,72 @@
+# header_rules.py
+"""
+Deterministic header rules scored before the LLM spam check.
+
+The ruleset is data (spam_rules.json, or the file named by SPAM_RULES_FILE)
+and is loaded and compiled once per container. Each rule names a header and
+either requires it to be present or matches a case-insensitive regex against
+its value (against the addr-spec only, without the display name, for rules
+with "address": true); matching rules add their score. A total at or above
+spam_threshold is spam and at or below ham_threshold is not spam; anything
+in between is left to the LLM.
+"""
+import json
+import logging
+import re
+from email.utils import parseaddr
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config import SPAM_RULES_FILE
+
+logger = logging.getLogger()
+
+class HeaderVerdict(NamedTuple):
+    is_spam: Optional[bool]  # None: undecided, ask the LLM
+    score: int
+    matched: List[str]
+
+class HeaderRules:
+    def __init__(self, ruleset: Dict[str, Any]):
+        self.version = ruleset.get('version')
+        self.spam_threshold = ruleset['spam_threshold']
+        self.ham_threshold = ruleset['ham_threshold']
+        self.rules = []
+        for rule in ruleset['rules']:
+            pattern = re.compile(rule['matches'], re.IGNORECASE) if 'matches' in rule else None
+            self.rules.append((rule['name'], rule['header'].lower(), pattern, bool(rule.get('address')), int(rule['score'])))
+
+    @classmethod
+    def load(cls, path: str = SPAM_RULES_FILE) -> 'HeaderRules':
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def evaluate(self, msg) -> HeaderVerdict:
+        """Score the headers of an email.message.Message (or a {name: value} dict)."""
+        # Raw header strings: parsing them into header objects costs more than the rules
+        items = msg.raw_items() if hasattr(msg, 'raw_items') else msg.items()
+        headers = {}
+        for name, value in items:
+            headers.setdefault(name.lower(), value)
+
+        score, matched = 0, []
+        for name, header, pattern, address, rule_score in self.rules:
+            value = headers.get(header)
+            if value is None:
+                continue
+            value = parseaddr(str(value))[1] if address else str(value)
+            if pattern is None or pattern.search(value):
+                score += rule_score
+                matched.append(name)
+
+        if score >= self.spam_threshold:
+            return HeaderVerdict(True, score, matched)
+        if score <= self.ham_threshold:
+            return HeaderVerdict(False, score, matched)
+        return HeaderVerdict(None, score, matched)
+
+try:
+    header_rules: Optional[HeaderRules] = HeaderRules.load()
+except Exception as e:
+    # Without rules every email goes to the LLM, as before
+    logger.error(f"Could not load spam header rules from {SPAM_RULES_FILE}: {str(e)}")
+    header_rules = None
@@ -0,0 +1,149 @@
+# html_text.py
+"""
+HTML-to-text conversion for emails without a text/plain part.
+
+A single incremental html.parser pass: the contents of non-content elements
+(style, script, title, ...) and of hidden elements (display:none preheaders,
+mso-hide:all blocks) are dropped, entities are decoded, block elements become
+line and paragraph breaks, and whitespace inside a line is collapsed. Once
+max_chars of text have been produced the rest of the document is not parsed.
+"""
+import re
+from html.parser import HTMLParser
+from typing import List, Optional
+
+# Elements whose content is never shown to the reader
+SKIP_TAGS = {'script', 'style', 'title', 'noscript', 'template', 'svg', 'iframe', 'object', 'xml'}
+
+# Elements that start and end on their own line, and those set off by a blank line
+LINE_TAGS = {
+    'div', 'tr', 'li', 'dt', 'dd', 'section', 'article', 'header', 'footer', 'address',
+    'center', 'form', 'fieldset', 'main', 'nav', 'aside', 'figure', 'figcaption', 'caption',
+}
+PARAGRAPH_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'table', 'ul', 'ol', 'pre', 'hr'}
+CELL_TAGS = {'td', 'th'}
+
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+    'source', 'track', 'wbr',
+}
+
+_HIDDEN_STYLE_RE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden|mso-hide\s*:\s*all', re.IGNORECASE)
+
+# Non-breaking spaces become spaces; zero-width and soft-hyphen padding (common in preheaders) is removed
+_CHAR_MAP = str.maketrans({
+    '\xa0': ' ', '\u200b': None, '\u200c': None, '\u200d': None, '\u2060': None,
+    '\ufeff': None, '\u034f': None, '\xad': None,
+})
+
+class HTMLTextExtractor(HTMLParser):
+    def __init__(self, max_chars: Optional[int] = None):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.truncated = False
+        self._parts: List[str] = []
+        self._length = 0
+        self._newlines = 0
+        self._space = False
+        self._bullet = False
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+
+    def _break(self, count: int) -> None:
+        if self._length:
+            self._newlines = max(self._newlines, count)
+        self._space = False
+
+    def _emit(self, text: str) -> None:
+        if self._bullet:
+            text, self._bullet = '- ' + text, False
+        if self._newlines:
+            text = '\n' * self._newlines + text
+        elif self._space and self._length:
+            text = ' ' + text
+        self._newlines = 0
+        self._space = False
+
+        if self.max_chars is not None and self._length + len(text) >= self.max_chars:
+            text = text[:self.max_chars - self._length]
+            self.truncated = True
+        self._parts.append(text)
+        self._length += len(text)
+
+    def handle_starttag(self, tag, attrs):
+        if self.truncated:
+            return
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+
+        if tag not in VOID_TAGS:
+            attributes = dict(attrs)
+            if tag in SKIP_TAGS or 'hidden' in attributes or _HIDDEN_STYLE_RE.search(attributes.get('style') or ''):
+                self._skip_tag, self._skip_depth = tag, 1
+                return
+
+        if tag == 'br':
+            self._newlines = min(self._newlines + 1, 2) if self._newlines else 1
+            self._space = False
+        elif tag in PARAGRAPH_TAGS:
+            self._break(2)
+        elif tag in LINE_TAGS:
+            self._break(1)
+            if tag == 'li':
+                self._bullet = True
+        elif tag in CELL_TAGS:
+            self._space = True
+
+    def handle_endtag(self, tag):
+        if self.truncated:
+            return
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+
+        if tag in PARAGRAPH_TAGS:
+            self._break(2)
+        elif tag in LINE_TAGS:
+            self._break(1)
+            if tag == 'li':
+                self._bullet = False
+        elif tag in CELL_TAGS:
+            self._space = True
+
+    def handle_data(self, data):
+        if self.truncated or self._skip_tag is not None:
+            return
+        data = data.translate(_CHAR_MAP)
+        words = data.split()
+        if not words:
+            if data:
+                self._space = True
+            return
+        if data[0].isspace():
+            self._space = True
+        self._emit(' '.join(words))
+        self._space = data[-1].isspace()
+
+    def text(self) -> str:
+        return '\n'.join(line.rstrip() for line in ''.join(self._parts).split('\n')).strip()
+
+def html_to_text(html_text: str, max_chars: Optional[int] = None, chunk_size: int = 16 * 1024) -> str:
+    """
+    Readable text of an HTML document, at most max_chars long.
+
+    The document is fed to the parser in chunks so that parsing stops soon
+    after the cap is reached instead of running over the whole document.
+    """
+    extractor = HTMLTextExtractor(max_chars)
+    for start in range(0, len(html_text), chunk_size):
+        extractor.feed(html_text[start:start + chunk_size])
+        if extractor.truncated:
+            break
+    else:
+        extractor.close()
+    return extractor.text()
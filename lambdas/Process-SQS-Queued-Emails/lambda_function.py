@@ -5,25 +5,35 @@ import base64
 from datetime import datetime, timedelta
 import boto3
 import logging
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, Tuple
 import os
+import time
 
-from config import BUCKET_NAME, QUEUE_URL, AWS_REGION, GENERATE_EV_LAMBDA_ARN, LCP_LLM_RESPONSE_LAMBDA_ARN, SPAM_TTL_DAYS, AUTH_BP, logger
-from parser import parse_email, extract_email_headers, extract_email_from_text, extract_user_info_from_headers
+# Before any module that creates boto3 clients, so their calls are counted
+from metrics import metrics
+from config import BUCKET_NAME, QUEUE_URL, AWS_REGION, GENERATE_EV_LAMBDA_ARN, LCP_LLM_RESPONSE_LAMBDA_ARN, SPAM_TTL_DAYS, AUTH_BP, SQS_RECORD_CONCURRENCY, PIPELINE_STAGE_CONCURRENCY, logger
+from parser import parse_email_stream, extract_email_headers, extract_email_from_text, extract_user_info_from_headers, referenced_message_ids
 from db import (
-    get_conversation_id,
+    find_conversation_id,
+    index_message,
     get_associated_account,
     update_thread_attributes,
     store_conversation_item,
     store_spam_conversation_item,
     store_thread_item,
-    invoke_db_select,
-    update_thread_read_status
+    update_thread_read_status,
+    get_thread,
+    get_user_lcp_automatic_enabled,
+    set_user_new_email_flag
 )
-from scheduling import generate_safe_schedule_name, schedule_email_processing
+from scheduling import generate_safe_schedule_name, dispatch_response
 from llm_interface import detect_spam
-from email_processor import process_email_record
-from utils import db_update
+from spam_cache import spam_verdict_cache
+from header_rules import header_rules
+from record_batch import process_batch
+from stage_graph import StageGraph, StopPipeline
+from thread_refresh import thread_attrs_refresh
+from ledger import email_ledger
 
 # Set up logging
 logger.setLevel(logging.INFO)
@@ -33,190 +43,116 @@ sqs = boto3.client('sqs')
 dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
 lambda_client = boto3.client('lambda', region_name=AWS_REGION)
 
-def update_thread_with_attributes(conversation_id: str, account_id: str) -> None:
+def read_notification(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
-    Invokes get-thread-attrs lambda and updates the thread with the returned attributes.
-    Now handles nested attributes structure and stores individual attributes.
-    
-    Args:
-        conversation_id (str): The ID of the conversation to update
-        account_id (str): The ID of the account associated with the conversation
-    """
-    try:
-        # Invoke get-thread-attrs lambda
-        response = lambda_client.invoke(
-            FunctionName=os.environ.get("GET_THREAD_ATTRS_FUNCTION_NAME", "getThreadAttrs"),
-            InvocationType='RequestResponse',
-            Payload=json.dumps({
-                'body': json.dumps({
-                    'conversationId': conversation_id,
-                    'accountId': account_id
-                })
-            })
-        )
-        
-        # Parse the response
-        response_payload = json.loads(response['Payload'].read())
-        logger.info(f"Response payload: {response_payload}")
-        if response_payload['statusCode'] != 200:
-            logger.error(f"Failed to get thread attributes: {response_payload}")
-            return
-            
-        # Parse the body which contains the actual attributes
-        body_data = json.loads(response_payload['body'])
-        
-        # Extract attributes from the nested structure
-        attributes = body_data.get('attributes', {})
-        metadata = body_data.get('metadata', {})
-        
-        # Combine attributes and metadata into a single update
-        formatted_attributes = {}
-        
-        # Process attributes
-        for key, value in attributes.items():
-            # Convert attribute names to lowercase with underscores
-            formatted_key = key.lower().replace(' ', '_')
-            formatted_attributes[formatted_key] = value
-                    
-        # Update the thread using db-select
-        if not update_thread_attributes(conversation_id, formatted_attributes):
-            logger.error(f"Failed to update thread attributes for conversation {conversation_id}")
-            return
-            
-        logger.info(f"Successfully updated thread attributes for conversation {conversation_id}")
-    except Exception as e:
-        logger.error(f"Error updating thread attributes: {str(e)}")
-
-def process_email_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """
-    Process a single SQS record containing an email.
-    Returns the processed data or None if processing failed.
+    Extract the SES mail metadata from an SQS record (SNS-wrapped SES notification).
+    Returns None if the record is not a well-formed SES notification.
     """
     try:
         logger.info(f"Processing record: {json.dumps(record)}")
         body = json.loads(record['body'])
-        logger.info(f"Parsed body: {json.dumps(body)}")
-        
+
         if not isinstance(body, dict):
             logger.error(f"Expected body to be a dictionary, got {type(body)}")
             return None
-            
+
         if 'Message' not in body:
             logger.error("No 'Message' key found in body")
             return None
-            
+
         message = json.loads(body['Message'])
-        logger.info(f"Parsed message: {json.dumps(message)}")
-        
+
         if not isinstance(message, dict):
             logger.error(f"Expected message to be a dictionary, got {type(message)}")
             return None
-            
+
         if 'mail' not in message:
             logger.error("No 'mail' key found in message")
             return None
-            
+
         mail = message['mail']
         if not isinstance(mail, dict):
             logger.error(f"Expected mail to be a dictionary, got {type(mail)}")
             return None
 
-        source = mail['source']
-        destination = mail['destination'][0]
-        subject = mail['commonHeaders'].get('subject', '')
-        s3_key = mail['messageId']
-
-        # Get account_id first since we need it for conversation ID lookup
-        account_id = get_associated_account(destination, "null", AUTH_BP)
-        
-        if not account_id:
-            logger.error(f"No account found for destination: {destination}")
-            return None
-
-        # Fetch and parse email
-        raw = s3.get_object(Bucket=BUCKET_NAME, Key=s3_key)['Body'].read()
-        msg, text_body = parse_email(raw)
-        
-        # Handle case where email parsing fails but we still want to process
-        if not msg:
-            logger.error("Failed to parse email message")
-            # Create minimal data structure for processing
-            msg_id_hdr = mail.get('messageId', '')
-            user_info = {'sender_name': '', 'sender_email': source}
-            text_body = f"Subject: {subject}\nFrom: {source}\n\n[Email content could not be parsed]"
-        else:
-            msg_id_hdr, in_reply_to, references = extract_email_headers(msg)
-            user_info = extract_user_info_from_headers(msg)
-            
-            # Use both In-Reply-To and References for better threading
-            conv_id = None
-            if in_reply_to:
-                conv_id = get_conversation_id(in_reply_to, account_id, AUTH_BP)
-                logger.info(f"Found conversation ID from in_reply_to: {conv_id}")
-            if not conv_id and references:
-                conv_id = get_conversation_id(references, account_id, AUTH_BP)
-                logger.info(f"Found conversation ID from references: {conv_id}")
-            
-            # Only generate new UUID if we couldn't find an existing conversation
-            if not conv_id:
-                conv_id = str(uuid.uuid4())
-                logger.info(f"Generated new conversation ID: {conv_id}")
-            
-            timestamp = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-            is_first = not bool(in_reply_to or references)
-            logger.info(f"Email is_first: {is_first}, conv_id: {conv_id}, in_reply_to: {in_reply_to}, references: {references}")
+        return {
+            'source': mail['source'],
+            'destination': mail['destination'][0],
+            'subject': mail['commonHeaders'].get('subject', ''),
+            's3_key': mail['messageId']
+        }
+    except Exception as e:
+        logger.error(f"Error reading SES notification: {str(e)}", exc_info=True)
+        return None
 
-            return {
-                'source': source,
-                'destination': destination,
-                'subject': subject,
-                's3_key': s3_key,
-                'msg_id_hdr': msg_id_hdr,
-                'in_reply_to': in_reply_to,
-                'references': references,
-                'conv_id': conv_id,
-                'account_id': account_id,
-                'timestamp': timestamp,
-                'is_first': is_first,
-                'text_body': text_body,
-                'user_info': user_info
-            }
+def lookup_account(notification: Dict[str, Any]) -> str:
+    """Stage: account that owns the destination address. Drops the record if there is none."""
+    account_id = get_associated_account(notification['destination'], "null", AUTH_BP)
+    if not account_id:
+        raise StopPipeline(True, f"No account found for destination: {notification['destination']}")
+    return account_id
 
-        # If we get here, we have minimal data but can still process
-        if not text_body:
-            logger.error("No text body available for email")
-            return None
+def fetch_email(notification: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stage: stream the email from S3 and parse the headers and text body.
 
-        # For failed parsing, create a basic conversation structure
-        conv_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
-        is_first = True  # Assume first email if we can't determine threading
-        
-        logger.info(f"Processing email with minimal data - conv_id: {conv_id}, is_first: {is_first}")
+    S3 errors propagate so the record is retried. If the message cannot be
+    parsed, a minimal body is substituted and the email starts a new thread.
+    """
+    body = s3.get_object(Bucket=BUCKET_NAME, Key=notification['s3_key'])['Body']
+    try:
+        # Streams the object: attachments are skipped, and reading stops once the text is found
+        msg, text_body = parse_email_stream(body)
+    finally:
+        body.close()
 
+    if not msg:
+        logger.error("Failed to parse email message")
         return {
-            'source': source,
-            'destination': destination,
-            'subject': subject,
-            's3_key': s3_key,
-            'msg_id_hdr': msg_id_hdr,
+            'parsed': False,
+            'msg_id_hdr': notification['s3_key'],
             'in_reply_to': '',
             'references': '',
-            'conv_id': conv_id,
-            'account_id': account_id,
-            'timestamp': timestamp,
-            'is_first': is_first,
-            'text_body': text_body,
-            'user_info': user_info
+            'user_info': {'sender_name': '', 'sender_email': notification['source']},
+            'header_verdict': None,
+            'text_body': f"Subject: {notification['subject']}\nFrom: {notification['source']}\n\n[Email content could not be parsed]"
         }
-    except Exception as e:
-        logger.error(f"Error processing email record: {str(e)}", exc_info=True)
-        return None
+
+    msg_id_hdr, in_reply_to, references = extract_email_headers(msg)
+    header_verdict = header_rules.evaluate(msg) if header_rules else None
+    if header_verdict:
+        logger.info(f"Spam header rules: score={header_verdict.score} matched={header_verdict.matched}")
+    return {
+        'parsed': True,
+        'msg_id_hdr': msg_id_hdr,
+        'in_reply_to': in_reply_to,
+        'references': references,
+        'user_info': extract_user_info_from_headers(msg),
+        'header_verdict': header_verdict.is_spam if header_verdict else None,
+        'text_body': text_body
+    }
+
+def resolve_conversation(email: Dict[str, Any], account: str) -> Dict[str, Any]:
+    """Stage: find the conversation the email replies to, or start a new one."""
+    # Every message ID in In-Reply-To and References, resolved in one batched lookup
+    message_ids = referenced_message_ids(email['in_reply_to'], email['references'])
+    conv_id = find_conversation_id(message_ids, account, AUTH_BP)
+    if conv_id:
+        logger.info(f"Found conversation ID {conv_id} from {len(message_ids)} referenced message ID(s)")
+
+    # Only generate new UUID if we couldn't find an existing conversation
+    if not conv_id:
+        conv_id = str(uuid.uuid4())
+        logger.info(f"Generated new conversation ID: {conv_id}")
+
+    is_first = not bool(email['in_reply_to'] or email['references'])
+    logger.info(f"Email is_first: {is_first}, conv_id: {conv_id}, in_reply_to: {email['in_reply_to']}, references: {email['references']}")
+    return {'conv_id': conv_id, 'is_first': is_first}
 
 def store_email_data(data: Dict[str, Any]) -> bool:
     """
     Store email data in DynamoDB tables.
-    Uses db-select for reads and direct DynamoDB access for writes.
+    Uses direct DynamoDB access for both reads and writes.
     Returns True if successful, False otherwise.
     """
     try:
@@ -253,21 +189,15 @@ def store_email_data(data: Dict[str, Any]) -> bool:
             logger.error(f"Failed to store conversation data for {data['conv_id']}")
             return False
         logger.info("Successfully stored conversation data")
+        index_message(data['msg_id_hdr'], data['conv_id'], data['account_id'], data['timestamp'])
 
-        # Check if thread exists using db-select
+        # Check if thread exists
         logger.info(f"Checking if thread exists for conversation {data['conv_id']}")
-        existing_thread = invoke_db_select(
-            table_name='Threads',
-            index_name='conversation_id-index',  # Primary key query
-            key_name='conversation_id',
-            key_value=data['conv_id'],
-            account_id=data['account_id'],
-            session_id=AUTH_BP
-        )
+        existing_thread = get_thread(data['conv_id'])
         
         if data['is_first'] and not existing_thread:
             # Get user's lcp_automatic_enabled status
-            lcp_enabled = get_user_lcp_automatic_enabled(data['account_id'], AUTH_BP)
+            lcp_enabled = 'true' if get_user_lcp_automatic_enabled(data['account_id'], AUTH_BP) else 'false'
             logger.info(f"User lcp_automatic_enabled status: {lcp_enabled} for account {data['account_id']}")
             
             # Prepare thread data
@@ -301,9 +231,6 @@ def store_email_data(data: Dict[str, Any]) -> bool:
         else:
             logger.warning(f"Thread not found for non-first email conversation {data['conv_id']}")
 
-        # Update thread attributes after storing email data
-        logger.info(f"Updating thread attributes for conversation {data['conv_id']}")
-        update_thread_with_attributes(data['conv_id'], data['account_id'])
 
         logger.info(f"Successfully completed storing email data for conversation {data['conv_id']}")
         return True
@@ -398,196 +325,280 @@ def invoke_llm_response(conversation_id: str, account_id: str, is_first_email: b
         logger.error(f"Error invoking LLM response Lambda: {str(e)}", exc_info=True)  # Added exc_info for stack trace
         return None
 
-def get_user_lcp_automatic_enabled(account_id: str, session_id: str) -> str:
+def build_email_pipeline(notification: Dict[str, Any], checkpoints: Optional[Dict[str, Any]] = None,
+                         save_checkpoint: Optional[Callable[[str, Any], None]] = None) -> StageGraph:
     """
-    Get the user's lcp_automatic_enabled status from the Users table.
-    Returns True if enabled, False otherwise.
-    
-    Args:
-        account_id (str): The ID of the account to check
-        
-    Returns:
-        bool: True if LCP automatic is enabled, False otherwise
+    Stage graph for one inbound email. Edges are real data dependencies:
+
+        account ─┬──────────────┐
+        email ───┼─ conversation ┼─ store ─ ev ─ respond ─ thread_attrs
+                 └─ spam ────────┘
+
+    The account lookup overlaps the S3 fetch and the spam check overlaps the
+    conversation lookup. thread_attrs runs after every write for the email and
+    only queues the conversation; see thread_refresh.py.
+
+    checkpoints are the results an earlier delivery of the email saved (see
+    ledger.py); their stages are not run again. save_checkpoint(name, value)
+    is called as stages finish.
     """
-    try:
-        result = invoke_db_select(
-            table_name='Users',
-            index_name='id-index',
-            key_name='id',
-            key_value=account_id,
-            account_id=account_id,
-            session_id=session_id
+    checkpoints = checkpoints or {}
+    save = save_checkpoint or (lambda name, value: None)
+
+    def resumable(checkpoint, fn, to_checkpoint=lambda value: value):
+        """Stage fn, or its checkpointed result when an earlier delivery already ran it."""
+        if checkpoint in checkpoints:
+            return lambda **deps: checkpoints[checkpoint]
+
+        def run(**deps):
+            value = fn(**deps)
+            save(checkpoint, to_checkpoint(value))
+            return value
+        return run
+
+    def spam(email, account):
+        return spam_verdict_cache.check(notification['source'], account, lambda: detect_spam(
+            subject=notification['subject'],
+            body=email['text_body'],
+            sender=notification['source'],
+            account_id=account,
+            session_id=AUTH_BP
+        ), header_verdict=email['header_verdict'])
+
+    def store(account, email, conversation, spam):
+        if 'parsed' not in checkpoints:
+            save('parsed', {'account': account, 'email': email, 'conversation': conversation, 'spam': spam})
+
+        email_data = {
+            'source': notification['source'],
+            'destination': notification['destination'],
+            'subject': notification['subject'],
+            's3_key': notification['s3_key'],
+            'msg_id_hdr': email['msg_id_hdr'],
+            'in_reply_to': email['in_reply_to'],
+            'references': email['references'],
+            'conv_id': conversation['conv_id'],
+            'account_id': account,
+            'timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'is_first': conversation['is_first'],
+            'text_body': email['text_body'],
+            'user_info': email['user_info']
+        }
+
+        if spam:
+            # Handle spam email
+            spam_conversation_data = {
+                **email_data,
+                'type': 'inbound-email',
+                'is_first_email': '1' if email_data['is_first'] else '0'
+            }
+            store_spam_conversation_item(spam_conversation_data, SPAM_TTL_DAYS)
+            spam_thread_data = {
+                'conversation_id': email_data['conv_id'],
+                'source': email_data['source'],
+                'source_name': email_data['user_info'].get('sender_name', ''),
+                'associated_account': email_data['account_id'],
+                'read': 'false',
+                'lcp_enabled': 'false',
+                'lcp_flag_threshold': '80',
+                'flag': 'false',
+                'flag_for_review': 'false',
+                'flag_review_override': 'false',
+                'spam': 'true',
+                'ttl': int(datetime.utcnow().timestamp()) + SPAM_TTL_DAYS * 24 * 60 * 60
+            }
+            store_thread_item(spam_thread_data)
+            raise StopPipeline(True, "Email classified as spam")
+
+        # Store attribute 'new_email' in Users table
+        set_user_new_email_flag(email_data['account_id'])
+
+        # Store email data using the robust store_email_data function
+        if not store_email_data(email_data):
+            raise StopPipeline(False, f"Failed to store email data for conversation {email_data['conv_id']}")
+        return email_data
+
+    def ev(store):
+        ev_score = invoke_generate_ev(store['conv_id'], store['msg_id_hdr'], store['account_id'], AUTH_BP)
+        if ev_score is None:
+            raise StopPipeline(False, f"Failed to calculate EV for {store['conv_id']}")
+        return ev_score
+
+    def thread_attrs(store, respond):
+        thread_attrs_refresh.request(store['conv_id'], store['account_id'])
+
+    def respond(store, ev):
+        # Check if LCP is enabled and should respond
+        thread = get_thread(store['conv_id'])
+
+        if not thread:
+            logger.error(f"Could not find thread for conversation {store['conv_id']}")
+            return None
+
+        should_respond = (
+            thread.get('lcp_enabled', 'false') == 'true' and
+            get_user_lcp_automatic_enabled(store['account_id'], AUTH_BP)
         )
-        
-        # Handle list response
-        logger.info(f"User lcp_automatic_enabled status: {result}")
-        if isinstance(result, list) and result:
-            return result[0].get('lcp_automatic_enabled', 'false')
-        return False
-    except Exception as e:
-        logger.error(f"Error getting user lcp_automatic_enabled status: {str(e)}")
-        return False
+        if not should_respond:
+            return None
+
+        # Generate and schedule LLM response
+        llm_response = invoke_llm_response(store['conv_id'], store['account_id'], store['is_first'], AUTH_BP)
+        if not llm_response:
+            return None
+
+        schedule_name = generate_safe_schedule_name(f"process-email-{store['msg_id_hdr']}")
+
+        # Update thread to indicate processing
+        update_thread_attributes(store['conv_id'], {'busy': True})
+
+        # Send the response after the dispatch delay
+        dispatch_response(
+            schedule_name,
+            {
+                'response_body': llm_response,
+                'account': store['account_id'],
+                'target': store['source'],
+                'in_reply_to': store['msg_id_hdr'],
+                'conversation_id': store['conv_id'],
+                'subject': store['subject'],
+                'ev_score': ev,
+                'account_id': store['account_id'],
+                'session_id': AUTH_BP
+            },
+            in_reply_to=store['in_reply_to']
+        )
+        return schedule_name
+
+    graph = StageGraph()
+    if 'stored' in checkpoints:
+        graph.add('store', lambda: checkpoints['stored'])
+    else:
+        if 'parsed' in checkpoints:
+            for name, value in checkpoints['parsed'].items():
+                graph.add(name, lambda value=value: value)
+        else:
+            (graph.add('account', lambda: lookup_account(notification))
+                  .add('email', lambda: fetch_email(notification))
+                  .add('conversation', resolve_conversation, deps=('email', 'account'))
+                  .add('spam', spam, deps=('email', 'account')))
+        # The stored checkpoint leaves out the body: later stages only need the ids and headers
+        graph.add('store', resumable('stored', store, lambda data: {
+            k: v for k, v in data.items() if k not in ('text_body', 'user_info')
+        }), deps=('account', 'email', 'conversation', 'spam'))
+
+    return (graph
+            .add('ev', resumable('scored', ev), deps=('store',))
+            .add('respond', resumable('responded', respond), deps=('store', 'ev'))
+            .add('thread_attrs', thread_attrs, deps=('store', 'respond')))
 
+def run_email_pipeline(record: Dict[str, Any]) -> Tuple[bool, Dict[str, float]]:
+    """
+    Run one SQS record through the stage graph. Returns (succeeded, per-stage timings in ms).
+
+    succeeded is True when the record is finished, including records dropped
+    because they can never be processed (malformed notification, unknown
+    destination, spam) or already were (a duplicate delivery). It is False when
+    a step failed, or another delivery of the email is still running, and the
+    record should be redelivered.
+    """
+    notification = read_notification(record)
+    if not notification:
+        logger.error(f"Dropping unprocessable email record {record.get('messageId')}")
+        return True, {}
+
+    message_id = notification['s3_key']
+    claim = email_ledger.claim(message_id)
+    if claim.status == 'done':
+        logger.info(f"Email {message_id} was already processed; dropping duplicate delivery")
+        return True, {}
+    if claim.status == 'in_flight':
+        logger.warning(f"Email {message_id} is being processed by another delivery; retrying later")
+        return False, {}
+    if claim.status == 'resumed':
+        logger.info(f"Resuming email {message_id} after checkpoint(s): {', '.join(claim.checkpoints) or 'none'}")
+
+    save_checkpoint = (lambda name, value: email_ledger.checkpoint(message_id, name, value)) if claim.tracked else None
+    start = time.perf_counter()
+    try:
+        _, timings, outcome = build_email_pipeline(notification, claim.checkpoints, save_checkpoint).run(PIPELINE_STAGE_CONCURRENCY)
+    except Exception:
+        if claim.tracked:
+            email_ledger.release(message_id)
+        raise
+    timings['total'] = (time.perf_counter() - start) * 1000.0
+    for name, elapsed_ms in timings.items():
+        metrics.observe(name, elapsed_ms)
+
+    if claim.tracked:
+        if outcome is False:
+            email_ledger.release(message_id)
+        else:
+            email_ledger.complete(message_id)
+
+    logger.info(f"Stage timings (ms) for {notification['s3_key']}: " +
+                ", ".join(f"{name}={ms:.1f}" for name, ms in timings.items()))
+    return outcome is not False, timings
+
+def process_sqs_record(record: Dict[str, Any]) -> bool:
+    """Process one SQS record; returns False if it should be redelivered (see run_email_pipeline)."""
+    succeeded, _ = run_email_pipeline(record)
+    return succeeded
+
+@metrics.invocation
 def lambda_handler(event, context):
     """
     AWS Lambda handler function that processes SQS messages containing emails.
-    
+
+    Records are processed concurrently (SQS_RECORD_CONCURRENCY workers), with the
+    records of one conversation kept in order; see record_batch.py. Stage
+    timings and call counts for the batch go out as one metrics line
+    (metrics.py).
+
     Args:
         event (dict): The event data from AWS Lambda
         context (LambdaContext): The runtime context from AWS Lambda
-        
+
     Returns:
-        dict: Response containing status code and message
+        dict: SQS partial batch response; batchItemFailures lists the message IDs
+        to redeliver
     """
     try:
         logger.info(f"Received event: {json.dumps(event)}")
-        
+
         if 'Records' not in event:
             logger.error("No Records found in event")
             return {
                 'statusCode': 400,
-                'body': json.dumps({'error': 'No Records found in event'})
+                'body': json.dumps({'error': 'No Records found in event'}),
+                'batchItemFailures': []
             }
-            
-        for record in event['Records']:
-            try:
-                # Process the email record
-                email_data = process_email_record(record)
-                if not email_data:
-                    logger.error("Failed to process email record")
-                    continue
-                    
-                # Check if email is spam
-                is_spam = detect_spam(
-                    subject=email_data['subject'],
-                    body=email_data['text_body'],
-                    sender=email_data['source'],
-                    account_id=email_data['account_id'],
-                    session_id=AUTH_BP
-                )
-                
-                if is_spam:
-                    # Handle spam email
-                    spam_conversation_data = {
-                        **email_data,
-                        'type': 'inbound-email',
-                        'is_first_email': '1' if email_data['is_first'] else '0'
-                    }
-                    store_spam_conversation_item(spam_conversation_data, SPAM_TTL_DAYS)
-                    spam_thread_data = {
-                        'conversation_id': email_data['conv_id'],
-                        'source': email_data['source'],
-                        'source_name': email_data['user_info'].get('sender_name', ''),
-                        'associated_account': email_data['account_id'],
-                        'read': 'false',
-                        'lcp_enabled': 'false',
-                        'lcp_flag_threshold': '80',
-                        'flag': 'false',
-                        'flag_for_review': 'false',
-                        'flag_review_override': 'false',
-                        'spam': 'true',
-                        'ttl': int(datetime.utcnow().timestamp()) + SPAM_TTL_DAYS * 24 * 60 * 60
-                    }
-                    store_thread_item(spam_thread_data)
-                    
-                    continue
-                else:
-                    # Store attribute 'new_email' in Users table
-                    db_update(
-                        table_name='Users',
-                        key_name='id',
-                        key_value=email_data['account_id'],
-                        index_name='id-index',
-                        update_data={'new_email': True},
-                        account_id=email_data['account_id'],
-                        session_id=AUTH_BP
-                    )
-                    
-                    # Store email data using the robust store_email_data function
-                    if not store_email_data(email_data):
-                        logger.error(f"Failed to store email data for conversation {email_data['conv_id']}")
-                        continue
-                    
-                    # Generate EV score
-                    ev_score = invoke_generate_ev(
-                        email_data['conv_id'],
-                        email_data['msg_id_hdr'],
-                        email_data['account_id'],
-                        AUTH_BP
-                    )
-                    
-                    if ev_score is None:
-                        logger.error(f"Failed to calculate EV for {email_data['conv_id']}")
-                        continue
-                    
-                    # Check if LCP is enabled and should respond
-                    thread = invoke_db_select(
-                        'Threads',
-                        'conversation_id-index',
-                        'conversation_id',
-                        email_data['conv_id'],
-                        email_data['account_id'],
-                        AUTH_BP
-                    )
-                    
-                    if not thread:
-                        logger.error(f"Could not find thread for conversation {email_data['conv_id']}")
-                        continue
-                    
-                    should_respond = (
-                        thread[0].get('lcp_enabled', 'false') == 'true' and
-                        get_user_lcp_automatic_enabled(email_data['account_id'], AUTH_BP)
-                    )
-                    
-                    if should_respond:
-                        # Generate and schedule LLM response
-                        llm_response = invoke_llm_response(
-                            email_data['conv_id'],
-                            email_data['account_id'],
-                            email_data['is_first'],
-                            AUTH_BP
-                        )
-                        
-                        if llm_response:
-                            schedule_name = generate_safe_schedule_name(f"process-email-{email_data['msg_id_hdr']}")
-                            schedule_time = datetime.utcnow() + timedelta(seconds=10)
-                            
-                            # Update thread to indicate processing
-                            update_thread_attributes(email_data['conv_id'], {'busy': True})
-                            
-                            # Schedule the response
-                            schedule_email_processing(
-                                schedule_name,
-                                schedule_time,
-                                {
-                                    'response_body': llm_response,
-                                    'account': email_data['account_id'],
-                                    'target': email_data['source'],
-                                    'in_reply_to': email_data['msg_id_hdr'],
-                                    'conversation_id': email_data['conv_id'],
-                                    'subject': email_data['subject'],
-                                    'ev_score': ev_score,
-                                    'account_id': email_data['account_id'],
-                                    'session_id': AUTH_BP
-                                },
-                                email_data['in_reply_to']
-                            )
-                    
-                    # Update thread attributes
-                    update_thread_with_attributes(email_data['conv_id'], email_data['account_id'])
-                
-            except Exception as e:
-                logger.error(f"Error processing record: {str(e)}", exc_info=True)
-                continue
-        
+
+        try:
+            failed_ids = process_batch(event['Records'], process_sqs_record, SQS_RECORD_CONCURRENCY)
+        finally:
+            # One asynchronous attribute refresh per changed conversation, after all writes
+            thread_attrs_refresh.flush()
+        if failed_ids:
+            logger.error(f"{len(failed_ids)} of {len(event['Records'])} record(s) failed and will be retried: {failed_ids}")
+
         return {
             'statusCode': 200,
-            'body': json.dumps({'message': 'Successfully processed all records'})
+            'body': json.dumps({
+                'message': 'Processed batch',
+                'processed': len(event['Records']) - len(failed_ids),
+                'failed': len(failed_ids)
+            }),
+            'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_ids]
         }
-        
+
     except Exception as e:
         logger.error(f"Error in lambda handler: {str(e)}", exc_info=True)
         return {
             'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
+            'body': json.dumps({'error': str(e)}),
+            'batchItemFailures': [
+                {'itemIdentifier': record['messageId']}
+                for record in event.get('Records', []) if record.get('messageId')
+            ]
         }
@@ -0,0 +1,116 @@
+# ledger.py
+"""
+Idempotency ledger for inbound emails, keyed by the SES messageId.
+
+SQS delivers a record at least once, and a record that fails part-way is
+redelivered in full. The first delivery of an email creates its EmailLedger
+row with a conditional put and holds a lease on it (LEDGER_LEASE_SECONDS)
+while the pipeline runs. Stage results are saved on the row as checkpoints:
+
+    parsed     account, parsed email, conversation and spam verdict (before any write)
+    stored     the stored email data, i.e. the email is in Conversations/Threads
+    scored     the EV score
+    responded  the dispatched reply's schedule name (None if no reply was sent)
+
+A redelivery of a finished email is dropped. One whose lease has lapsed (the
+earlier delivery failed or timed out) takes the lease over and resumes after
+the last checkpoint, so the S3 fetch, LLM calls, new conversation id and reply
+are not repeated. A redelivery while the lease is held is retried later. Rows
+expire after LEDGER_TTL_DAYS.
+
+Each duplicate delivery absorbed (dropped or resumed) is counted on the row and
+emitted as the DuplicateDeliveriesAbsorbed metric (CloudWatch embedded metric
+format). If the ledger cannot be read or written, the email is processed
+without checkpoints, as before.
+"""
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, NamedTuple
+
+from config import LEDGER_TTL_DAYS, LEDGER_LEASE_SECONDS
+from db import create_ledger_entry, update_ledger_entry
+from metrics import emit_metric
+import repository
+
+logger = logging.getLogger()
+
+CHECKPOINTS = ('parsed', 'stored', 'scored', 'responded')
+
+# Larger checkpoints (very long bodies) are skipped; a DynamoDB item holds at most 400 KB
+MAX_CHECKPOINT_BYTES = 300 * 1024
+
+class LedgerClaim(NamedTuple):
+    status: str  # 'new', 'resumed', 'done' (drop), 'in_flight' (retry later) or 'unavailable'
+    checkpoints: Dict[str, Any]
+
+    @property
+    def tracked(self) -> bool:
+        """Whether this delivery holds the lease and records checkpoints."""
+        return self.status in ('new', 'resumed')
+
+class EmailLedger:
+    def __init__(self, lease_seconds: int = LEDGER_LEASE_SECONDS, ttl_days: int = LEDGER_TTL_DAYS):
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'new': 0, 'resumed': 0, 'done': 0, 'in_flight': 0, 'unavailable': 0}
+
+    def _claimed(self, message_id: str, status: str, checkpoints: Dict[str, Any] = None) -> LedgerClaim:
+        with self._lock:
+            self.stats[status] += 1
+        if status in ('resumed', 'done'):
+            emit_metric('DuplicateDeliveriesAbsorbed', 1, Resolution=status)
+            logger.info(f"Duplicate delivery of {message_id} absorbed ({status}); stats={self.stats}")
+        return LedgerClaim(status, checkpoints or {})
+
+    def claim(self, message_id: str) -> LedgerClaim:
+        """Claim an email for this delivery; see LedgerClaim for the outcomes."""
+        now = int(time.time())
+        lease = now + self.lease_seconds
+        try:
+            if create_ledger_entry({
+                'message_id': message_id,
+                'status': 'processing',
+                'claimed_until': lease,
+                'deliveries': 1,
+                'created_at': now,
+                'ttl': now + self.ttl_seconds
+            }):
+                return self._claimed(message_id, 'new')
+            row = repository.get_ledger_entry(message_id)
+        except Exception as e:
+            logger.error(f"Ledger unavailable for {message_id}, processing without checkpoints: {str(e)}")
+            return self._claimed(message_id, 'unavailable')
+
+        if row is None:
+            # Expired between the put and the read
+            return self._claimed(message_id, 'unavailable')
+        if row.get('status') == 'done':
+            update_ledger_entry(message_id, {}, count_delivery=True)
+            return self._claimed(message_id, 'done')
+
+        held_until = int(row.get('claimed_until', 0))
+        if held_until > now or not update_ledger_entry(
+                message_id, {'claimed_until': lease}, count_delivery=True, expected_lease=held_until):
+            return self._claimed(message_id, 'in_flight')
+
+        checkpoints = {stage: json.loads(row[f'cp_{stage}']) for stage in CHECKPOINTS if f'cp_{stage}' in row}
+        return self._claimed(message_id, 'resumed', checkpoints)
+
+    def checkpoint(self, message_id: str, stage: str, value: Any) -> None:
+        encoded = json.dumps(value, default=str)
+        if len(encoded) > MAX_CHECKPOINT_BYTES:
+            logger.info(f"Not checkpointing {stage} for {message_id}: {len(encoded)} bytes")
+            return
+        update_ledger_entry(message_id, {f'cp_{stage}': encoded})
+
+    def complete(self, message_id: str) -> None:
+        update_ledger_entry(message_id, {'status': 'done', 'claimed_until': 0})
+
+    def release(self, message_id: str) -> None:
+        """Give up the lease after a failure, so the redelivery resumes without waiting for it to lapse."""
+        update_ledger_entry(message_id, {'claimed_until': 0})
+
+email_ledger = EmailLedger()
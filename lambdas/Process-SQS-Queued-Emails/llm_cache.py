@@ -0,0 +1,122 @@
+# llm_cache.py
+"""
+Content-addressed cache of parsed LLM classification results.
+
+    key = llm_cache.key('ev_calculation', payload)
+    hit, ev = llm_cache.get(key)
+    if not hit:
+        ev = <chat_completion(payload), parsed>
+        llm_cache.put(key, 'ev_calculation', ev)
+
+Classifications (EV, flag, spam, reviewer, selector, thread attributes) are
+near-deterministic functions of the request, so a retried Lambda, a second
+getThreadAttrs run or a user re-triggering EV gets the same answer. The key is
+the SHA-256 of the kind, LLM_CACHE_VERSION, the model and sampling parameters
+and the messages with whitespace collapsed. The system prompt is one of the
+messages, so editing a prompt starts from an empty cache; bump
+LLM_CACHE_VERSION when a parser changes what it stores.
+
+Results are stored as JSON in the LLMCache table with a DynamoDB TTL of
+LLM_CACHE_TTL_DAYS, and the last LLM_CACHE_LOCAL_SIZE are kept in an
+in-memory LRU. DynamoDB errors are logged and read as misses. Call sites
+record a hit in Invocations with 0 tokens and cache_status 'cached'.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+import boto3
+
+from metrics import metrics
+
+logger = logging.getLogger()
+
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_TABLE = os.environ.get('LLM_CACHE_TABLE', 'LLMCache')
+LLM_CACHE_VERSION = os.environ.get('LLM_CACHE_VERSION', '1')
+LLM_CACHE_TTL_DAYS = int(os.environ.get('LLM_CACHE_TTL_DAYS', 30))
+LLM_CACHE_LOCAL_SIZE = int(os.environ.get('LLM_CACHE_LOCAL_SIZE', 1024))
+
+# Invocations cache_status of a result served from this cache
+CACHED = 'cached'
+
+dynamodb = boto3.resource('dynamodb', region_name=os.environ.get('AWS_REGION', 'us-east-2'))
+
+def normalize_messages(messages) -> list:
+    """[role, content] pairs with runs of whitespace in the content collapsed to one space."""
+    return [[m.get('role', ''), ' '.join(str(m.get('content', '')).split())] for m in messages]
+
+class LLMResultCache:
+    def __init__(self, max_entries: int = LLM_CACHE_LOCAL_SIZE, enabled: bool = LLM_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, Any]" = OrderedDict()
+        self.stats: Dict[str, int] = {'lookups': 0, 'local_hits': 0, 'hits': 0, 'misses': 0}
+
+    def key(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Cache key of a chat completion payload classified as kind."""
+        params = {name: value for name, value in payload.items() if name not in ('messages', 'stream')}
+        material = [kind, LLM_CACHE_VERSION, params, normalize_messages(payload.get('messages', []))]
+        return hashlib.sha256(json.dumps(material, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+    def _remember(self, key: str, result: Any) -> None:
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(True, result) for a cached key, else (False, None)."""
+        if not self.enabled:
+            return False, None
+        self.stats['lookups'] += 1
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.stats['local_hits'] += 1
+                self.stats['hits'] += 1
+                metrics.count('LLMCacheHits')
+                return True, self._results[key]
+
+        try:
+            item = dynamodb.Table(LLM_CACHE_TABLE).get_item(Key={'id': key}).get('Item')
+        except Exception as e:
+            logger.error(f"Error reading LLM cache: {str(e)}")
+            item = None
+        # TTL deletion lags expiry, so expired rows can still be read
+        if item and int(item.get('ttl', 0)) > time.time():
+            result = json.loads(item['result'])
+            self._remember(key, result)
+            self.stats['hits'] += 1
+            metrics.count('LLMCacheHits')
+            return True, result
+
+        self.stats['misses'] += 1
+        metrics.count('LLMCacheMisses')
+        return False, None
+
+    def put(self, key: str, kind: str, result: Any) -> None:
+        """Store a parsed result (JSON-serializable) under key."""
+        if not self.enabled:
+            return
+        self._remember(key, result)
+        now = int(time.time())
+        try:
+            dynamodb.Table(LLM_CACHE_TABLE).put_item(Item={
+                'id': key,
+                'kind': kind,
+                'result': json.dumps(result),
+                'created_at': now,
+                'ttl': now + LLM_CACHE_TTL_DAYS * 24 * 60 * 60
+            })
+        except Exception as e:
+            logger.error(f"Error writing LLM cache: {str(e)}")
+
+llm_cache = LLMResultCache()
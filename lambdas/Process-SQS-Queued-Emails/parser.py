@@ -1,102 +1,151 @@
 # parser.py
 from email import policy
-from email.parser import BytesParser
+from email.parser import BytesParser, BytesHeaderParser
 import re
-from typing import Tuple, Optional
+import base64
+import binascii
+import quopri
+from typing import Tuple, Optional, List
 import logging
 import email.utils
 
+from config import MAX_EMAIL_READ_BYTES, MAX_TEXT_PART_BYTES, MAX_HTML_TEXT_CHARS
+from html_text import html_to_text as convert_html
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Patterns that indicate the start of quoted content. Single-line markers are matched
+# against the stripped line; the multi-line ones against "line\nnext line".
+REPLY_MARKERS = [
+    # Common reply headers
+    r'^On .+?\d{4}.*wrote:$',  # Most common: On Fri, May 30, 2025 at 12:13 PM <email> wrote:
+    r'^On .+?\d{4}.*\n.*wrote:$',  # Multi-line version
+    r'^From:.*$',               # Outlook, Apple Mail, etc.
+    r'^Sent:.*$',               # Outlook
+    r'^To:.*$',                 # Outlook
+    r'^Subject:.*$',            # Outlook
+    r'^Date:.*$',               # Common email header
+    r'^Cc:.*$',                 # CC header
+    r'^Bcc:.*$',                # BCC header
+
+    # Quoted content indicators
+    r'^>.*$',                   # Quoted lines
+    r'^--\s*$',                # Signature
+    r'^_{2,}$',                # Separator
+    r'^={2,}$',                # Separator
+
+    # Additional email client specific patterns
+    r'^Begin forwarded message:$',
+    r'^Forwarded by .*$',
+    r'^From:.*\nSent:.*\nTo:.*$',  # Multi-line Outlook header
+    r'^On .* wrote:.*$',           # Alternative format
+    r'^On .* \d{1,2}/\d{1,2}/\d{2,4}.*wrote:$',  # Date format variations
+    r'^On .* \d{1,2} \w+ \d{4}.*wrote:$',        # Another date format
+]
+
+# All markers as one compiled alternation, so each line costs a single match
+_REPLY_MARKER_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in REPLY_MARKERS), re.IGNORECASE)
+
+_EXCESS_NEWLINES_RE = re.compile(r'\n{3,}')
+
+# A marker can only match "line\nnext line" where it fails on the line alone if the line
+# itself starts with "On " (the attribution line wrapped before "wrote:"); every other
+# marker is anchored to a single line. Lines without that prefix skip the second match.
+_TWO_LINE_PREFIX = 'on '
+
+def find_quoted_reply_start(lines: List[str]) -> int:
+    """
+    Index of the first line that starts the quoted section, or len(lines) if there is none.
+    """
+    last = len(lines) - 1
+    for i, line in enumerate(lines):
+        line = line.rstrip()
+        if _REPLY_MARKER_RE.match(line.strip()):
+            return i
+        if i < last and line[:3].lower() == _TWO_LINE_PREFIX and _REPLY_MARKER_RE.match(f"{line}\n{lines[i + 1].strip()}"):
+            return i
+    return len(lines)
+
 def strip_quoted_reply(text: str) -> str:
     """
     Strips out quoted reply text from email body.
     Handles various email client formats and reply markers.
+
+    Everything from the first reply marker (see REPLY_MARKERS) onwards is dropped,
+    runs of blank lines are limited to two, and the original text is kept if less
+    than 10 characters would remain.
     """
     if not text:
         return text
 
-    # Patterns that indicate the start of quoted content
-    reply_markers = [
-        # Common reply headers
-        r'^On .+?\d{4}.*wrote:$',  # Most common: On Fri, May 30, 2025 at 12:13 PM <email> wrote:
-        r'^On .+?\d{4}.*\n.*wrote:$',  # Multi-line version
-        r'^From:.*$',               # Outlook, Apple Mail, etc.
-        r'^Sent:.*$',               # Outlook
-        r'^To:.*$',                 # Outlook
-        r'^Subject:.*$',            # Outlook
-        r'^Date:.*$',               # Common email header
-        r'^Cc:.*$',                 # CC header
-        r'^Bcc:.*$',                # BCC header
-        
-        # Quoted content indicators
-        r'^>.*$',                   # Quoted lines
-        r'^--\s*$',                # Signature
-        r'^_{2,}$',                # Separator
-        r'^={2,}$',                # Separator
-        
-        # Additional email client specific patterns
-        r'^Begin forwarded message:$',
-        r'^Forwarded by .*$',
-        r'^From:.*\nSent:.*\nTo:.*$',  # Multi-line Outlook header
-        r'^On .* wrote:.*$',           # Alternative format
-        r'^On .* \d{1,2}/\d{1,2}/\d{2,4}.*wrote:$',  # Date format variations
-        r'^On .* \d{1,2} \w+ \d{4}.*wrote:$',        # Another date format
-    ]
-
-    # Split into lines and process
+    # Split into lines and keep everything before the first marker
     lines = text.split('\n')
+    cut = find_quoted_reply_start(lines)
+    if cut < len(lines):
+        logger.info(f"Found reply marker at line {cut}")
+
     filtered_lines = []
-    in_quoted_section = False
     consecutive_empty_lines = 0
-    original_line_count = len(lines)
-    
-    for i, line in enumerate(lines):
+    for line in lines[:cut]:
         line = line.rstrip()  # Remove trailing whitespace
-        
-        # Check if this line starts a quoted section
-        if not in_quoted_section:
-            if any(re.match(pattern, line.strip(), re.IGNORECASE) for pattern in reply_markers):
-                logger.info(f"Found reply marker at line {i}: {line.strip()}")
-                in_quoted_section = True
-                continue
-                
-            # Check for multi-line patterns (e.g., Outlook headers)
-            if i < len(lines) - 1:
-                next_line = lines[i + 1].strip()
-                combined = f"{line}\n{next_line}"
-                if any(re.match(pattern, combined, re.IGNORECASE) for pattern in reply_markers):
-                    logger.info(f"Found multi-line reply marker at line {i}")
-                    in_quoted_section = True
-                    continue
-        
-        # If we're not in a quoted section, keep the line
-        if not in_quoted_section:
-            if line.strip() == '':
-                consecutive_empty_lines += 1
-                # Only keep up to 2 consecutive empty lines
-                if consecutive_empty_lines <= 2:
-                    filtered_lines.append(line)
-            else:
-                consecutive_empty_lines = 0
+        if line.strip() == '':
+            consecutive_empty_lines += 1
+            # Only keep up to 2 consecutive empty lines
+            if consecutive_empty_lines <= 2:
                 filtered_lines.append(line)
-    
+        else:
+            consecutive_empty_lines = 0
+            filtered_lines.append(line)
+
     # Join lines and clean up
     cleaned_text = '\n'.join(filtered_lines)
-    
+
     # Remove excessive whitespace
-    cleaned_text = re.sub(r'\n{3,}', '\n\n', cleaned_text)  # Replace 3+ newlines with 2
+    cleaned_text = _EXCESS_NEWLINES_RE.sub('\n\n', cleaned_text)  # Replace 3+ newlines with 2
     cleaned_text = cleaned_text.strip()
-    
+
     # If we removed too much content, restore the original
-    if len(cleaned_text) < 10 and original_line_count > 1:
+    if len(cleaned_text) < 10 and len(lines) > 1:
         logger.info(f"Stripping removed too much content (cleaned: {len(cleaned_text)} chars), restoring original")
         return text.strip()
-    
+
     logger.info(f"Original text length: {len(text)}, Cleaned text length: {len(cleaned_text)}")
     return cleaned_text
 
+def html_to_text(html_text: str) -> str:
+    """HTML to readable text (see html_text.py), capped at MAX_HTML_TEXT_CHARS."""
+    logger.info("Converting HTML to plain text")
+    plain_text = convert_html(html_text, MAX_HTML_TEXT_CHARS)
+    logger.info(f"Converted HTML to text, length: {len(html_text)} -> {len(plain_text)}")
+    return plain_text
+
+def finish_body_text(msg, plain_text: Optional[str]) -> str:
+    """
+    Final clean-up shared by the parsers: substitute a minimal body built from the
+    headers when no text was found, then strip quoted replies.
+    """
+    # If we still don't have any text, create a minimal text from headers
+    if not plain_text:
+        logger.info("No text content found, creating minimal text from headers")
+        subject = msg.get('Subject', 'No Subject')
+        from_header = msg.get('From', 'Unknown Sender')
+        plain_text = f"Subject: {subject}\nFrom: {from_header}\n\n[Email content could not be extracted]"
+
+    # Clean the text by removing quoted replies
+    if plain_text:
+        original_length = len(plain_text)
+        plain_text = strip_quoted_reply(plain_text)
+        logger.info(f"Cleaned email body: {plain_text[:100]}...")  # Log first 100 chars
+        logger.info(f"Original text length: {original_length}, Cleaned text length: {len(plain_text)}")
+        
+        # If cleaning removed all content, restore the original
+        if len(plain_text) == 0 and original_length > 0:
+            logger.info("Cleaning removed all content, restoring original")
+            plain_text = f"Subject: {msg.get('Subject', 'No Subject')}\nFrom: {msg.get('From', 'Unknown Sender')}\n\n[Email content]"
+
+    return plain_text
+
 def parse_email(email_content: bytes) -> Tuple[Optional[object], Optional[str]]:
     """
     Parses raw email bytes and returns the email message and plain text part.
@@ -161,11 +210,7 @@ def parse_email(email_content: bytes) -> Tuple[Optional[object], Optional[str]]:
 
         # If no plain text but HTML exists, convert HTML to plain text
         if not plain_text and html_text:
-            logger.info("Converting HTML to plain text")
-            # Simple HTML to text conversion
-            plain_text = re.sub(r'<[^>]+>', ' ', html_text)
-            plain_text = re.sub(r'\s+', ' ', plain_text).strip()
-            logger.info(f"Converted HTML to text, length: {len(plain_text)}")
+            plain_text = html_to_text(html_text)
 
         # If we still don't have text, try to get the raw payload
         if not plain_text:
@@ -195,30 +240,222 @@ def parse_email(email_content: bytes) -> Tuple[Optional[object], Optional[str]]:
             except Exception as e:
                 logger.error(f"Error extracting raw payload: {str(e)}")
 
-        # If we still don't have any text, create a minimal text from headers
-        if not plain_text:
-            logger.info("No text content found, creating minimal text from headers")
-            subject = msg.get('Subject', 'No Subject')
-            from_header = msg.get('From', 'Unknown Sender')
-            plain_text = f"Subject: {subject}\nFrom: {from_header}\n\n[Email content could not be extracted]"
-
-        # Clean the text by removing quoted replies
-        if plain_text:
-            original_length = len(plain_text)
-            plain_text = strip_quoted_reply(plain_text)
-            logger.info(f"Cleaned email body: {plain_text[:100]}...")  # Log first 100 chars
-            logger.info(f"Original text length: {original_length}, Cleaned text length: {len(plain_text)}")
-            
-            # If cleaning removed all content, restore the original
-            if len(plain_text) == 0 and original_length > 0:
-                logger.info("Cleaning removed all content, restoring original")
-                plain_text = f"Subject: {msg.get('Subject', 'No Subject')}\nFrom: {msg.get('From', 'Unknown Sender')}\n\n[Email content]"
-
-        return msg, plain_text
+        return msg, finish_body_text(msg, plain_text)
     except Exception as e:
         logger.error(f"Error parsing email: {str(e)}")
         return None, None
 
+class _StreamLines:
+    """
+    Line reader over a binary stream (e.g. an S3 StreamingBody) that reads in
+    chunks and stops after max_bytes. Over-long lines are returned in pieces so
+    a single line can never be buffered whole.
+    """
+
+    def __init__(self, stream, max_bytes: int, chunk_size: int = 64 * 1024, max_line: int = 64 * 1024):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.max_line = max_line
+        self.bytes_read = 0
+        self.truncated = False
+        self._buffer = b''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        remaining = self.max_bytes - self.bytes_read
+        if remaining <= 0:
+            self.truncated = True
+            self._eof = True
+            return False
+        chunk = self.stream.read(min(self.chunk_size, remaining))
+        if not chunk:
+            self._eof = True
+            return False
+        self.bytes_read += len(chunk)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def readline(self) -> bytes:
+        """Next line including its terminator, or b'' at end of stream / byte cap."""
+        while True:
+            newline = self._buffer.find(b'\n', self._pos)
+            if newline >= 0 and newline - self._pos < self.max_line:
+                line = self._buffer[self._pos:newline + 1]
+                self._pos = newline + 1
+                return line
+            if len(self._buffer) - self._pos >= self.max_line or not self._fill():
+                line = self._buffer[self._pos:self._pos + self.max_line]
+                self._pos += len(line)
+                return line
+
+    def read(self, size: int) -> bytes:
+        """Up to size bytes (fewer at end of stream / byte cap)."""
+        while len(self._buffer) - self._pos < size and self._fill():
+            pass
+        data = self._buffer[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+def _read_header_block(lines: _StreamLines):
+    """Read header lines up to the blank separator line and parse them (headers only)."""
+    header_lines = []
+    while True:
+        line = lines.readline()
+        if not line or line in (b'\r\n', b'\n'):
+            break
+        header_lines.append(line)
+    return BytesHeaderParser(policy=policy.default).parsebytes(b''.join(header_lines))
+
+def _decode_part(headers, body_lines: list, default_charset: str = 'utf-8') -> str:
+    """Undo the Content-Transfer-Encoding and charset of a text part."""
+    raw = b''.join(body_lines)
+    encoding = str(headers.get('Content-Transfer-Encoding', '')).strip().lower()
+    try:
+        if encoding == 'base64':
+            raw = re.sub(rb'[^A-Za-z0-9+/]', b'', raw)
+            if len(raw) % 4 == 1:
+                # A part cut at the text cap can end one character into a 4-character group,
+                # which encodes no whole byte; 2 or 3 left over are a padded final group
+                raw = raw[:-1]
+            raw = base64.b64decode(raw + b'=' * (-len(raw) % 4))
+        elif encoding == 'quoted-printable':
+            raw = quopri.decodestring(raw)
+    except (binascii.Error, ValueError) as e:
+        # Never hand the still-encoded text on as the body
+        logger.error(f"Error decoding {encoding} part: {str(e)}")
+        return ''
+    charset = headers.get_content_charset() or default_charset
+    try:
+        return raw.decode(charset, errors='replace')
+    except LookupError:
+        return raw.decode('utf-8', errors='replace')
+
+def parse_email_stream(stream, max_bytes: int = MAX_EMAIL_READ_BYTES, max_text_bytes: int = MAX_TEXT_PART_BYTES) -> Tuple[Optional[object], Optional[str]]:
+    """
+    Streaming counterpart of parse_email for a binary stream such as an S3 body.
+
+    Only the headers and the text/plain and text/html parts are kept; every
+    other part (attachments, inline images, forwarded messages) is skipped line
+    by line without being buffered. Reading stops once a text/plain part has
+    been read, at the end of the message, or after max_bytes. Each text part is
+    capped at max_text_bytes.
+
+    Returns (headers, plain_text): headers is an email.message.EmailMessage with
+    the top-level headers only (enough for extract_email_headers and
+    extract_user_info_from_headers); plain_text is post-processed exactly like
+    parse_email's.
+    """
+    try:
+        lines = _StreamLines(stream, max_bytes)
+        top = _read_header_block(lines)
+        logger.info(f"Email content type: {top.get_content_type()}")
+
+        plain_text = None
+        html_text = None
+
+        # Active multipart boundaries, innermost last
+        boundaries = []
+        if top.get_content_maintype() == 'multipart' and top.get_param('boundary'):
+            boundaries.append(top.get_param('boundary').encode('utf-8', errors='replace'))
+            part, collecting = None, False  # preamble: skip until the first boundary
+        else:
+            part, collecting = top, True  # single part: its body is the text (like parse_email)
+        body_lines, body_size = [], 0
+
+        def finish_part():
+            nonlocal plain_text, html_text
+            if part is None or not collecting or not body_lines:
+                return
+            text = _decode_part(part, body_lines)
+            if not text.strip():
+                return
+            content_type = part.get_content_type()
+            if content_type == 'text/html':
+                html_text = html_text or text
+                logger.info(f"Found HTML part, length: {len(text)}")
+            else:
+                plain_text = plain_text or text
+                logger.info(f"Found {content_type} part, length: {len(text)}")
+
+        if not boundaries:
+            # No parts to delimit: the body is everything after the headers, up to the text cap;
+            # the rest of the stream is not read
+            body_lines.append(lines.read(max_text_bytes))
+            finish_part()
+
+        # Until the outermost closing boundary (never entered for a single part)
+        while boundaries:
+            line = lines.readline()
+            if not line:
+                finish_part()
+                break
+
+            delimiter = None
+            if boundaries and line.startswith(b'--'):
+                stripped = line.rstrip()
+                for depth in range(len(boundaries) - 1, -1, -1):
+                    if stripped == b'--' + boundaries[depth]:
+                        delimiter = (depth, False)
+                        break
+                    if stripped == b'--' + boundaries[depth] + b'--':
+                        delimiter = (depth, True)
+                        break
+
+            if delimiter is None:
+                if collecting and body_size < max_text_bytes:
+                    body_lines.append(line[:max_text_bytes - body_size])
+                    body_size += len(body_lines[-1])
+                continue
+
+            # A boundary line ends the current part
+            finish_part()
+            body_lines, body_size = [], 0
+            part, collecting = None, False
+            if plain_text is not None:
+                break  # Everything we use has been read; don't download the rest
+
+            depth, closing = delimiter
+            del boundaries[depth + 1:]
+            if closing:
+                boundaries.pop()
+                continue
+
+            part = _read_header_block(lines)
+            content_type = part.get_content_type()
+            if part.get_content_maintype() == 'multipart' and part.get_param('boundary'):
+                boundaries.append(part.get_param('boundary').encode('utf-8', errors='replace'))
+                part = None
+            elif part.get_content_disposition() == 'attachment':
+                logger.info(f"Skipping attachment part ({content_type})")
+            elif content_type == 'text/plain' or (content_type == 'text/html' and html_text is None):
+                collecting = True
+            else:
+                logger.info(f"Skipping {content_type} part")
+
+        logger.info(f"Read {lines.bytes_read} bytes of the email stream" + (" (byte cap reached)" if lines.truncated else ""))
+
+        if not plain_text and html_text:
+            plain_text = html_to_text(html_text)
+
+        return top, finish_body_text(top, plain_text)
+    except Exception as e:
+        logger.error(f"Error parsing email stream: {str(e)}")
+        return None, None
+
+def referenced_message_ids(in_reply_to: str, references: str) -> List[str]:
+    """
+    Individual (normalized) message IDs an email replies to, most recent first:
+    In-Reply-To, then References from last to first, without duplicates.
+    """
+    ids = [in_reply_to] if in_reply_to else []
+    ids.extend(reversed(references.split()))
+    return list(dict.fromkeys(ids))
+
 def extract_email_headers(msg) -> Tuple[str, str, str]:
     """
     Returns Message-ID, In-Reply-To, References headers.
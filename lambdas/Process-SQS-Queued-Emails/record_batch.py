@@ -0,0 +1,76 @@
+# record_batch.py
+"""
+Concurrent processing of an SQS batch with per-conversation ordering.
+
+Records are grouped by an ordering key. Groups run concurrently on a bounded
+thread pool, and the records inside a group run one after another in arrival
+order. When a record fails, the rest of its group is not attempted, so those
+records are retried after it rather than overtaking it. The failed message IDs
+are returned in the SQS partial batch response format (this requires
+ReportBatchItemFailures on the event source mapping).
+"""
+import json
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger()
+
+def ordering_key(record: Dict[str, Any]) -> str:
+    """
+    Key for records that must be processed in order.
+
+    The conversation id is only known after the email has been fetched and
+    threaded, so records are keyed by the (sender, recipient) pair instead: every
+    message of a conversation is between the same lead and response address.
+    FIFO queues supply a MessageGroupId, which is used when present.
+    """
+    group_id = record.get('attributes', {}).get('MessageGroupId')
+    if group_id:
+        return f"group:{group_id}"
+
+    try:
+        mail = json.loads(json.loads(record['body'])['Message'])['mail']
+        return f"{mail['source'].lower()}|{mail['destination'][0].lower()}"
+    except (KeyError, IndexError, TypeError, AttributeError, ValueError):
+        # Unparseable records fail fast on their own; keep them out of other groups
+        return f"message:{record.get('messageId', id(record))}"
+
+def _run_group(records: List[Dict[str, Any]], handler: Callable[[Dict[str, Any]], bool]) -> List[str]:
+    """Process a group sequentially. Returns the message IDs to retry."""
+    for position, record in enumerate(records):
+        try:
+            succeeded = handler(record)
+        except Exception as e:
+            logger.error(f"Unhandled error processing record {record.get('messageId')}: {str(e)}", exc_info=True)
+            succeeded = False
+
+        if not succeeded:
+            skipped = records[position + 1:]
+            if skipped:
+                logger.warning(f"Deferring {len(skipped)} later record(s) in the same conversation after failure of {record.get('messageId')}")
+            return [r['messageId'] for r in records[position:]]
+    return []
+
+def process_batch(records: List[Dict[str, Any]], handler: Callable[[Dict[str, Any]], bool], concurrency: int) -> List[str]:
+    """
+    Run handler over every record and return the message IDs that failed.
+
+    handler returns True when the record is done (processed, or dropped as
+    permanently unprocessable) and False when it should be retried.
+    """
+    groups: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for record in records:
+        groups.setdefault(ordering_key(record), []).append(record)
+
+    workers = max(1, min(concurrency, len(groups)))
+    logger.info(f"Processing {len(records)} record(s) in {len(groups)} ordering group(s) with {workers} worker(s)")
+
+    if workers == 1:
+        results = [_run_group(group, handler) for group in groups.values()]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda group: _run_group(group, handler), groups.values()))
+
+    return [message_id for failed in results for message_id in failed]
@@ -0,0 +1,148 @@
+# repository.py
+"""
+Trusted internal reads for the email processor.
+
+These go straight to DynamoDB instead of through the DBSelect Lambda, which
+exists for external (API Gateway) callers and adds an invoke per read. Items
+are returned with Decimal values converted to float, i.e. the same shape
+DBSelect produces after its JSON round trip.
+"""
+import logging
+import random
+import time
+from decimal import Decimal
+from typing import Dict, Any, Optional, List
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from config import AWS_REGION, BATCH_GET_MAX_ATTEMPTS, BATCH_GET_BACKOFF_BASE, BATCH_GET_BACKOFF_MAX
+
+logger = logging.getLogger()
+
+dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+
+def _plain(value: Any) -> Any:
+    """Convert DynamoDB Decimals to float, recursively (mirrors DBSelect's DecimalEncoder)."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+def _query(table_name: str, key_name: str, key_value: Any, index_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Query a table (or one of its GSIs) for every item matching key_name = key_value."""
+    table = dynamodb.Table(table_name)
+    kwargs = {'KeyConditionExpression': Key(key_name).eq(key_value)}
+    if index_name:
+        kwargs['IndexName'] = index_name
+
+    items = []
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return [_plain(item) for item in items]
+
+def _get(table_name: str, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Strongly consistent single-item read by primary key."""
+    response = dynamodb.Table(table_name).get_item(Key=key, ConsistentRead=True)
+    item = response.get('Item')
+    return _plain(item) if item else None
+
+def _batch_get(table_name: str, keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Strongly consistent BatchGetItem for keys (unique), 100 per request. Unprocessed keys
+    are retried with exponential backoff and full jitter; if some are still unprocessed
+    after BATCH_GET_MAX_ATTEMPTS requests, raises RuntimeError.
+    """
+    items = []
+    for start in range(0, len(keys), 100):
+        request = {table_name: {'Keys': keys[start:start + 100], 'ConsistentRead': True}}
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(random.uniform(0, min(BATCH_GET_BACKOFF_MAX, BATCH_GET_BACKOFF_BASE * 2 ** (attempt - 1))))
+            response = dynamodb.batch_get_item(RequestItems=request)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            request = response.get('UnprocessedKeys') or None
+            if not request:
+                break
+        if request:
+            unprocessed = len(request.get(table_name, {}).get('Keys', []))
+            raise RuntimeError(f"{unprocessed} key(s) of {table_name} still unprocessed after {BATCH_GET_MAX_ATTEMPTS} attempts")
+    return [_plain(item) for item in items]
+
+def get_account_by_response_email(response_email: str) -> Optional[Dict[str, Any]]:
+    """Users row whose responseEmail matches (case-insensitive), or None."""
+    if not response_email:
+        return None
+    items = _query('Users', 'responseEmail', response_email.lower(), 'responseEmail-index')
+    return items[0] if items else None
+
+def get_all_response_emails() -> List[Dict[str, Any]]:
+    """(id, responseEmail) of every user with a response address: a paginated scan of the responseEmail-index, projecting only those two."""
+    table = dynamodb.Table('Users')
+    kwargs = {
+        'IndexName': 'responseEmail-index',
+        'ProjectionExpression': 'id, responseEmail'
+    }
+    items = []
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return [_plain(item) for item in items]
+
+def get_cache_generation(name: str) -> int:
+    """Generation counter of a shared cache in CacheGenerations (0 if it was never bumped)."""
+    item = _get('CacheGenerations', {'id': name})
+    return int(item.get('generation', 0)) if item else 0
+
+def get_conversation_by_response_id(response_id: str) -> Optional[Dict[str, Any]]:
+    """Conversations row whose response_id (Message-ID header) matches, or None."""
+    if not response_id:
+        return None
+    items = _query('Conversations', 'response_id', response_id, 'response_id-index')
+    return items[0] if items else None
+
+def get_message_index_entries(msg_ids: List[str]) -> List[Dict[str, Any]]:
+    """MessageIndex rows (msg_id -> conversation_id) for the given message IDs, in one batched read."""
+    if not msg_ids:
+        return []
+    return _batch_get('MessageIndex', [{'msg_id': msg_id} for msg_id in dict.fromkeys(msg_ids)])
+
+def get_spam_verdicts(row_ids: List[str]) -> List[Dict[str, Any]]:
+    """SpamVerdicts rows (cached verdicts and allow/deny list entries) for the given ids, in one batched read."""
+    if not row_ids:
+        return []
+    return _batch_get('SpamVerdicts', [{'id': row_id} for row_id in dict.fromkeys(row_ids)])
+
+def get_conversation_items(conversation_id: str) -> List[Dict[str, Any]]:
+    """All Conversations rows for a conversation_id (unsorted)."""
+    if not conversation_id:
+        return []
+    return _query('Conversations', 'conversation_id', conversation_id)
+
+def get_thread(conversation_id: str) -> Optional[Dict[str, Any]]:
+    """Threads row for a conversation_id, or None."""
+    if not conversation_id:
+        return None
+    return _get('Threads', {'conversation_id': conversation_id})
+
+def get_user(account_id: str) -> Optional[Dict[str, Any]]:
+    """Users row for an account id, or None."""
+    if not account_id:
+        return None
+    return _get('Users', {'id': account_id})
+
+def get_ledger_entry(message_id: str) -> Optional[Dict[str, Any]]:
+    """EmailLedger row for an SES messageId, or None."""
+    if not message_id:
+        return None
+    return _get('EmailLedger', {'message_id': message_id})
@@ -1,16 +1,37 @@
 # scheduling.py
+"""
+Delayed dispatch of LLM replies to Send-Email.
+
+In 'queue' mode (RESPONSE_DISPATCH_MODE) the Send-Email payload is sent to the
+response dispatch queue with an SQS delivery delay, and Send-Email drains the
+queue in batches. In 'scheduler' mode each reply gets a one-off EventBridge
+schedule that deletes itself after it fires; schedules left over from before
+that are removed by the Sweep-Response-Schedules Lambda.
+"""
 import os
 import json
+import hashlib
 import random
 from datetime import datetime, timedelta
+import logging
 import boto3
-from config import PROCESSING_LAMBDA_ARN, AWS_REGION
+from config import (
+    PROCESSING_LAMBDA_ARN, AWS_REGION,
+    RESPONSE_DISPATCH_MODE, RESPONSE_DISPATCH_QUEUE_URL, RESPONSE_DISPATCH_DELAY_SECONDS
+)
+
+logger = logging.getLogger()
 
 scheduler = boto3.client('scheduler', region_name=AWS_REGION)
+sqs = boto3.client('sqs', region_name=AWS_REGION)
+
+# Longest delivery delay SQS allows for a single message
+MAX_QUEUE_DELAY_SECONDS = 900
 
 
 def simple_string_hash(input_str: str, length: int = 32) -> str:
-    return str(abs(hash(input_str)))[:length]
+    # Stable across processes (unlike hash()), so a redelivered record maps to the same schedule name
+    return str(int(hashlib.sha256(input_str.encode('utf-8')).hexdigest(), 16))[:length]
 
 
 def generate_safe_schedule_name(base: str) -> str:
@@ -20,16 +41,47 @@ def generate_safe_schedule_name(base: str) -> str:
 
 def schedule_email_processing(name: str, at_time: datetime, payload: dict, in_reply_to: str = None):
     expr = at_time.strftime('%Y-%m-%dT%H:%M:%S')
-    scheduler.create_schedule(
-        Name=name,
-        ScheduleExpression=f"at({expr})",
-        ScheduleExpressionTimezone='UTC',
-        FlexibleTimeWindow={'Mode': 'OFF'},
-        Target={
-            'Arn': PROCESSING_LAMBDA_ARN,
-            'RoleArn': os.environ['SCHEDULER_ROLE_ARN'],
-            'Input': json.dumps(payload),
-            'RetryPolicy': {'MaximumRetryAttempts': 0}
-        },
-        State='ENABLED'
+    try:
+        scheduler.create_schedule(
+            Name=name,
+            ScheduleExpression=f"at({expr})",
+            ScheduleExpressionTimezone='UTC',
+            FlexibleTimeWindow={'Mode': 'OFF'},
+            Target={
+                'Arn': PROCESSING_LAMBDA_ARN,
+                'RoleArn': os.environ['SCHEDULER_ROLE_ARN'],
+                'Input': json.dumps(payload),
+                'RetryPolicy': {'MaximumRetryAttempts': 0}
+            },
+            State='ENABLED',
+            ActionAfterCompletion='DELETE'
+        )
+    except scheduler.exceptions.ConflictException:
+        # A redelivered SQS record already scheduled this response
+        logger.info(f"Schedule {name} already exists; not scheduling again")
+
+
+def enqueue_response(name: str, delay_seconds: int, payload: dict):
+    sqs.send_message(
+        QueueUrl=RESPONSE_DISPATCH_QUEUE_URL,
+        MessageBody=json.dumps(payload),
+        DelaySeconds=max(0, min(int(delay_seconds), MAX_QUEUE_DELAY_SECONDS)),
+        # Lets Send-Email drop copies of one reply that arrive in the same batch
+        MessageAttributes={'dispatch_name': {'DataType': 'String', 'StringValue': name}}
     )
+
+
+def dispatch_response(name: str, payload: dict, delay_seconds: int = RESPONSE_DISPATCH_DELAY_SECONDS,
+                      in_reply_to: str = None) -> str:
+    """
+    Hand a Send-Email payload over for sending in delay_seconds, by the configured
+    dispatch mode. Returns the mode used.
+    """
+    if RESPONSE_DISPATCH_MODE == 'queue' and RESPONSE_DISPATCH_QUEUE_URL:
+        enqueue_response(name, delay_seconds, payload)
+        return 'queue'
+
+    if RESPONSE_DISPATCH_MODE == 'queue':
+        logger.warning("RESPONSE_DISPATCH_QUEUE_URL is not set; dispatching the response with a schedule")
+    schedule_email_processing(name, datetime.utcnow() + timedelta(seconds=delay_seconds), payload, in_reply_to)
+    return 'scheduler'
@@ -0,0 +1,204 @@
+# spam_cache.py
+"""
+Per-account spam verdict cache in front of the LLM spam check.
+
+Verdicts live in the SpamVerdicts table, one row per (account, sender address)
+and per (account, sender domain), with a DynamoDB TTL. A verdict's confidence
+decays with its age (half-life SPAM_CACHE_HALF_LIFE_DAYS); once it is below
+SPAM_CACHE_MIN_CONFIDENCE the sender is classified by the LLM again, and an
+agreeing verdict raises the confidence while a different one replaces it.
+Domain verdicts are only used after SPAM_CACHE_DOMAIN_MIN_OBSERVATIONS
+agreeing observations, and never for shared mailbox providers (gmail.com, ...).
+
+Rows with a `list` attribute are the account's allow and deny lists and take
+precedence over cached verdicts; they have no TTL and are never overwritten:
+
+    {'id': '<account_id>#lead@example.com', 'list': 'allow'}
+    {'id': '<account_id>#@newsletter.example', 'list': 'deny'}
+
+Both rows for a sender are read with one BatchGetItem and kept in an
+in-memory LRU for SPAM_CACHE_LOCAL_TTL_SECONDS. Header-rule verdicts (see
+header_rules.py) apply after the lists and before cached verdicts, except
+that a not-spam header verdict does not clear a sender cached as spam. Every email
+resolved without the LLM is recorded in Invocations with 0 tokens and its
+cache_status.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import (
+    SPAM_CACHE_TTL_DAYS, SPAM_CACHE_HALF_LIFE_DAYS, SPAM_CACHE_MIN_CONFIDENCE,
+    SPAM_CACHE_DOMAIN_MIN_OBSERVATIONS, SPAM_CACHE_LOCAL_TTL_SECONDS, SPAM_CACHE_LOCAL_SIZE
+)
+from db import save_spam_verdict, store_ai_invocation
+import repository
+
+logger = logging.getLogger()
+
+# Confidence of a verdict seen once; each agreeing verdict closes half the remaining gap to 1
+INITIAL_CONFIDENCE = 0.7
+
+# Domains shared by unrelated senders; one sender's verdict says nothing about another's
+SHARED_MAIL_DOMAINS = {
+    'gmail.com', 'googlemail.com', 'yahoo.com', 'ymail.com', 'outlook.com', 'hotmail.com', 'live.com',
+    'msn.com', 'icloud.com', 'me.com', 'mac.com', 'aol.com', 'proton.me', 'protonmail.com', 'gmx.com',
+    'gmx.net', 'mail.com', 'zoho.com', 'yandex.com', 'comcast.net', 'att.net', 'verizon.net',
+    'sbcglobal.net', 'cox.net', 'charter.net',
+}
+
+def normalize_sender(sender: str) -> Tuple[str, str]:
+    """(address, domain) of a sender, lowercased and without a +tag; ('', '') if it is not an address."""
+    address = (sender or '').strip().strip('<>').lower()
+    local, _, domain = address.rpartition('@')
+    if not local or not domain:
+        return '', ''
+    return f"{local.split('+', 1)[0]}@{domain}", domain
+
+def effective_confidence(row: Dict[str, Any], now: float) -> float:
+    age_days = max(0.0, now - float(row.get('updated_at', 0))) / 86400.0
+    return float(row.get('confidence', 0)) * 0.5 ** (age_days / SPAM_CACHE_HALF_LIFE_DAYS)
+
+class SpamVerdictCache:
+    def __init__(self, max_entries: int = SPAM_CACHE_LOCAL_SIZE, local_ttl: float = SPAM_CACHE_LOCAL_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self._lock = threading.Lock()
+        self._rows: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+        self.stats: Dict[str, int] = {'lookups': 0, 'local_hits': 0, 'llm_calls': 0, 'llm_calls_avoided': 0}
+
+    def _local(self, row_id: str, now: float) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._rows.get(row_id)
+            if entry is None or now - entry[1] > self.local_ttl:
+                return False, None
+            self._rows.move_to_end(row_id)
+            return True, entry[0]
+
+    def _remember(self, row_id: str, row: Optional[Dict[str, Any]], now: float) -> None:
+        with self._lock:
+            self._rows[row_id] = (row, now)
+            self._rows.move_to_end(row_id)
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+
+    def _load(self, row_ids: List[str], now: float) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Rows by id (None if absent): from the LRU, the rest with one batched read."""
+        rows, missing = {}, []
+        for row_id in row_ids:
+            found, row = self._local(row_id, now)
+            if found:
+                rows[row_id] = row
+            else:
+                missing.append(row_id)
+
+        if len(missing) < len(row_ids):
+            self.stats['local_hits'] += 1
+        if missing:
+            try:
+                stored = {row['id']: row for row in repository.get_spam_verdicts(missing)}
+            except Exception as e:
+                logger.error(f"Error reading spam verdicts: {str(e)}")
+                return {**rows, **{row_id: None for row_id in missing}}
+            for row_id in missing:
+                rows[row_id] = stored.get(row_id)
+                self._remember(row_id, rows[row_id], now)
+        return rows
+
+    def _resolve(self, address_row, domain_row, domain: str, now: float,
+                 header_verdict: Optional[bool] = None) -> Tuple[Optional[bool], str]:
+        """(is_spam, cache_status), or (None, 'miss') when the LLM has to decide."""
+        for row, scope in ((address_row, 'address'), (domain_row, 'domain')):
+            if row and row.get('list') in ('allow', 'deny'):
+                return row['list'] == 'deny', f"{row['list']}list-{scope}"
+        if header_verdict:
+            return True, 'header-rules'
+
+        cached, cache_status = None, 'miss'
+        if address_row and effective_confidence(address_row, now) >= SPAM_CACHE_MIN_CONFIDENCE:
+            cached, cache_status = address_row['verdict'] == 'spam', 'hit-address'
+        elif (domain_row and domain not in SHARED_MAIL_DOMAINS
+                and int(domain_row.get('observations', 0)) >= SPAM_CACHE_DOMAIN_MIN_OBSERVATIONS
+                and effective_confidence(domain_row, now) >= SPAM_CACHE_MIN_CONFIDENCE):
+            cached, cache_status = domain_row['verdict'] == 'spam', 'hit-domain'
+        # Headers that look like a reply are easy to forge; they don't clear a sender cached as spam
+        if header_verdict is False and not cached:
+            return False, 'header-rules'
+        return cached, cache_status
+
+    def _record(self, row_id: str, previous: Optional[Dict[str, Any]], account_id: str, verdict: str, now: float) -> None:
+        if previous and previous.get('list'):
+            return
+        if previous and previous.get('verdict') == verdict:
+            base = effective_confidence(previous, now)
+            confidence = base + (1.0 - base) * 0.5
+            observations = int(previous.get('observations', 0)) + 1
+        else:
+            confidence, observations = INITIAL_CONFIDENCE, 1
+
+        row = {
+            'id': row_id,
+            'account_id': account_id,
+            'verdict': verdict,
+            'confidence': Decimal(str(round(confidence, 4))),
+            'observations': observations,
+            'updated_at': int(now),
+            'ttl': int(now) + SPAM_CACHE_TTL_DAYS * 24 * 60 * 60
+        }
+        if save_spam_verdict(row):
+            self._remember(row_id, {**row, 'confidence': float(row['confidence'])}, now)
+
+    def _avoided(self, sender: str, account_id: str, is_spam: bool, cache_status: str) -> bool:
+        self.stats['llm_calls_avoided'] += 1
+        logger.info(f"Spam check for {sender} resolved without the LLM ({cache_status}): spam={is_spam}; stats={self.stats}")
+        store_ai_invocation(
+            associated_account=account_id,
+            input_tokens=0,
+            output_tokens=0,
+            llm_email_type='spam_detection',
+            cache_status=cache_status
+        )
+        return is_spam
+
+    def check(self, sender: str, account_id: str, classify: Callable[[], Optional[bool]],
+              header_verdict: Optional[bool] = None) -> bool:
+        """
+        Whether the email from sender to account_id is spam.
+
+        The account's allow/deny lists decide first, then header_verdict (the
+        header rules' verdict, None if undecided), then cached verdicts; a
+        not-spam header_verdict does not override a cached spam verdict. classify()
+        (the LLM check) is only called when none of these decide; it returns None
+        when it could not classify, which is treated as not spam and not cached.
+        Header-rule verdicts are per email and are not cached either.
+        """
+        address, domain = normalize_sender(sender)
+        if not address:
+            if header_verdict is not None:
+                return self._avoided(sender, account_id, header_verdict, 'header-rules')
+            return bool(classify())
+
+        now = time.time()
+        address_id, domain_id = f"{account_id}#{address}", f"{account_id}#@{domain}"
+        self.stats['lookups'] += 1
+        rows = self._load([address_id, domain_id], now)
+
+        is_spam, cache_status = self._resolve(rows[address_id], rows[domain_id], domain, now, header_verdict)
+        if is_spam is not None:
+            return self._avoided(address, account_id, is_spam, cache_status)
+
+        self.stats['llm_calls'] += 1
+        is_spam = classify()
+        if is_spam is None:
+            return False
+
+        verdict = 'spam' if is_spam else 'not_spam'
+        self._record(address_id, rows[address_id], account_id, verdict, now)
+        if domain not in SHARED_MAIL_DOMAINS:
+            self._record(domain_id, rows[domain_id], account_id, verdict, now)
+        return is_spam
+
+spam_verdict_cache = SpamVerdictCache()
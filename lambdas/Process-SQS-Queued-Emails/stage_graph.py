@@ -0,0 +1,90 @@
+# stage_graph.py
+"""
+Minimal dependency-graph runner for the per-email pipeline.
+
+Each stage is a function of the results of the stages it depends on. A stage
+starts as soon as all of its dependencies have finished, so stages that do not
+depend on each other overlap their I/O. With max_workers=1 the stages run one
+at a time in the order they were added.
+
+A stage ends the run early by raising StopPipeline(outcome); stages that are
+already running are allowed to finish, nothing new is started. Any other
+exception is re-raised to the caller once the running stages have finished.
+"""
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+logger = logging.getLogger()
+
+class StopPipeline(Exception):
+    """Raised by a stage to finish the pipeline early with the given outcome."""
+
+    def __init__(self, outcome: Any, reason: str = ''):
+        super().__init__(reason or f"Pipeline stopped with outcome {outcome!r}")
+        self.outcome = outcome
+
+class StageGraph:
+    def __init__(self):
+        self.stages: "OrderedDict[str, Tuple[Callable[..., Any], Tuple[str, ...]]]" = OrderedDict()
+
+    def add(self, name: str, fn: Callable[..., Any], deps: Iterable[str] = ()) -> 'StageGraph':
+        """Add a stage. fn is called with one keyword argument per dependency."""
+        deps = tuple(deps)
+        missing = [d for d in deps if d not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stage(s): {', '.join(missing)}")
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        self.stages[name] = (fn, deps)
+        return self
+
+    @staticmethod
+    def _timed(fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Tuple[Any, float, BaseException]:
+        start = time.perf_counter()
+        try:
+            return fn(**kwargs), (time.perf_counter() - start) * 1000.0, None
+        except BaseException as e:
+            return None, (time.perf_counter() - start) * 1000.0, e
+
+    def run(self, max_workers: int = 4) -> Tuple[Dict[str, Any], Dict[str, float], Any]:
+        """
+        Run every stage, or until one raises StopPipeline.
+
+        Returns (results, timings_ms, outcome): results and timings for the
+        stages that completed, and the StopPipeline outcome (None if the graph
+        ran to completion).
+        """
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        pending = OrderedDict(self.stages)
+        running = {}
+        stop = None
+        error = None
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            while running or (pending and stop is None and error is None):
+                if stop is None and error is None:
+                    for name, (fn, deps) in list(pending.items()):
+                        if all(d in results for d in deps):
+                            del pending[name]
+                            running[executor.submit(self._timed, fn, {d: results[d] for d in deps})] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    value, elapsed_ms, exc = future.result()
+                    timings[name] = elapsed_ms
+                    if exc is None:
+                        results[name] = value
+                    elif isinstance(exc, StopPipeline):
+                        logger.info(f"Stage {name} stopped the pipeline: {exc}")
+                        stop = stop or exc
+                    else:
+                        error = error or exc
+
+        if error is not None:
+            raise error
+        return results, timings, stop.outcome if stop else None
@@ -0,0 +1,67 @@
+# thread_refresh.py
+"""
+Deferred, deduplicated thread-attribute refresh.
+
+The pipeline records which conversations changed; after the batch is done,
+getThreadAttrs is invoked once per conversation, asynchronously
+(InvocationType='Event'). getThreadAttrs saves the attributes on the thread
+itself and skips the LLM call when the conversation is unchanged since the
+last extraction.
+"""
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import boto3
+
+from config import AWS_REGION
+
+logger = logging.getLogger()
+
+lambda_client = boto3.client('lambda', region_name=AWS_REGION)
+
+class ThreadAttrsRefresh:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[str, str]" = OrderedDict()
+
+    def request(self, conversation_id: str, account_id: str) -> None:
+        """Queue a refresh; repeated requests for a conversation collapse into one."""
+        with self._lock:
+            self._pending[conversation_id] = account_id
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, invocation_type: Optional[str] = None) -> int:
+        """Invoke getThreadAttrs once per queued conversation. Returns the number of invocations sent."""
+        with self._lock:
+            pending, self._pending = self._pending, OrderedDict()
+
+        invocation_type = invocation_type or os.environ.get('THREAD_ATTRS_INVOCATION_TYPE', 'Event')
+        sent = 0
+        for conversation_id, account_id in pending.items():
+            try:
+                lambda_client.invoke(
+                    FunctionName=os.environ.get("GET_THREAD_ATTRS_FUNCTION_NAME", "getThreadAttrs"),
+                    InvocationType=invocation_type,
+                    Payload=json.dumps({
+                        'body': json.dumps({
+                            'conversationId': conversation_id,
+                            'accountId': account_id
+                        })
+                    })
+                )
+                sent += 1
+            except Exception as e:
+                # Attributes are a best-effort enrichment; the next email on the thread refreshes them
+                logger.error(f"Error requesting thread attribute refresh for {conversation_id}: {str(e)}")
+        if sent:
+            logger.info(f"Requested thread attribute refresh for {sent} conversation(s)")
+        return sent
+
+thread_attrs_refresh = ThreadAttrsRefresh()
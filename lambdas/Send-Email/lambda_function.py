@@ -11,7 +11,7 @@ import logging
 import time
 from config import logger, AUTH_BP
 from utils import create_response, LambdaError
-from send_email_logic import process_and_send_email
+from send_email_logic import process_and_send_email, process_dispatch_batch
 
 # Initialize the SES client
 ses_client = boto3.client('ses', region_name='us-east-2')
@@ -326,6 +326,11 @@ def check_and_update_ai_rate_limit(account_id):
         return 0, False, str(e)
 
 def lambda_handler(event, context):
+    records = event.get('Records') if isinstance(event, dict) else None
+    if records and records[0].get('eventSource') == 'aws:sqs':
+        # Batch from the response dispatch queue
+        return {'batchItemFailures': process_dispatch_batch(records)}
+
     try:
         # Assuming EventBridge scheduler passes the payload directly
         result = process_and_send_email(event)
@@ -9,7 +9,7 @@ import json
 import os
 
 from config import logger, AUTH_BP
-from utils import LambdaError, invoke_lambda, authorize, db_select
+from utils import LambdaError, invoke_lambda, authorize, db_select, parse_event
 
 ses_client = boto3.client('ses', region_name='us-east-2')
 dynamodb = boto3.resource('dynamodb')
@@ -72,12 +72,21 @@ def log_email(account_id, conversation_id, sender, receiver, subject, body_text,
     except ClientError as e:
         raise LambdaError(500, f"Failed to log email: {e.response['Error']['Message']}")
 
+    # Index the message so the lead's reply threads into this conversation in one lookup.
+    # The email has already been sent, so a failure here must not fail (and retry) the send.
+    try:
+        dynamodb.Table('MessageIndex').put_item(Item={
+            'msg_id': message_id, 'conversation_id': conversation_id,
+            'account_id': account_id, 'timestamp': item['timestamp']
+        })
+    except ClientError as e:
+        logger.error(f"Failed to index message {message_id}: {e.response['Error']['Message']}")
+
 def process_and_send_email(event):
-    # Parse the event using ParseEvent lambda function
+    # Parse the event in-process (same semantics as the ParseEvent lambda function)
     try:
         print("Event going to parse event: ", event)
-        parsed_event = invoke_lambda(os.environ.get("PARSE_EVENT_FUNCTION_NAME", "ParseEvent"), event)
-        parsed_data = json.loads(parsed_event.get('body', '{}'))
+        parsed_data = parse_event(event)
         
         if not parsed_data:
             raise LambdaError(400, "Failed to parse event")
@@ -151,11 +160,19 @@ def process_and_send_email(event):
         logger.warning(f"Thread {conversation_id} is not busy or does not exist. Skipping email send.")
         return {"message": "Thread not busy, email not sent."}
 
-    threads_table.update_item(
-        Key={'conversation_id': conversation_id},
-        UpdateExpression='SET busy = :busy',
-        ExpressionAttributeValues={':busy': False}
-    )
+    try:
+        # Claim the send: of two deliveries of one reply, only the first clears 'busy'
+        threads_table.update_item(
+            Key={'conversation_id': conversation_id},
+            UpdateExpression='SET busy = :busy',
+            ConditionExpression='attribute_not_exists(busy) OR busy <> :busy',
+            ExpressionAttributeValues={':busy': False}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise LambdaError(500, f"Failed to update thread: {e.response['Error']['Message']}")
+        logger.warning(f"Thread {conversation_id} was claimed by another send. Skipping email send.")
+        return {"message": "Thread not busy, email not sent."}
 
     full_body = f"{response_body}\n\n{signature}" if signature else response_body
     email_subject = subject if subject.lower().startswith('re:') else f"Re: {subject}"
@@ -165,3 +182,33 @@ def process_and_send_email(event):
     log_email(account_id, conversation_id, sender_email, target_email, email_subject, full_body, ses_message_id, in_reply_to, llm_email_type)
     
     return {"message": "Email sent and logged successfully.", "ses_message_id": ses_message_id}
+
+def process_dispatch_batch(records):
+    """
+    Send the replies in a batch from the response dispatch queue (same payload as
+    a scheduled invocation). Returns the SQS batchItemFailures of the messages to
+    retry; payloads rejected with a 4xx are logged and dropped.
+    """
+    failures, seen = [], set()
+    for record in records:
+        message_id = record.get('messageId')
+        name = record.get('messageAttributes', {}).get('dispatch_name', {}).get('stringValue')
+        if name and name in seen:
+            logger.info(f"Skipping duplicate dispatch {name} ({message_id})")
+            continue
+        try:
+            result = process_and_send_email(json.loads(record['body']))
+            logger.info(f"Dispatched {name or message_id}: {result.get('message')}")
+        except LambdaError as e:
+            if e.status_code >= 500:
+                logger.error(f"Dispatch {name or message_id} failed, will retry: {e.message}")
+                failures.append({'itemIdentifier': message_id})
+                continue
+            logger.error(f"Dropping dispatch {name or message_id}: {e.message}")
+        except Exception as e:
+            logger.error(f"Dispatch {name or message_id} failed, will retry: {e}", exc_info=True)
+            failures.append({'itemIdentifier': message_id})
+            continue
+        if name:
+            seen.add(name)
+    return failures
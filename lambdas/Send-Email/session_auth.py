@@ -0,0 +1,108 @@
+# session_auth.py
+import os
+import time
+import logging
+from collections import OrderedDict
+
+import boto3
+
+logger = logging.getLogger()
+
+AUTH_CACHE_TTL_S = int(os.environ.get("AUTH_CACHE_TTL_S", "300"))
+AUTH_CACHE_NEGATIVE_TTL_S = int(os.environ.get("AUTH_CACHE_NEGATIVE_TTL_S", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "1024"))
+
+dynamodb = boto3.resource('dynamodb')
+sessions_table = dynamodb.Table('Sessions')
+
+class SessionCache:
+    """
+    TTL + LRU cache of (account_id, session_id) -> (authorized, message).
+
+    Lives at module level, so entries survive across invocations of a warm
+    container. Counters are cumulative for the container's lifetime.
+    """
+
+    def __init__(self, max_entries=AUTH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, verdict, expires_at):
+        self._entries[key] = (expires_at, verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self._entries)}
+
+session_cache = SessionCache()
+
+def _read_session_verdict(user_id, session_id, now):
+    """
+    Same checks as the Authorize Lambda, plus the session's 'expiration'.
+    Returns (verdict, expires_at) where verdict is (authorized, message).
+    """
+    response = sessions_table.get_item(Key={'session_id': session_id})
+    session = response.get('Item')
+
+    if not session:
+        logger.warning(f"Session not found: {session_id}")
+        return (False, "ACS: Unauthorized"), now + AUTH_CACHE_NEGATIVE_TTL_S
+
+    if session.get('associated_account') != user_id:
+        logger.warning(f"User ID mismatch: {user_id} != {session.get('associated_account')}")
+        return (False, "ACS: Unauthorized"), now + AUTH_CACHE_NEGATIVE_TTL_S
+
+    expires_at = now + AUTH_CACHE_TTL_S
+    expiration = session.get('expiration')
+    if expiration is not None:
+        expiration = int(expiration)
+        if expiration <= now:
+            logger.warning(f"Session expired: {session_id}")
+            return (False, "ACS: Unauthorized"), now + AUTH_CACHE_NEGATIVE_TTL_S
+        expires_at = min(expires_at, expiration)
+
+    return (True, "Authorized"), expires_at
+
+def check_session(user_id, session_id):
+    """
+    Returns (authorized, message) for the given account/session pair.
+
+    Verdicts are served from the warm-container cache when possible; on a
+    miss the Sessions table is read directly. DynamoDB errors are not cached.
+
+    Raises:
+        ClientError: If the Sessions read fails.
+    """
+    key = (user_id, session_id)
+    now = time.time()
+    verdict = session_cache.get(key, now)
+    if verdict is None:
+        verdict, expires_at = _read_session_verdict(user_id, session_id, now)
+        session_cache.put(key, verdict, expires_at)
+    logger.info(f"Session auth cache: {session_cache.stats()}")
+    return verdict
@@ -0,0 +1,17 @@
+import os
+import logging
+
+# Configure logging
+log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger()
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-2')
+
+# Schedules created by Process-SQS-Queued-Emails for scheduler-mode response dispatch
+SWEEP_SCHEDULE_PREFIX = os.environ.get('SWEEP_SCHEDULE_PREFIX', 'process-email-')
+SWEEP_SCHEDULE_GROUP = os.environ.get('SWEEP_SCHEDULE_GROUP', 'default')
+# Only schedules created at least this long ago are deleted, so replies still waiting to send are kept
+SWEEP_MIN_AGE_MINUTES = int(os.environ.get('SWEEP_MIN_AGE_MINUTES', 30))
+# Concurrent DeleteSchedule calls (the Scheduler API is throttled per account)
+SWEEP_CONCURRENCY = int(os.environ.get('SWEEP_CONCURRENCY', 8))
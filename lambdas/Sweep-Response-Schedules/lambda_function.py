@@ -0,0 +1,65 @@
+# lambda_function.py
+"""
+Deletes EventBridge schedules left over from scheduler-mode response dispatch.
+
+Process-SQS-Queued-Emails used to create one `process-email-*` schedule per LLM
+reply and never delete it. Schedules older than SWEEP_MIN_AGE_MINUTES are
+listed by name prefix and deleted concurrently. Runs daily; an invocation can
+override the defaults with {"dry_run": true, "min_age_minutes": 60, "prefix": "..."}.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from config import (
+    logger, AWS_REGION, SWEEP_SCHEDULE_PREFIX, SWEEP_SCHEDULE_GROUP, SWEEP_MIN_AGE_MINUTES, SWEEP_CONCURRENCY
+)
+
+# Adaptive retries back off on ThrottlingException instead of failing the sweep
+scheduler = boto3.client(
+    'scheduler', region_name=AWS_REGION,
+    config=Config(retries={'max_attempts': 10, 'mode': 'adaptive'}, max_pool_connections=SWEEP_CONCURRENCY)
+)
+
+def list_stale_schedules(prefix, group, cutoff):
+    paginator = scheduler.get_paginator('list_schedules')
+    for page in paginator.paginate(NamePrefix=prefix, GroupName=group):
+        for schedule in page.get('Schedules', []):
+            if schedule['CreationDate'] < cutoff:
+                yield schedule['Name']
+
+def delete_schedule(name, group):
+    try:
+        scheduler.delete_schedule(Name=name, GroupName=group)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceNotFoundException':
+            return True  # Deleted after it was listed (e.g. by ActionAfterCompletion)
+        logger.error(f"Failed to delete schedule {name}: {e.response['Error']['Message']}")
+        return False
+
+def sweep_schedules(prefix=SWEEP_SCHEDULE_PREFIX, group=SWEEP_SCHEDULE_GROUP,
+                    min_age_minutes=SWEEP_MIN_AGE_MINUTES, dry_run=False):
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=min_age_minutes)
+    names = list(list_stale_schedules(prefix, group, cutoff))
+    if dry_run or not names:
+        return {'matched': len(names), 'deleted': 0, 'failed': 0, 'dry_run': dry_run}
+
+    with ThreadPoolExecutor(max_workers=SWEEP_CONCURRENCY) as executor:
+        results = list(executor.map(lambda name: delete_schedule(name, group), names))
+    deleted = sum(results)
+    return {'matched': len(names), 'deleted': deleted, 'failed': len(names) - deleted, 'dry_run': False}
+
+def lambda_handler(event, context):
+    event = event if isinstance(event, dict) else {}
+    summary = sweep_schedules(
+        prefix=event.get('prefix', SWEEP_SCHEDULE_PREFIX),
+        group=event.get('group', SWEEP_SCHEDULE_GROUP),
+        min_age_minutes=int(event.get('min_age_minutes', SWEEP_MIN_AGE_MINUTES)),
+        dry_run=bool(event.get('dry_run', False))
+    )
+    logger.info(f"Schedule sweep: {summary}")
+    return summary
@@ -12,7 +12,7 @@ DYNAMODB_TABLES = {
 
 # Together AI Configuration
 TOGETHER_AI = {
-    'API_URL': 'https://api.together.xyz/v1/chat/completions',
+    'API_URL': os.environ.get('TOGETHER_API_URL', 'https://api.together.xyz/v1/chat/completions'),
     'API_KEY': os.environ.get('TAI_KEY', 'NULL'),  # Get from environment variable
     'MODEL': 'meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8',
     'TEMPERATURE': 0.1,
@@ -20,6 +20,12 @@ TOGETHER_AI = {
     'STOP_SEQUENCES': ['<|im_end|>', '<|endoftext|>']
 }
 
+# 'incremental': update the attributes saved on the thread from the emails after its
+# watermark only, with a full extraction every ATTRIBUTES_FULL_RECOMPUTE_EVERY updates;
+# 'full': extract from the whole conversation every time
+ATTRIBUTES_MODE = os.environ.get('ATTRIBUTES_MODE', 'incremental').lower()
+ATTRIBUTES_FULL_RECOMPUTE_EVERY = int(os.environ.get('ATTRIBUTES_FULL_RECOMPUTE_EVERY', 5))
+
 # LLM System Prompts
 SYSTEM_PROMPTS = {
     'THREAD_ATTRIBUTES': """You are an AI assistant that analyzes real estate conversations. Extract the following attributes from the conversation:
@@ -29,6 +35,20 @@ SYSTEM_PROMPTS = {
 3. Preferred Property Types: A maximum 5 word description of preferred property types (use "UNKNOWN" if not mentioned)
 4. Timeline: A 2-5 word description of the lead's timeline to buy
 
+Format your response exactly as:
+ai_summary: [summary]
+budget_range: [budget]
+preferred_property_types: [types]
+timeline: [timeline]""",
+    'THREAD_ATTRIBUTES_INCREMENTAL': """You are an AI assistant that analyzes real estate conversations. You are given the attributes extracted from the earlier emails of a conversation and the emails sent since. Update the attributes so they describe the whole conversation:
+
+1. AI Summary: A concise phrase describing the current state of the conversation
+2. Budget Range: A 2-4 word description of the lead's budget (use "UNKNOWN" if not mentioned)
+3. Preferred Property Types: A maximum 5 word description of preferred property types (use "UNKNOWN" if not mentioned)
+4. Timeline: A 2-5 word description of the lead's timeline to buy
+
+Keep a previous value unless the new emails change or refine it, and always restate the AI Summary for the conversation as it stands now.
+
 Format your response exactly as:
 ai_summary: [summary]
 budget_range: [budget]
@@ -44,7 +44,8 @@ def get_email_chain(conversation_id: str, account_id: str, session_id: str) -> L
                 'body': item.get('body', ''),
                 'sender': item.get('sender', ''),
                 'timestamp': item.get('timestamp', ''),
-                'type': item.get('type', '')
+                'type': item.get('type', ''),
+                'response_id': item.get('response_id', '')
             }
             formatted_chain.append(formatted_item)
         
@@ -61,10 +62,12 @@ def store_llm_invocation(
     llm_email_type: str,
     model_name: str,
     conversation_id: Optional[str] = None,
-    invocation_id: Optional[str] = None
+    invocation_id: Optional[str] = None,
+    cache_status: Optional[str] = None
 ) -> bool:
     """
     Store an LLM invocation record in DynamoDB.
+    cache_status marks a result served without an LLM call (see llm_cache.py).
     Returns True if successful, False otherwise.
     """
     start_time = time.time()
@@ -105,6 +108,8 @@ def store_llm_invocation(
             item['conversation_id'] = conversation_id
         if invocation_id:
             item['invocation_id'] = invocation_id
+        if cache_status:
+            item['cache_status'] = cache_status
             
         if LOGGING_CONFIG['ENABLE_REQUEST_LOGGING']:
             logger.info(f"Writing to DynamoDB table: {invocations_table.name}")
@@ -196,4 +201,41 @@ def get_thread_account_id(conversation_id: str) -> Optional[str]:
         logger.error(f"  Conversation ID: {conversation_id}")
         logger.error(f"  Table: {table.name}")
         logger.error(f"  Execution time: {time.time() - start_time:.2f} seconds")
-        return None 
\ No newline at end of file
+        return None 
+def get_thread(conversation_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the Threads row for a conversation.
+    Returns None if the thread doesn't exist or there's an error.
+    """
+    try:
+        table = dynamodb.Table(get_table_name('THREADS'))
+        response = table.get_item(Key={'conversation_id': conversation_id})
+        return response.get('Item')
+    except Exception as e:
+        logger.error(f"Error getting thread {conversation_id}: {str(e)}", exc_info=True)
+        return None
+
+def save_thread_attributes(conversation_id: str, attributes: Dict[str, str], attributes_hash: str,
+                           watermark: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Write the extracted attributes onto the thread, with the hash of the content they were extracted from
+    and, if given, the watermark fields recording which emails they cover (see thread_logic.py).
+    Returns True if successful, False otherwise.
+    """
+    try:
+        table = dynamodb.Table(get_table_name('THREADS'))
+        fields = dict(attributes, attributes_hash=attributes_hash, **(watermark or {}))
+        names = {f"#f{i}": key for i, key in enumerate(fields)}
+        values = {f":v{i}": value for i, value in enumerate(fields.values())}
+        table.update_item(
+            Key={'conversation_id': conversation_id},
+            UpdateExpression="SET " + ", ".join(f"#f{i} = :v{i}" for i in range(len(fields))),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ConditionExpression='attribute_exists(conversation_id)'
+        )
+        logger.info(f"Saved {len(attributes)} thread attributes for conversation {conversation_id}")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving thread attributes for {conversation_id}: {str(e)}", exc_info=True)
+        return False
@@ -1,10 +1,14 @@
 import json
 import time
 import os
+# Before any module that creates boto3 clients, so their calls are counted
+from metrics import metrics
 from config import logger, LOGGING_CONFIG, AUTH_BP
 from utils import create_response, LambdaError, authorize, invoke_lambda
 from thread_logic import get_attributes_for_thread
+from admission import admit
 
+@metrics.invocation
 def lambda_handler(event, context):
     start_time = time.time()
     conversation_id = None
@@ -20,6 +24,7 @@ def lambda_handler(event, context):
             conversation_id = body.get('conversationId')
             account_id = body.get('accountId')
             session_id = body.get('sessionId', AUTH_BP)  # Default to AUTH_BP if not provided
+            force = bool(body.get('force', False))  # Re-extract even if the conversation is unchanged
         except json.JSONDecodeError:
             raise LambdaError(400, "Invalid JSON in request body.")
         
@@ -30,12 +35,8 @@ def lambda_handler(event, context):
 
         # Check authorization and rate limits if not using AUTH_BP
         if session_id != AUTH_BP:
-            authorize(account_id, session_id)
-            # Check rate limits
-            rate_limit_response = invoke_lambda(os.environ.get("RATE_LIMIT_AWS_FUNCTION_NAME", "RateLimitAWS"), {
-                'client_id': account_id,
-                'session': session_id
-            })
+            # Authorize the session and count the request against the rate limit in one step
+            rate_limit_response = admit(account_id, session_id)
             
             if rate_limit_response.get('statusCode') == 429:
                 logger.warning(f"Rate limit exceeded for account {account_id}")
@@ -56,7 +57,7 @@ def lambda_handler(event, context):
                     'message': 'An error occurred while checking rate limits'
                 })
 
-        attributes, account_id, email_count = get_attributes_for_thread(conversation_id, account_id, session_id)
+        attributes, account_id, email_count, unchanged = get_attributes_for_thread(conversation_id, account_id, session_id, force)
         
         processing_time = time.time() - start_time
         
@@ -66,6 +67,7 @@ def lambda_handler(event, context):
                 'conversationId': conversation_id,
                 'accountId': account_id,
                 'emailCount': email_count,
+                'unchanged': unchanged,
                 'processingTime': f"{processing_time:.2f}s"
             }
         }
@@ -1,19 +1,17 @@
-import json
-import urllib3
 import logging
 import time
 import re
 from typing import Dict, Any, Optional, Tuple
 from db import store_llm_invocation
+from metrics import metrics
+from llm_cache import llm_cache, CACHED
+from together_client import chat_completion, TogetherError
 from config import get_together_ai_config, get_system_prompt, LOGGING_CONFIG
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logger.setLevel(getattr(logging, LOGGING_CONFIG['LEVEL']))
 
-# Initialize urllib3 pool manager
-http = urllib3.PoolManager()
-
 # Define expected attributes and their validation rules
 EXPECTED_ATTRIBUTES = {
     'ai_summary': {
@@ -133,32 +131,52 @@ def parse_llm_response(content: str) -> Dict[str, str]:
     logger.info("Successfully parsed and validated all attributes")
     return attributes
 
-def get_thread_attributes(conversation_text: str, account_id: Optional[str] = None, conversation_id: Optional[str] = None) -> Dict[str, str]:
+def format_previous_attributes(attributes: Dict[str, str]) -> str:
+    """
+    Render saved attributes in the same "key: value" lines the LLM is asked to return.
+    """
+    return "\n".join(f"{key}: {attributes[key]}" for key in EXPECTED_ATTRIBUTES)
+
+def get_thread_attributes(conversation_text: str, account_id: Optional[str] = None, conversation_id: Optional[str] = None,
+                          previous_attributes: Optional[Dict[str, str]] = None) -> Dict[str, str]:
     """
     Get thread attributes by analyzing conversation text using LLM.
-    Returns a dictionary of validated attributes.
+    With previous_attributes, conversation_text holds only the emails since they
+    were extracted, and the LLM updates them instead of reading the whole thread.
+    Returns a dictionary of validated attributes; attributes cached for the same
+    request (see llm_cache.py) are returned without an LLM call.
     """
     start_time = time.time()
-    logger.info(f"Starting thread attributes analysis for conversation_id: {conversation_id}")
+    logger.info(f"Starting {'incremental ' if previous_attributes else ''}thread attributes analysis for conversation_id: {conversation_id}")
     
     # Get Together AI configuration
     tai_config = get_together_ai_config()
     
-    headers = {
-        "Authorization": f"Bearer {tai_config['API_KEY']}",
-        "Content-Type": "application/json"
-    }
-
-    messages = [
-        {
-            "role": "system",
-            "content": get_system_prompt('THREAD_ATTRIBUTES')
-        },
-        {
-            "role": "user",
-            "content": f"Please analyze this real estate conversation and provide the attributes:\n\n{conversation_text}"
-        }
-    ]
+    if previous_attributes:
+        llm_email_type = "thread_attributes_incremental"
+        messages = [
+            {
+                "role": "system",
+                "content": get_system_prompt('THREAD_ATTRIBUTES_INCREMENTAL')
+            },
+            {
+                "role": "user",
+                "content": (f"Attributes extracted from the earlier emails:\n{format_previous_attributes(previous_attributes)}\n\n"
+                            f"New emails since then:\n\n{conversation_text}")
+            }
+        ]
+    else:
+        llm_email_type = "thread_attributes"
+        messages = [
+            {
+                "role": "system",
+                "content": get_system_prompt('THREAD_ATTRIBUTES')
+            },
+            {
+                "role": "user",
+                "content": f"Please analyze this real estate conversation and provide the attributes:\n\n{conversation_text}"
+            }
+        ]
 
     payload = {
         "model": tai_config['MODEL'],
@@ -177,41 +195,37 @@ def get_thread_attributes(conversation_text: str, account_id: Optional[str] = No
         logger.info(f"  System Prompt: {messages[0]['content'][:100]}...")
         logger.info(f"  User Message Length: {len(messages[1]['content'])} characters")
 
+    # The same conversation was analyzed before (a second run for the same email): no LLM call
+    cache_key = llm_cache.key(llm_email_type, payload)
+    hit, attributes = llm_cache.get(cache_key)
+    if hit:
+        logger.info(f"Thread attributes served from the LLM cache for conversation_id: {conversation_id}")
+        if account_id:
+            store_llm_invocation(
+                associated_account=account_id,
+                input_tokens=0,
+                output_tokens=0,
+                llm_email_type=llm_email_type,
+                model_name=payload["model"],
+                conversation_id=conversation_id,
+                cache_status=CACHED
+            )
+        return attributes
+
     try:
-        encoded_data = json.dumps(payload).encode('utf-8')
-        api_start_time = time.time()
-        
         logger.info("Sending request to Together AI API...")
-        response = http.request(
-            'POST',
-            tai_config['API_URL'],
-            body=encoded_data,
-            headers=headers
-        )
-        api_duration = time.time() - api_start_time
-        
-        if LOGGING_CONFIG['ENABLE_PERFORMANCE_LOGGING']:
-            logger.info(f"API request completed in {api_duration:.2f} seconds")
+        with metrics.stage('llm'):
+            result = chat_completion(payload, api_key=tai_config['API_KEY'], url=tai_config['API_URL'])
+        api_duration = result.latency_ms / 1000.0
 
-        if response.status != 200:
-            logger.error(f"API call failed with status {response.status}")
-            logger.error(f"Response data: {response.data.decode('utf-8')}")
-            raise Exception("Failed to fetch response from Together AI API")
-
-        response_data = json.loads(response.data.decode('utf-8'))
-        if "choices" not in response_data:
-            logger.error(f"Invalid API response structure: {json.dumps(response_data, indent=2)}")
-            raise Exception("Invalid response from Together AI API")
+        if LOGGING_CONFIG['ENABLE_PERFORMANCE_LOGGING']:
+            logger.info(f"API request completed in {api_duration:.2f} seconds ({result.attempts} attempt(s))")
 
         # Extract token usage
-        usage = response_data.get("usage", {})
-        input_tokens = usage.get("prompt_tokens", 0)
-        output_tokens = usage.get("completion_tokens", 0)
-        total_tokens = input_tokens + output_tokens
+        input_tokens, output_tokens, total_tokens = result.usage
 
         if LOGGING_CONFIG['ENABLE_RESPONSE_LOGGING']:
             logger.info("Together AI API Response Details:")
-            logger.info(f"  Status Code: {response.status}")
             logger.info(f"  Input Tokens: {input_tokens}")
             logger.info(f"  Output Tokens: {output_tokens}")
             logger.info(f"  Total Tokens: {total_tokens}")
@@ -225,16 +239,17 @@ def get_thread_attributes(conversation_text: str, account_id: Optional[str] = No
                 associated_account=account_id,
                 input_tokens=input_tokens,
                 output_tokens=output_tokens,
-                llm_email_type="thread_attributes",
+                llm_email_type=llm_email_type,
                 model_name=payload["model"],
                 conversation_id=conversation_id
             )
             logger.info(f"LLM invocation record storage: {'Success' if invocation_success else 'Failed'}")
 
         # Parse and validate the response
-        content = response_data["choices"][0]["message"]["content"]
+        content = result.content
         try:
             attributes = parse_llm_response(content)
+            llm_cache.put(cache_key, llm_email_type, attributes)
             
             if LOGGING_CONFIG['ENABLE_RESPONSE_LOGGING']:
                 logger.info("Extracted and validated Thread Attributes:")
@@ -258,7 +273,6 @@ def get_thread_attributes(conversation_text: str, account_id: Optional[str] = No
         logger.error(f"  Conversation ID: {conversation_id}")
         logger.error(f"  Account ID: {account_id}")
         logger.error(f"  Model: {payload['model']}")
-        if 'response' in locals():
-            logger.error(f"  Response Status: {response.status}")
-            logger.error(f"  Response Data: {response.data.decode('utf-8')}")
+        if isinstance(e, TogetherError) and e.status:
+            logger.error(f"  Response Status: {e.status}")
         raise Exception(f"Failed to get thread attributes for conversation {conversation_id}: {str(e)}")
\ No newline at end of file
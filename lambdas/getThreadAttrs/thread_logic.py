@@ -0,0 +1,134 @@
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import get_together_ai_config, get_system_prompt, LOGGING_CONFIG, ATTRIBUTES_MODE, ATTRIBUTES_FULL_RECOMPUTE_EVERY
+from db import get_email_chain, get_thread, save_thread_attributes
+from llm_interface import get_thread_attributes, EXPECTED_ATTRIBUTES
+from metrics import metrics
+from utils import LambdaError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(getattr(logging, LOGGING_CONFIG['LEVEL']))
+
+def format_conversation(chain: List[Dict[str, Any]], start: int = 1) -> str:
+    """
+    Render the email chain (oldest first) as the text the LLM analyzes.
+    Emails are numbered from start, so a tail of the chain keeps its numbering.
+    """
+    parts = []
+    for idx, email in enumerate(chain, start):
+        parts.append(
+            f"Email {idx} ({email.get('type', '')}) from {email.get('sender', '')} at {email.get('timestamp', '')}\n"
+            f"Subject: {email.get('subject', '')}\n\n"
+            f"{email.get('body', '')}"
+        )
+    return "\n\n---\n\n".join(parts)
+
+def content_hash(conversation_text: str) -> str:
+    """
+    Hash of everything that determines the LLM's output: model, prompt and conversation text.
+    """
+    digest = hashlib.sha256()
+    for part in (get_together_ai_config()['MODEL'], get_system_prompt('THREAD_ATTRIBUTES'), conversation_text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def stored_attributes(thread: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Attributes previously saved on the thread, or {} if any expected attribute is missing.
+    """
+    attributes = {key: thread.get(key) for key in EXPECTED_ATTRIBUTES}
+    return attributes if all(value is not None for value in attributes.values()) else {}
+
+def email_position(email: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Order of an email in the chain: its timestamp, then its response_id to break ties.
+    """
+    return (email.get('timestamp') or '', email.get('response_id') or '')
+
+def emails_after_watermark(chain: List[Dict[str, Any]], thread: Optional[Dict[str, Any]]) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    (number of emails the saved attributes cover, emails since) if the thread's
+    attributes can be updated incrementally, else None and the attributes are
+    extracted from the whole chain. That is the case when the thread has no
+    saved attributes or watermark, the watermark email is no longer in the
+    chain, there are no emails after it (so an earlier email, the prompt or the
+    model changed), or ATTRIBUTES_FULL_RECOMPUTE_EVERY incremental updates
+    were made since the last full extraction.
+    """
+    if ATTRIBUTES_MODE != 'incremental' or not thread or not stored_attributes(thread):
+        return None
+    if not thread.get('attributes_watermark'):
+        return None
+    if int(thread.get('attributes_incremental_updates', 0)) >= ATTRIBUTES_FULL_RECOMPUTE_EVERY:
+        return None
+
+    watermark = (thread['attributes_watermark'], thread.get('attributes_watermark_id') or '')
+    positions = [email_position(email) for email in chain]
+    if watermark not in positions:
+        return None
+    new = [email for email, position in zip(chain, positions) if position > watermark]
+    if not new:
+        return None
+    return len(chain) - len(new), new
+
+def get_attributes_for_thread(conversation_id: str, account_id: str, session_id: str, force: bool = False) -> Tuple[Dict[str, str], str, int, bool]:
+    """
+    Extract the thread's attributes and save them on the Threads row.
+
+    If the conversation (and the prompt/model) is unchanged since the attributes
+    were last extracted, the saved attributes are returned without an LLM call.
+    Otherwise, in ATTRIBUTES_MODE 'incremental', the LLM gets the saved
+    attributes and only the emails after the thread's watermark (see
+    emails_after_watermark), falling back to the whole conversation if that
+    fails. Pass force=True to extract them from the whole conversation regardless.
+
+    Returns (attributes, account_id, email_count, unchanged).
+    """
+    with metrics.stage('chain'):
+        chain = get_email_chain(conversation_id, account_id, session_id)
+    if not chain:
+        raise LambdaError(404, f"No emails found for conversation {conversation_id}.")
+
+    conversation_text = format_conversation(chain)
+    attributes_hash = content_hash(conversation_text)
+
+    with metrics.stage('thread'):
+        thread = get_thread(conversation_id)
+    if not force and thread and thread.get('attributes_hash') == attributes_hash:
+        attributes = stored_attributes(thread)
+        if attributes:
+            logger.info(f"Conversation {conversation_id} unchanged since last extraction; skipping LLM call")
+            return attributes, account_id, len(chain), True
+
+    attributes = None
+    incremental = None if force else emails_after_watermark(chain, thread)
+    if incremental:
+        covered, new = incremental
+        try:
+            attributes = get_thread_attributes(format_conversation(new, covered + 1), account_id, conversation_id,
+                                               previous_attributes=stored_attributes(thread))
+            updates = int(thread.get('attributes_incremental_updates', 0)) + 1
+            metrics.count('IncrementalAttributeUpdates')
+        except Exception as e:
+            logger.warning(f"Incremental attribute update failed for {conversation_id}; extracting from the whole conversation: {str(e)}")
+    if attributes is None:
+        attributes = get_thread_attributes(conversation_text, account_id, conversation_id)
+        updates = 0
+        metrics.count('FullAttributeExtractions')
+
+    if thread:
+        latest, latest_id = max(email_position(email) for email in chain)
+        watermark = {
+            'attributes_watermark': latest,
+            'attributes_watermark_id': latest_id,
+            'attributes_incremental_updates': updates
+        }
+        with metrics.stage('save'):
+            save_thread_attributes(conversation_id, attributes, attributes_hash, watermark)
+    else:
+        logger.warning(f"Thread not found for conversation {conversation_id}; attributes not saved")
+
+    return attributes, account_id, len(chain), False
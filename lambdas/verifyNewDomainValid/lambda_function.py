@@ -2,6 +2,7 @@ import json
 import boto3
 import urllib.request
 import os
+from cors import get_cors_headers
 
 # Initialize AWS Clients
 dynamodb = boto3.resource("dynamodb", region_name="us-east-2")
@@ -11,54 +12,17 @@ lambda_client = boto3.client("lambda", region_name="us-east-2")
 
 # Environment variables
 AWS_REGION = os.environ.get("AWS_REGION", "us-east-2")
-CORS_FUNCTION = os.environ.get("CORS_FUNCTION_NAME", "Allow-Cors")
 
 # DynamoDB table for session storage
 SESSIONS_TABLE = os.environ.get("SESSIONS_TABLE", "Sessions")
 dynamodb       = boto3.resource("dynamodb", region_name=AWS_REGION)
 sessions_table = dynamodb.Table(SESSIONS_TABLE)
-
-def get_cors_headers(event: dict) -> dict:
-    default = {
-        "Access-Control-Allow-Origin":      "*",
-        "Access-Control-Allow-Methods":     "OPTIONS, POST",
-        "Access-Control-Allow-Headers":     "Content-Type",
-        "Access-Control-Allow-Credentials": "true",
-    }
-    try:
-        resp = lambda_client.invoke(
-            FunctionName   = CORS_FUNCTION,
-            InvocationType = "RequestResponse",
-            Payload        = json.dumps(event).encode()
-        )
-        data = json.loads(resp["Payload"].read().decode())
-        return data.get("headers", default)
-    except Exception:
-        return default
-
-# Allowed origins for CORS
-ALLOWED_ORIGINS = [
-    "https://acs-next-js.vercel.app",
-    "http://localhost:3000",
-    "localhost:3000"
-]
+cache_generations_table = dynamodb.Table("CacheGenerations")
 
 # Our AWS-owned domain (Route 53 verification required)
 OWNED_DOMAIN = "homes.automatedconsultancy.com"
 ROUTE53_ZONE_ID = "Z07316711WN9QRDUB0OJ2"  # 🔹 Update this with your actual AWS Route 53 Hosted Zone ID
 
-def get_cors_headers(event):
-    """Determine and return the appropriate CORS headers."""
-    request_origin = event.get("headers", {}).get("origin", "")
-    response_origin = request_origin if request_origin in ALLOWED_ORIGINS else ALLOWED_ORIGINS[0]
-
-    return {
-        "Access-Control-Allow-Origin": response_origin,
-        "Access-Control-Allow-Methods": "OPTIONS, POST, GET, PUT, DELETE",
-        "Access-Control-Allow-Headers": "Content-Type, Authorization",
-        "Access-Control-Allow-Credentials": "true",
-    }
-
 # Public email providers (require OAuth instead of DNS checks)
 PUBLIC_EMAIL_PROVIDERS = ["gmail.com", "yahoo.com", "outlook.com", "hotmail.com"]
 
@@ -173,6 +137,18 @@ def get_txt_records_google(domain):
         print(f"Error fetching TXT records from Google DNS: {str(e)}")
         return []
 
+def invalidate_account_routing():
+    """Bump the account-routing generation so the inbound email processor drops its cached address -> account routes."""
+    try:
+        cache_generations_table.update_item(
+            Key={"id": "account-routing"},
+            UpdateExpression="ADD generation :one",
+            ExpressionAttributeValues={":one": 1}
+        )
+    except Exception as e:
+        # Cached routes then expire on their own TTL
+        print(f"Error invalidating account routing cache: {str(e)}")
+
 def update_email_in_db(user_id, new_email, event):
     """Update user's response email in DynamoDB"""
     try:
@@ -192,6 +168,7 @@ def update_email_in_db(user_id, new_email, event):
             UpdateExpression="SET responseEmail = :email",
             ExpressionAttributeValues={":email": new_email}
         )
+        invalidate_account_routing()
 
         return {
             "statusCode": 200,
@@ -24,6 +24,7 @@ export class Acsd2PStack extends cdk.Stack {
   public readonly sharedDynamoDBTables: { [key: string]: any };
   public readonly sharedS3Buckets: { [key: string]: any };
   public readonly emailProcessQueue: any;
+  public readonly responseDispatchQueue: any;
   public readonly lambdaFunctions: { [key: string]: any };
   public readonly api: any;
 
@@ -74,6 +75,7 @@ export class Acsd2PStack extends cdk.Stack {
     });
     
     this.emailProcessQueue = queueResources.emailProcessQueue;
+    this.responseDispatchQueue = queueResources.responseDispatchQueue;
 
     // Create Lambda Resources (Functions, Permissions)
     console.log('⚡ Creating Lambda Resources...');
@@ -85,6 +87,7 @@ export class Acsd2PStack extends cdk.Stack {
       sharedDynamoDBTables: this.sharedDynamoDBTables,
       sharedS3Buckets: this.sharedS3Buckets,
       emailProcessQueue: this.emailProcessQueue,
+      responseDispatchQueue: this.responseDispatchQueue,
       importExistingResources: true,
     });
     
@@ -147,6 +150,11 @@ export class Acsd2PStack extends cdk.Stack {
       'Threads',
       'Organizations',
       'RateLimiting',
+      'MessageIndex',
+      'SpamVerdicts',
+      'EmailLedger',
+      'CacheGenerations',
+      'LLMCache',
     ];
     const dynamoDBTables: { [key: string]: ResourceExistenceCheck } = {};
     for (const table of dynamoDBTableNames) {
@@ -173,7 +181,7 @@ export class Acsd2PStack extends cdk.Stack {
     }
 
     // Build the existence map for SQS queues
-    const sqsQueueNames = ['EmailProcessQueue', 'EmailProcessDLQ'];
+    const sqsQueueNames = ['EmailProcessQueue', 'EmailProcessDLQ', 'ResponseDispatchQueue', 'ResponseDispatchDLQ'];
     const sqsQueues: { [key: string]: ResourceExistenceCheck } = {};
     for (const queue of sqsQueueNames) {
       const fullName = queue;
@@ -206,6 +214,11 @@ export class Acsd2PStack extends cdk.Stack {
       'Threads',
       'Organizations',
       'RateLimiting',
+      'MessageIndex',
+      'SpamVerdicts',
+      'EmailLedger',
+      'CacheGenerations',
+      'LLMCache',
     ];
     const dynamoDBTables: { [key: string]: ResourceExistenceCheck } = {};
     for (const table of dynamoDBTableNames) {
@@ -226,7 +239,7 @@ export class Acsd2PStack extends cdk.Stack {
       };
     }
 
-    const sqsQueueNames = ['EmailProcessQueue', 'EmailProcessDLQ'];
+    const sqsQueueNames = ['EmailProcessQueue', 'EmailProcessDLQ', 'ResponseDispatchQueue', 'ResponseDispatchDLQ'];
     const sqsQueues: { [key: string]: ResourceExistenceCheck } = {};
     for (const queue of sqsQueueNames) {
       sqsQueues[queue] = {
@@ -293,6 +306,12 @@ export class Acsd2PStack extends cdk.Stack {
       exportName: `${this.stackName}-EmailProcessQueueUrl`,
     });
 
+    new cdk.CfnOutput(this, 'ResponseDispatchQueueUrl', {
+      value: this.responseDispatchQueue.queueUrl,
+      description: 'Response Dispatch Queue URL',
+      exportName: `${this.stackName}-ResponseDispatchQueueUrl`,
+    });
+
     // Resource Counts
     new cdk.CfnOutput(this, 'LambdaFunctionCount', {
       value: Object.keys(this.lambdaFunctions).length.toString(),
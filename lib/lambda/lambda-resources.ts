@@ -7,6 +7,9 @@ import * as cognito from 'aws-cdk-lib/aws-cognito';
 import * as dynamodb from 'aws-cdk-lib/aws-dynamodb';
 import * as s3 from 'aws-cdk-lib/aws-s3';
 import * as sqs from 'aws-cdk-lib/aws-sqs';
+import * as events from 'aws-cdk-lib/aws-events';
+import * as targets from 'aws-cdk-lib/aws-events-targets';
+import { SqsEventSource } from 'aws-cdk-lib/aws-lambda-event-sources';
 import { ChangeAwareResources } from '../shared/change-aware-resources';
 
 interface LambdaResourcesProps {
@@ -17,11 +20,12 @@ interface LambdaResourcesProps {
   sharedDynamoDBTables: { [key: string]: dynamodb.ITable };
   sharedS3Buckets: { [key: string]: s3.IBucket };
   emailProcessQueue: sqs.IQueue;
+  responseDispatchQueue: sqs.IQueue;
   importExistingResources?: boolean;
 }
 
 export function createLambdaResources(scope: cdk.Stack, props: LambdaResourcesProps) {
-  const { stage, userPool, userPoolClient, existingUserPoolClientSecret, sharedDynamoDBTables, sharedS3Buckets, emailProcessQueue, importExistingResources = false } = props;
+  const { stage, userPool, userPoolClient, existingUserPoolClientSecret, sharedDynamoDBTables, sharedS3Buckets, emailProcessQueue, responseDispatchQueue, importExistingResources = false } = props;
 
   const getResourceName = (name: string) => {
     return name;
@@ -120,6 +124,7 @@ export function createLambdaResources(scope: cdk.Stack, props: LambdaResourcesPr
     GENERATE_EV_LAMBDA_ARN: getResourceName("GenerateEV"),
     PROCESSING_LAMBDA_ARN: getResourceName("Send-Email"),
     QUEUE_URL: emailProcessQueue.queueUrl,
+    RESPONSE_DISPATCH_QUEUE_URL: responseDispatchQueue.queueUrl,
     SCHEDULER_ROLE_ARN: "arn:aws:iam::872515253712:role/SQS-SES-Handler",
     TAI_KEY: "2e1a1e910693ae18c09ad0585a7645e0f4595e90ec35bb366b6f5520221b6ca7",
     BEDROCK_MODEL_ARN: "arn:aws:bedrock:us-west-2::model/amazon.nova-premier-v1:0",
@@ -183,8 +188,40 @@ export function createLambdaResources(scope: cdk.Stack, props: LambdaResourcesPr
   Object.values(lambdaFunctions).forEach(fn => {
     emailProcessQueue.grantConsumeMessages(fn);
     emailProcessQueue.grantSendMessages(fn);
+    responseDispatchQueue.grantSendMessages(fn);
   });
 
+  // Process-SQS-Queued-Emails drains the inbound email queue. It returns the records that
+  // failed (or are in flight elsewhere) as batchItemFailures, so only those are redelivered
+  const processEmailsFunction = lambdaFunctions['Process-SQS-Queued-Emails'];
+  if (processEmailsFunction) {
+    processEmailsFunction.addEventSource(new SqsEventSource(emailProcessQueue, {
+      batchSize: 10,
+      maxBatchingWindow: cdk.Duration.seconds(1),
+      reportBatchItemFailures: true,
+    }));
+  }
+
+  // Send-Email drains the response dispatch queue; batch failures are reported per message
+  const sendEmailFunction = lambdaFunctions['Send-Email'];
+  if (sendEmailFunction) {
+    sendEmailFunction.addEventSource(new SqsEventSource(responseDispatchQueue, {
+      batchSize: 10,
+      maxBatchingWindow: cdk.Duration.seconds(1),
+      maxConcurrency: 2,
+      reportBatchItemFailures: true,
+    }));
+  }
+
+  // Daily sweep of EventBridge schedules left over from scheduler-mode response dispatch
+  const sweepFunction = lambdaFunctions['Sweep-Response-Schedules'];
+  if (sweepFunction) {
+    new events.Rule(scope, 'SweepResponseSchedulesRule', {
+      schedule: events.Schedule.rate(cdk.Duration.days(1)),
+      targets: [new targets.LambdaFunction(sweepFunction)],
+    });
+  }
+
   Object.values(lambdaFunctions).forEach(fn => {
     Object.values(sharedS3Buckets).forEach(bucket => {
       bucket.grantReadWrite(fn);
@@ -63,7 +63,51 @@ export function createQueueResources(scope: cdk.Stack, props: QueueResourcesProp
     });
   }
 
+  // Response Dispatch Queue: LLM replies waiting out their send delay (see
+  // Process-SQS-Queued-Emails/scheduling.py), drained in batches by Send-Email
+  const responseDispatchQueueName = getResourceName('ResponseDispatchQueue');
+  const responseDispatchDLQName = getResourceName('ResponseDispatchDLQ');
+
+  const responseDispatchQueueCheck = resourceExistenceChecks?.sqsQueues?.['ResponseDispatchQueue'];
+  const responseDispatchDLQCheck = resourceExistenceChecks?.sqsQueues?.['ResponseDispatchDLQ'];
+
+  let responseDispatchQueue: sqs.IQueue;
+  let responseDispatchDLQ: sqs.IQueue;
+
+  if (responseDispatchDLQCheck?.exists && !responseDispatchDLQCheck.needsCreation) {
+    console.log(`   🔗 Importing existing SQS DLQ: ${responseDispatchDLQName}`);
+    console.log(`      Source: ${responseDispatchDLQCheck.source}`);
+    responseDispatchDLQ = EnhancedResourceChecker.importSQSQueue(scope, 'ResponseDispatchDLQ', responseDispatchDLQName, scope.region);
+  } else {
+    console.log(`   🆕 Creating new SQS DLQ: ${responseDispatchDLQName}`);
+    responseDispatchDLQ = new sqs.Queue(scope, 'ResponseDispatchDLQ', {
+      queueName: responseDispatchDLQName,
+      retentionPeriod: cdk.Duration.days(14),
+    });
+  }
+
+  if (responseDispatchQueueCheck?.exists && !responseDispatchQueueCheck.needsCreation) {
+    console.log(`   🔗 Importing existing SQS queue: ${responseDispatchQueueName}`);
+    console.log(`      Source: ${responseDispatchQueueCheck.source}`);
+    responseDispatchQueue = EnhancedResourceChecker.importSQSQueue(scope, 'ResponseDispatchQueue', responseDispatchQueueName, scope.region);
+  } else {
+    console.log(`   🆕 Creating new SQS queue: ${responseDispatchQueueName}`);
+    responseDispatchQueue = new sqs.Queue(scope, 'ResponseDispatchQueue', {
+      queueName: responseDispatchQueueName,
+      // Longer than the Send-Email timeout, so a message is not redelivered while it is being sent
+      visibilityTimeout: cdk.Duration.minutes(2),
+      deliveryDelay: cdk.Duration.seconds(10),
+      retentionPeriod: cdk.Duration.days(4),
+      deadLetterQueue: {
+        queue: responseDispatchDLQ,
+        maxReceiveCount: 3,
+      },
+      removalPolicy: cdk.RemovalPolicy.RETAIN,
+    });
+  }
+
   return {
     emailProcessQueue,
+    responseDispatchQueue,
   };
 } 
\ No newline at end of file
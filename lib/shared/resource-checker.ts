@@ -151,7 +151,12 @@ export class ResourceChecker {
       'Conversations', 
       'Threads',
       'Organizations',
-      'RateLimiting'
+      'RateLimiting',
+      'MessageIndex',
+      'SpamVerdicts',
+      'EmailLedger',
+      'CacheGenerations',
+      'LLMCache'
     ];
 
     const s3BucketNames = [
@@ -161,7 +166,9 @@ export class ResourceChecker {
 
     const sqsQueueNames = [
       'EmailProcessQueue',
-      'EmailProcessDLQ'
+      'EmailProcessDLQ',
+      'ResponseDispatchQueue',
+      'ResponseDispatchDLQ'
     ];
 
     // Check DynamoDB tables
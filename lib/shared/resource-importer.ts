@@ -206,7 +206,7 @@ export class ResourceImporter {
   }
 
   private static async discoverDynamoDBTables(scope: cdk.Stack, stage: string): Promise<void> {
-    const tableNames = ['Users', 'Conversations', 'Threads', 'Organizations', 'RateLimiting'];
+    const tableNames = ['Users', 'Conversations', 'Threads', 'Organizations', 'RateLimiting', 'MessageIndex', 'SpamVerdicts', 'EmailLedger', 'CacheGenerations', 'LLMCache'];
     
     for (const tableName of tableNames) {
       const fullTableName = `${stage}-${tableName}`;
@@ -263,7 +263,7 @@ export class ResourceImporter {
   }
 
   private static async discoverSQSQueues(scope: cdk.Stack, stage: string): Promise<void> {
-    const queueNames = ['EmailProcessQueue', 'EmailProcessDLQ'];
+    const queueNames = ['EmailProcessQueue', 'EmailProcessDLQ', 'ResponseDispatchQueue', 'ResponseDispatchDLQ'];
     
     for (const queueName of queueNames) {
       const fullQueueName = `${stage}-${queueName}`;
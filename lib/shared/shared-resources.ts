@@ -95,6 +95,11 @@ export function createSharedResources(scope: cdk.Stack, props: SharedResourcesPr
     { key: 'Threads', partitionKey: 'id', sortKey: 'timestamp' },
     { key: 'Organizations', partitionKey: 'id', sortKey: undefined },
     { key: 'RateLimiting', partitionKey: 'key', sortKey: 'timestamp', ttl: 'ttl' },
+    { key: 'MessageIndex', partitionKey: 'msg_id', sortKey: undefined },
+    { key: 'SpamVerdicts', partitionKey: 'id', sortKey: undefined, ttl: 'ttl' },
+    { key: 'EmailLedger', partitionKey: 'message_id', sortKey: undefined, ttl: 'ttl' },
+    { key: 'CacheGenerations', partitionKey: 'id', sortKey: undefined },
+    { key: 'LLMCache', partitionKey: 'id', sortKey: undefined, ttl: 'ttl' },
   ];
 
   for (const config of tableConfigs) {